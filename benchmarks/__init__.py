@@ -0,0 +1,9 @@
+"""
+Benchmarks
+==========
+
+Reproducible performance runs for the decision tree: a synthetic dataset
+generator (synthetic), the benchmark suites and their measurements (suite)
+and a command line to run them, record JSON baselines and compare a run
+against a baseline (``python -m benchmarks --help``).
+"""
@@ -0,0 +1,115 @@
+"""
+Benchmark command line
+======================
+
+    python -m benchmarks run --suite quick -o results.json
+    python -m benchmarks record --suite quick
+    python -m benchmarks compare benchmarks/baselines/quick.json results.json
+    python -m benchmarks check --suite quick
+
+``record`` stores a run as the suite's baseline, ``compare`` flags metrics
+that got worse by more than the tolerance and ``check`` runs a suite and
+compares it with its baseline in one go. Both exit with status 1 on a
+regression, so they can gate CI.
+"""
+
+import json
+from pathlib import Path
+import click
+
+from .suite import CRITERIA, SUITES, compare, run_suite
+
+BASELINES = Path(__file__).parent / "baselines"
+
+
+def _run(suite: str, criteria) -> dict:
+    return run_suite(suite, criteria or tuple(CRITERIA), progress=lambda key: click.echo(key, err=True))
+
+
+def _write(result: dict, path) -> None:
+    with open(path, 'w') as f:
+        json.dump(result, f, indent=2)
+
+
+def _read(path) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _report(baseline: dict, current: dict, tolerance: float) -> None:
+    if baseline.get('machine') != current.get('machine'):
+        click.echo("Warning: baseline was recorded on a different machine or environment", err=True)
+    rows = compare(baseline, current, tolerance)
+    for row in rows:
+        flag = "REGRESSION" if row['regression'] else "ok"
+        click.echo(f"{flag:>10}  {row['change']:+7.1%}  {row['metric']:<24} {row['case']}")
+    regressions = sum(row['regression'] for row in rows)
+    click.echo(f"{len(rows)} metrics compared, {regressions} regressions beyond {tolerance:.0%}")
+    if regressions:
+        raise SystemExit(1)
+
+
+suite_option = click.option('--suite', '-s', type=click.Choice(sorted(SUITES)), default='quick',
+                            show_default=True, help='Benchmark suite to run')
+criterion_option = click.option('--criterion', '-c', 'criteria', multiple=True, type=click.Choice(sorted(CRITERIA)),
+                                help='Criterion to measure (repeatable; default: all)')
+tolerance_option = click.option('--tolerance', default=0.2, show_default=True, type=click.FloatRange(min=0),
+                                help='Relative slowdown (or memory growth) tolerated before flagging')
+
+
+@click.group()
+def cli():
+    """Run decision tree benchmarks and compare them against baselines."""
+
+
+@cli.command()
+@suite_option
+@criterion_option
+@click.option('--output', '-o', type=click.Path(dir_okay=False), help='JSON file for the results (default: stdout)')
+def run(suite, criteria, output):
+    """Run a suite and print or save its results."""
+    result = _run(suite, criteria)
+    if output:
+        _write(result, output)
+    else:
+        click.echo(json.dumps(result, indent=2))
+
+
+@cli.command()
+@suite_option
+@criterion_option
+def record(suite, criteria):
+    """Run a suite and store it as the suite's baseline."""
+    BASELINES.mkdir(exist_ok=True)
+    path = BASELINES / f"{suite}.json"
+    _write(_run(suite, criteria), path)
+    click.echo(f"Baseline saved to: {path}")
+
+
+@cli.command('compare')
+@click.argument('baseline', type=click.Path(exists=True, dir_okay=False))
+@click.argument('current', type=click.Path(exists=True, dir_okay=False))
+@tolerance_option
+def compare_command(baseline, current, tolerance):
+    """Compare a results file against a baseline file."""
+    _report(_read(baseline), _read(current), tolerance)
+
+
+@cli.command()
+@suite_option
+@criterion_option
+@tolerance_option
+@click.option('--output', '-o', type=click.Path(dir_okay=False), help='Also save the results to this JSON file')
+def check(suite, criteria, tolerance, output):
+    """Run a suite and compare it against its recorded baseline."""
+    path = BASELINES / f"{suite}.json"
+    if not path.exists():
+        raise click.ClickException(f"No baseline at {path}; create one with 'record'")
+    result = _run(suite, criteria)
+    if output:
+        _write(result, output)
+    _report(_read(path), result, tolerance)
+
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,171 @@
+"""
+Benchmark suites
+================
+
+A suite is a list of dataset shapes. For every shape and both criteria the
+runner measures ``Tree.fit`` throughput, ``predict_batch`` throughput, the
+peak memory traced during a fit, and the fit time at each worker count in
+``build_jobs``. Timings are the best of ``repeats`` runs, so a run mostly
+reflects the code rather than a noisy neighbour.
+
+A run is a plain dict (see ``run_suite``) that is stored as JSON; ``compare``
+checks a run against a stored baseline metric by metric.
+"""
+
+import os
+import platform
+import time
+import tracemalloc
+import numpy as np
+
+from decisiontree import Tree
+from decisiontree.ImpurityStrategy import Entropy, GiniIndex
+
+from .synthetic import make_classification
+
+CRITERIA = {'entropy': Entropy, 'gini': GiniIndex}
+
+# Whether a larger value of a metric is an improvement
+HIGHER_IS_BETTER = {
+    'fit_rows_per_second': True,
+    'predict_rows_per_second': True,
+    'peak_bytes': False,
+}
+
+SUITES = {
+    'quick': {
+        'repeats': 3,
+        'build_jobs': [1, 2],
+        'cases': [
+            {'n_rows': 5_000, 'n_numeric': 4, 'n_categorical': 4, 'cardinality': 16, 'n_classes': 3},
+            {'n_rows': 5_000, 'n_numeric': 4, 'n_categorical': 4, 'cardinality': 16, 'n_classes': 3,
+             'binning': 'histogram'},
+            {'n_rows': 2_000, 'n_numeric': 0, 'n_categorical': 8, 'cardinality': 64, 'n_classes': 5},
+        ],
+    },
+    'full': {
+        'repeats': 3,
+        'build_jobs': [1, 2, 4],
+        'cases': [
+            {'n_rows': 200_000, 'n_numeric': 8, 'n_categorical': 8, 'cardinality': 32, 'n_classes': 4},
+            {'n_rows': 200_000, 'n_numeric': 8, 'n_categorical': 8, 'cardinality': 32, 'n_classes': 4,
+             'binning': 'histogram'},
+            {'n_rows': 1_000_000, 'n_numeric': 8, 'n_categorical': 4, 'cardinality': 16, 'n_classes': 2,
+             'binning': 'histogram'},
+            {'n_rows': 100_000, 'n_numeric': 16, 'n_categorical': 0, 'n_classes': 3, 'decimals': None},
+            {'n_rows': 100_000, 'n_numeric': 0, 'n_categorical': 16, 'cardinality': 256, 'n_classes': 8},
+        ],
+    },
+}
+
+
+def case_name(criterion: str, case: dict) -> str:
+    """Stable identifier of a measured case, e.g. ``gini/rows=20000/num=4/cat=4/card=16/classes=3``"""
+    parts = [criterion, f"rows={case['n_rows']}", f"num={case.get('n_numeric', 4)}",
+             f"cat={case.get('n_categorical', 4)}", f"card={case.get('cardinality', 8)}",
+             f"classes={case.get('n_classes', 3)}"]
+    if case.get('decimals', 2) is None:
+        parts.append("exact")
+    if case.get('binning'):
+        parts.append(case['binning'])
+    return "/".join(parts)
+
+
+def _best_time(function, repeats: int) -> float:
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _peak_bytes(function) -> int:
+    """Peak memory traced while ``function`` runs"""
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+
+def measure_case(criterion: str, case: dict, repeats: int = 3, build_jobs=(1,)) -> dict:
+    """Every metric of one dataset shape under one criterion"""
+    data = {key: value for key, value in case.items() if key != 'binning'}
+    df = make_classification(**data)
+    binning = case.get('binning')
+
+    def fit(jobs=None):
+        # Small enough tasks that every worker count gets work on every suite size
+        tree = Tree(CRITERIA[criterion](), binning=binning, build_jobs=jobs,
+                    min_task_samples=max(500, len(df) // 16))
+        tree.fit(df, 'label')
+        return tree
+
+    tree = fit()
+    fit_seconds = _best_time(fit, repeats)
+    predict_seconds = _best_time(lambda: tree.predict_batch(df), repeats)
+    n_rows = len(df)
+    result = {
+        'fit_seconds': fit_seconds,
+        'fit_rows_per_second': n_rows / fit_seconds,
+        'predict_seconds': predict_seconds,
+        'predict_rows_per_second': n_rows / predict_seconds,
+        'peak_bytes': _peak_bytes(fit),
+        'nodes': tree.compile().n_nodes,
+        'scaling': {},
+    }
+    for jobs in build_jobs:
+        seconds = fit_seconds if jobs == 1 else _best_time(lambda: fit(jobs), repeats)
+        result['scaling'][str(jobs)] = {'fit_seconds': seconds, 'speedup': fit_seconds / seconds}
+    return result
+
+
+def machine() -> dict:
+    return {
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run_suite(name: str, criteria=tuple(CRITERIA), progress=None) -> dict:
+    """Measure every case of suite ``name``; ``progress(case_name)`` is called before each"""
+    suite = SUITES[name]
+    cases = {}
+    for case in suite['cases']:
+        for criterion in criteria:
+            key = case_name(criterion, case)
+            if progress is not None:
+                progress(key)
+            cases[key] = measure_case(criterion, case, suite['repeats'], suite['build_jobs'])
+    return {'suite': name, 'machine': machine(), 'cases': cases}
+
+
+def compare(baseline: dict, current: dict, tolerance: float = 0.2) -> list:
+    """Metrics of ``current`` worse than ``baseline`` by more than ``tolerance`` (relative).
+
+    Returns one dict per compared metric with the case, metric, both values,
+    the relative change (positive is better) and whether it is a regression.
+    Cases missing from either run are skipped.
+    """
+    rows = []
+    for key, before in baseline['cases'].items():
+        after = current['cases'].get(key)
+        if after is None:
+            continue
+        for metric, higher_is_better in HIGHER_IS_BETTER.items():
+            old, new = before.get(metric), after.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old if higher_is_better else (old - new) / old
+            rows.append({'case': key, 'metric': metric, 'baseline': old, 'current': new,
+                         'change': change, 'regression': change < -tolerance})
+    return rows
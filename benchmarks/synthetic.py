@@ -0,0 +1,50 @@
+"""
+Synthetic classification data
+=============================
+
+Deterministic tables with a controllable shape: rows, numeric and
+categorical feature counts, categorical cardinality, class count, label
+noise and missing values. Each class scores every row from hidden per-class
+weights on the numeric features and per-category effects on the
+categorical ones; the label is the best-scoring class, so trees have real
+structure to find at every size.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def make_classification(n_rows: int = 10_000, n_numeric: int = 4, n_categorical: int = 4,
+                        cardinality: int = 8, n_classes: int = 3, noise: float = 0.1,
+                        missing: float = 0.0, decimals: int | None = 2, seed: int = 0,
+                        target: str = 'label') -> pd.DataFrame:
+    """DataFrame of ``num_i`` (float), ``cat_i`` (str) feature columns and ``target``.
+
+    ``noise`` is the fraction of labels replaced by a random class and
+    ``missing`` the fraction of feature values set to NaN. Numeric values are
+    rounded to ``decimals`` places (None keeps them exact, so nearly every
+    value is distinct). The same arguments always give the same table.
+    """
+    if n_classes < 2:
+        raise ValueError("n_classes must be at least 2")
+    if n_numeric + n_categorical == 0:
+        raise ValueError("At least one feature is needed")
+    rng = np.random.default_rng(seed)
+    columns, scores = {}, np.zeros((n_rows, n_classes))
+    for i in range(n_numeric):
+        values = rng.normal(size=n_rows)
+        scores += np.outer(values, rng.normal(size=n_classes))
+        columns[f'num_{i}'] = values.round(decimals) if decimals is not None else values
+    for i in range(n_categorical):
+        codes = rng.integers(0, cardinality, n_rows)
+        scores += rng.normal(size=(cardinality, n_classes))[codes]
+        columns[f'cat_{i}'] = np.array([f'c{k}' for k in range(cardinality)], dtype=object)[codes]
+    df = pd.DataFrame(columns)
+    if missing > 0:
+        for name in df.columns:
+            df.loc[rng.random(n_rows) < missing, name] = np.nan
+    labels = scores.argmax(axis=1)
+    flip = rng.random(n_rows) < noise
+    labels[flip] = rng.integers(0, n_classes, int(flip.sum()))
+    df[target] = np.array([f'class_{k}' for k in range(n_classes)], dtype=object)[labels]
+    return df
@@ -0,0 +1,27 @@
+import numpy as np
+from .GiniIndex import GiniIndex
+
+class ChiSquare(GiniIndex):
+    """Pearson's chi-square statistic of the branch x class table (CHAID-style).
+
+    Higher means branches and classes are less independent. The statistic
+    grows with the node's size, so it ranks the splits of one node but is no
+    impurity: nodes report their Gini impurity, which min_impurity_decrease
+    and pruning use.
+    """
+
+    def _branch_terms(self, counts, parent):
+        # sum over classes of observed^2 / (branch size x class count), the branch's share of the statistic
+        counts = np.asarray(counts, dtype=np.float64)
+        expected = counts.sum(axis=-1, keepdims=True) * parent
+        return np.divide(counts ** 2, expected, out=np.zeros(np.broadcast_shapes(counts.shape, expected.shape)),
+                         where=expected > 0).sum(axis=-1, keepdims=True)
+
+    def _gains_from_terms(self, terms, parent):
+        # chi2 = sum of (O - E)^2 / E = n * sum of O^2 / (n_b n_c) - n, with E = n_b n_c / n
+        totals = parent.sum(axis=-1)
+        return totals * terms[..., 0] - totals
+
+    def _gain_range(self, n_classes: int) -> float:
+        # Unbounded: the statistic scales with the number of samples
+        return np.inf
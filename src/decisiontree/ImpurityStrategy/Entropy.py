@@ -3,67 +3,52 @@ import numpy as np
 from .Strategy import ImpurityStrategy
 
 class Entropy(ImpurityStrategy):
-    def _get_impurity_measure(self,df: DataFrame, target: str):
-        proportions = df[target].value_counts() / len(df[target])
-        # Handle the case where proportion is 0 to avoid log(0)
-        # If all values are the same (pure), entropy should be 0
-        if len(proportions) == 1:
-            return 0.0
-        # For cases where there are zeros, replace with very small number
-        proportions = proportions.replace(0, 1e-10)
-        return (-proportions * np.log2(proportions)).sum()
-    
+    # n * log2(n) of every integer count below its length, shared by all instances
+    # and grown on demand up to _NLOGN_LIMIT entries; larger or fractional counts are computed
+    _nlogn_table = np.zeros(1)
+    _NLOGN_LIMIT = 1 << 20
+
+    @classmethod
+    def _nlogn(cls, counts) -> np.ndarray:
+        """``counts * log2(counts)`` (0 for 0), looked up for integer counts"""
+        counts = np.asarray(counts)
+        if counts.dtype.kind in 'iu' and counts.size:
+            top = int(counts.max())
+            if top < cls._NLOGN_LIMIT:
+                if top >= len(cls._nlogn_table):
+                    n = np.arange(min(1 << top.bit_length(), cls._NLOGN_LIMIT), dtype=np.float64)
+                    cls._nlogn_table = n * np.log2(n, out=np.zeros_like(n), where=n > 0)
+                return cls._nlogn_table[counts]
+        counts = counts.astype(np.float64)
+        return counts * np.log2(counts, out=np.zeros_like(counts), where=counts > 0)
+
+    def _impurity_from_counts(self, counts):
+        # H = (n log n - sum of c log c) / n, so pure and empty nodes have zero entropy
+        counts = np.asarray(counts)
+        totals = counts.sum(axis=-1)
+        surprisal = self._nlogn(totals) - self._nlogn(counts).sum(axis=-1)
+        return np.divide(surprisal, totals, out=np.zeros(np.shape(totals)), where=totals > 0)
+
+    def _branch_terms(self, counts, parent):
+        # size x entropy of each branch, undivided
+        counts = np.asarray(counts)
+        return (self._nlogn(counts.sum(axis=-1)) - self._nlogn(counts).sum(axis=-1))[..., None]
+
+    def _gains_from_terms(self, terms, parent):
+        # Information gain: parent entropy minus the size-weighted entropy of the branches
+        totals = parent.sum(axis=-1)
+        gain = self._nlogn(totals) - self._nlogn(parent).sum(axis=-1) - terms[..., 0]
+        return np.divide(gain, totals, out=np.zeros(np.shape(totals)), where=totals > 0)
+
     def get_detailed_calculations(self, df: DataFrame, feature: str, target: str):
         """Get detailed step-by-step calculations for a feature split"""
         total_entropy = self._get_impurity_measure(df, target)
-        calculations = {
+        splits, weighted_entropy = self._detailed_splits(df, feature, target, 'entropy')
+        return {
             'feature': feature,
             'total_entropy': total_entropy,
             'total_samples': len(df),
-            'splits': [],
-            'weighted_entropy': 0,
-            'information_gain': 0
+            'splits': splits,
+            'weighted_entropy': weighted_entropy,
+            'information_gain': total_entropy - weighted_entropy
         }
-        
-        weighted_entropy = 0
-        for value in sorted(df[feature].unique()):
-            subset = df[df[feature] == value]
-            proportion = len(subset) / len(df)
-            subset_entropy = self._get_impurity_measure(subset, target)
-            weighted_contribution = proportion * subset_entropy
-            weighted_entropy += weighted_contribution
-            
-            # Get class distribution for this subset
-            class_dist = dict(subset[target].value_counts())
-            
-            split_info = {
-                'value': value,
-                'samples': len(subset),
-                'proportion': proportion,
-                'entropy': subset_entropy,
-                'weighted_contribution': weighted_contribution,
-                'class_distribution': class_dist
-            }
-            calculations['splits'].append(split_info)
-        
-        calculations['weighted_entropy'] = weighted_entropy
-        calculations['information_gain'] = total_entropy - weighted_entropy
-        return calculations
-    
-    def _get_splitting_criterion(self,df: DataFrame, curr_feature: str, target: str):
-        total_entropy = self._get_impurity_measure(df,target)
-        weighted_entropy = 0
-        for value in df[curr_feature].unique():
-            subset = df[df[curr_feature] == value]
-            proportion = len(subset) / len(df)
-            weighted_entropy += (proportion * self._get_impurity_measure(subset, target))
-        info_gain = total_entropy - weighted_entropy
-        return info_gain
-    
-    def get_best_feature(self, df: DataFrame, target: str):
-        features = [f for f in df.columns if f != target]
-        info_gains = {}
-        for feature in features:
-            info_gains[feature] = self._get_splitting_criterion(df,feature,target)
-        max_info = max(info_gains, key = info_gains.get) # pyright: ignore[reportArgumentType, reportCallIssue]
-        return max_info, info_gains[max_info]
\ No newline at end of file
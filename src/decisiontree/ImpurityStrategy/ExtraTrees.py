@@ -0,0 +1,68 @@
+import numpy as np
+
+from .RandomSubspace import RandomSubspace
+from .Strategy import ImpurityStrategy
+from ..dataset import Dataset
+
+
+class ExtraTrees(RandomSubspace):
+    """Extremely randomized splits: one random threshold per numeric feature.
+
+    Instead of sweeping every cut, each candidate numeric feature is cut once
+    at a threshold drawn uniformly between the node's smallest and largest
+    value (NaN, if present, still goes right), and the wrapped criterion only
+    picks the best of those random cuts. Categorical features keep their
+    multiway split, which has nothing to draw. ``max_features`` and seeding
+    work as in RandomSubspace.
+    """
+    presorted = False
+
+    def _search(self, df, target: str, samples, orders, histograms, trace, min_samples_leaf):
+        # The generic search: its threshold hooks (_threshold_sweep, _histogram_sweep) are this
+        # class's random cuts and its gains the wrapped criterion's kernel, which RandomSubspace
+        # delegates. One draw per feature, made up front in feature order, keeps threaded scoring
+        # reproducible
+        features = self._features(df, target)
+        self._draws = dict(zip(features, self._rng(1).random(len(features))))
+        return ImpurityStrategy.get_best_split(self, df, target, samples, orders, histograms, trace,
+                                               min_samples_leaf)
+
+    def _random_cut(self, data: Dataset, feature: str, present: np.ndarray):
+        """Random split code among the ``present`` codes of a numeric feature, or None if it has no cut"""
+        position = data.feature_position(feature)
+        vocabulary = data.vocabularies[position]
+        values = np.flatnonzero(present & ~np.isnan(vocabulary.astype(np.float64)))
+        if len(values) == 0:
+            return None
+        low, high = values[0], values[-1]
+        if low == high:
+            # One value besides NaN: the only cut separates the two
+            return int(low) if present[low + 1:].any() else None
+        threshold = vocabulary[low] + self._draws[feature] * (vocabulary[high] - vocabulary[low])
+        code = int(np.searchsorted(vocabulary, threshold, side='right')) - 1
+        return min(max(code, int(low)), int(high) - 1)
+
+    def _cut(self, data: Dataset, feature: str, histogram: np.ndarray, min_samples_leaf: int):
+        split_code = self._random_cut(data, feature, histogram.any(axis=1))
+        if split_code is None:
+            return None
+        table = np.stack([histogram[:split_code + 1].sum(axis=0), histogram[split_code + 1:].sum(axis=0)])
+        if table.sum(axis=1).min() < min_samples_leaf:
+            return None
+        return self._threshold_value(data, data.feature_position(feature), split_code), split_code, table
+
+    def _threshold_sweep(self, data: Dataset, feature: str, samples=None, order=None, min_samples_leaf: int = 1):
+        """Random cut of a numeric feature; returns what ImpurityStrategy._threshold_sweep does"""
+        position = data.feature_position(feature)
+        rows = np.arange(data.n_samples) if samples is None else samples
+        histogram = self._histograms_of(data, position, rows)
+        return self._cut(data, feature, histogram, min_samples_leaf)
+
+    def _histogram_sweep(self, data: Dataset, feature: str, histogram: np.ndarray, min_samples_leaf: int = 1):
+        return self._cut(data, feature, histogram, min_samples_leaf)
+
+    @staticmethod
+    def _histograms_of(data: Dataset, position: int, rows: np.ndarray) -> np.ndarray:
+        n_values = len(data.vocabularies[position])
+        keys = data.columns[position][rows].astype(np.intp) * data.n_classes + data.y[rows]
+        return data.tally(keys, rows, n_values * data.n_classes).reshape(n_values, data.n_classes)
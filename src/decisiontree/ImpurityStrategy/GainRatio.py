@@ -0,0 +1,26 @@
+import numpy as np
+from .Entropy import Entropy
+
+class GainRatio(Entropy):
+    """C4.5's gain ratio: information gain divided by the split's own entropy.
+
+    The split information penalises splits into many small branches, which
+    plain information gain favours. A split with a single non-empty branch
+    has no split information and scores 0. Nodes report their entropy.
+    """
+
+    def _branch_terms(self, counts, parent):
+        counts = np.asarray(counts)
+        sizes = self._nlogn(counts.sum(axis=-1))
+        return np.stack([sizes - self._nlogn(counts).sum(axis=-1), sizes], axis=-1)
+
+    def _gains_from_terms(self, terms, parent):
+        gain = super()._gains_from_terms(terms[..., :1], parent)
+        totals = parent.sum(axis=-1)
+        split_information = np.divide(self._nlogn(totals) - terms[..., 1], totals,
+                                      out=np.zeros(np.shape(totals)), where=totals > 0)
+        return np.divide(gain, split_information, out=np.zeros(np.shape(gain)), where=split_information > 0)
+
+    def _gain_range(self, n_classes: int) -> float:
+        # The gain never exceeds the split information
+        return 1.0
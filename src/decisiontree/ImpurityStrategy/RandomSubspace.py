@@ -0,0 +1,140 @@
+from pandas import DataFrame
+import numpy as np
+
+from .Strategy import ImpurityStrategy
+
+_MAX_FEATURES = ("sqrt", "log2")
+
+
+class RandomSubspace(ImpurityStrategy):
+    """Search only a random subset of the features at every node.
+
+    Wraps an exhaustive ``criterion`` (Entropy, GiniIndex): each node draws
+    ``max_features`` of its non-constant features (an int, a fraction, "sqrt"
+    or "log2" of their number; None for all) and lets the criterion score only
+    those. If none of them has an allowed split the remaining features are
+    searched too, so a node is never left unsplit just for its draw.
+
+    Draws are seeded per node from ``random_state`` and the node's sample
+    indices, so a tree is reproducible and the same whether it is built
+    serially or in worker processes.
+    """
+    accepts_dataset = True
+    exhaustive = False
+
+    def __init__(self, criterion: ImpurityStrategy, max_features=None, random_state=None):
+        if not criterion.accepts_dataset:
+            raise ValueError(f"{type(criterion).__name__} cannot be randomized; it has no count kernels")
+        if not (max_features is None or max_features in _MAX_FEATURES
+                or isinstance(max_features, float) and 0 < max_features <= 1
+                or isinstance(max_features, (int, np.integer)) and not isinstance(max_features, bool)
+                and max_features >= 1):
+            raise ValueError(f"max_features must be None, 'sqrt', 'log2', a fraction in (0, 1] "
+                             f"or a positive int, not {max_features!r}")
+        self.criterion = criterion
+        self.max_features = max_features
+        self.random_state = random_state
+        self._seed = (random_state if isinstance(random_state, np.random.SeedSequence)
+                      else np.random.SeedSequence(random_state))
+        self._calls = 0
+        self._node_key = ()
+
+    # Feature-scoring threads belong to the wrapped criterion
+    @property
+    def n_jobs(self):
+        return self.criterion.n_jobs
+
+    @n_jobs.setter
+    def n_jobs(self, n_jobs):
+        self.criterion.n_jobs = n_jobs
+
+    def threads(self):
+        return self.criterion.threads()
+
+    def seeded(self, random_state) -> "RandomSubspace":
+        """Copy drawing from ``random_state`` instead, e.g. one per tree of a forest"""
+        copy = self.__class__.__new__(self.__class__)
+        copy.__dict__.update(self.__getstate__())
+        copy.random_state = random_state
+        copy._seed = (random_state if isinstance(random_state, np.random.SeedSequence)
+                      else np.random.SeedSequence(random_state))
+        return copy
+
+    def _impurity_from_counts(self, counts):
+        return self.criterion._impurity_from_counts(counts)
+
+    def _branch_terms(self, counts, parent):
+        return self.criterion._branch_terms(counts, parent)
+
+    def _gains_from_terms(self, terms, parent):
+        return self.criterion._gains_from_terms(terms, parent)
+
+    def _gain_range(self, n_classes: int) -> float:
+        return self.criterion._gain_range(n_classes)
+
+    def _get_impurity_measure(self, df: DataFrame, target: str):
+        return self.criterion._get_impurity_measure(df, target)
+
+    def _get_splitting_criterion(self, df: DataFrame, curr_feature: str, target: str, samples=None, order=None):
+        return self.criterion._get_splitting_criterion(df, curr_feature, target, samples, order)
+
+    def get_detailed_calculations(self, df: DataFrame, feature: str, target: str):
+        return self.criterion.get_detailed_calculations(df, feature, target)
+
+    def _rng(self, *key) -> np.random.Generator:
+        """Generator for ``key`` below the current node"""
+        spawn_key = self._seed.spawn_key + self._node_key + key
+        return np.random.default_rng(np.random.SeedSequence(self._seed.entropy, spawn_key=spawn_key))
+
+    def _enter_node(self, samples) -> None:
+        if samples is None:
+            # No sample indices to identify the node by; number the calls instead
+            self._calls += 1
+            self._node_key = (0, self._calls)
+        else:
+            samples = np.asarray(samples)
+            self._node_key = (len(samples), int(samples.sum()), int(samples[0]) if len(samples) else 0)
+
+    def _n_features(self, n_features: int) -> int:
+        max_features = self.max_features
+        if max_features is None:
+            return n_features
+        if max_features == "sqrt":
+            n = int(np.sqrt(n_features))
+        elif max_features == "log2":
+            n = int(np.log2(n_features))
+        elif isinstance(max_features, float):
+            n = int(max_features * n_features)
+        else:
+            n = int(max_features)
+        return min(n_features, max(1, n))
+
+    def _search(self, df, target: str, samples, orders, histograms, trace, min_samples_leaf):
+        return self.criterion.get_best_split(df, target, samples, orders, histograms, trace, min_samples_leaf)
+
+    def get_best_split(self, df: DataFrame, target: str, samples=None, orders=None, histograms=None, trace=None,
+                       min_samples_leaf=1):
+        """Best split among a random subset of the features, scored as the wrapped criterion does"""
+        df = self._encoded(df, target)
+        self._enter_node(samples)
+        features = self._features(df, target)
+        n_drawn = self._n_features(len(features))
+        drawn = np.sort(self._rng(0).permutation(len(features))[:n_drawn]) if n_drawn < len(features) \
+            else np.arange(len(features))
+        rest = np.setdiff1d(np.arange(len(features)), drawn)
+        orders, histograms = orders or {}, histograms or {}
+        for subset in (drawn, rest):
+            if not len(subset):
+                continue
+            names = [features[i] for i in subset]
+            best = self._search(df.select(names), target, samples,
+                                {f: orders[f] for f in names if f in orders},
+                                {f: histograms[f] for f in names if f in histograms},
+                                trace, min_samples_leaf)
+            if best[0] is not None:
+                return best
+        return None, None, None
+
+    def get_best_feature(self, df: DataFrame, target: str, samples=None):
+        best_feature, score, _ = self.get_best_split(df, target, samples)
+        return best_feature, score
@@ -1,27 +1,348 @@
-from abc import ABC, abstractmethod
+from abc import ABC
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import os
+import numpy as np
 import pandas as pd
 
+from ..dataset import Dataset, _midpoint
+
 
 class ImpurityStrategy(ABC):
-    def __init__(self):
-        pass
-    
-    @abstractmethod
-    def _get_impurity_measure(self,df:pd.DataFrame, target: str):
-        raise NotImplementedError
-    
-    @abstractmethod
-    def _get_splitting_criterion(self, df: pd.DataFrame, curr_feature: str, target: str):
-        raise NotImplementedError
-    
-    @abstractmethod
-    def get_best_feature(self, df: pd.DataFrame, target: str):
-        raise NotImplementedError
+    # Whether the methods below accept an encoded Dataset as well as a DataFrame.
+    # Strategies that only understand DataFrames are handed a decoded frame.
+    # Subclasses that implement _impurity_from_counts get the count kernels and
+    # are set True unless they say otherwise (see __init_subclass__).
+    accepts_dataset = False
+    # Whether every candidate split is searched, so builders with their own
+    # vectorized search (levelwise, outofcore) grow the same tree
+    exhaustive = True
+    # Whether numeric splits are searched along the node's presorted samples,
+    # which the recursive builder then keeps partitioned
+    presorted = True
+    # Feature-scoring threads kept open by ``threads``
+    _pool = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        counted = cls._impurity_from_counts is not ImpurityStrategy._impurity_from_counts
+        if counted and 'accepts_dataset' not in cls.__dict__:
+            cls.accepts_dataset = True
+
+    def __init__(self, n_jobs: int | None = None):
+        """``n_jobs`` threads score candidate features in parallel (-1: one per core)."""
+        self.n_jobs = n_jobs
     
+    def _get_impurity_measure(self, df: pd.DataFrame, target: str):
+        """Impurity of the target's class counts"""
+        return float(self._impurity_from_counts(self._class_counts(df, target)))
+
+    def _get_splitting_criterion(self, df: pd.DataFrame, curr_feature: str, target: str, samples=None, order=None):
+        """Gain of the split ``curr_feature`` makes (see split_gains)"""
+        _, _, table, _ = self._split_table(df, curr_feature, target, samples, order)
+        return float(self.split_gains(table))
+
+    def get_best_feature(self, df: pd.DataFrame, target: str, samples=None):
+        best_feature, gain, _ = self.get_best_split(df, target, samples)
+        return best_feature, gain
+
+    def get_best_split(self, df: pd.DataFrame, target: str, samples=None, orders=None, histograms=None, trace=None,
+                       min_samples_leaf=1):
+        """Best feature, its gain and its threshold (None if categorical).
+
+        ``orders`` maps numeric features to the node's samples presorted by that feature,
+        ``histograms`` maps features to the node's value (or bin) x class counts.
+        ``trace(feature, branches, table, threshold, score)`` sees every scored split.
+        Splits with a branch under ``min_samples_leaf`` samples are not considered;
+        if none is left the feature is None."""
+        df = self._encoded(df, target)
+        orders, histograms = orders or {}, histograms or {}
+        def score(feature):
+            split = self._split_table(df, feature, target, samples, orders.get(feature), histograms.get(feature),
+                                      min_samples_leaf)
+            if split is None:
+                return -np.inf, None, None, None
+            branches, _, table, threshold = split
+            return float(self.split_gains(table)), threshold, branches, table
+        features = self._features(df, target)
+        scores = self._map_features(score, features)
+        if trace is not None:
+            self._trace_scores(trace, features, scores)
+        # First of the best, so ties go to the earlier feature
+        gains = [gain for gain, *_ in scores]
+        best = int(np.argmax(gains))
+        if gains[best] == -np.inf:
+            return None, None, None
+        return features[best], gains[best], scores[best][1]
+
     def get_detailed_calculations(self, df: pd.DataFrame, feature: str, target: str):
         """Get detailed step-by-step calculations for a feature split.
         Default implementation returns basic information."""
         return {
             'feature': feature,
             'gain': self._get_splitting_criterion(df, feature, target)
-        }
\ No newline at end of file
+        }
+
+    def _map_features(self, score, features) -> list:
+        """``score(feature)`` for every feature, in order, over ``n_jobs`` threads.
+
+        Workers share the encoded columns of the calling thread; the NumPy
+        kernels they run release the GIL. Results come back in feature order, so
+        the choice among them (ties included) does not depend on the worker count.
+        """
+        n_jobs = min(self._n_threads(), len(features))
+        if n_jobs <= 1:
+            return [score(feature) for feature in features]
+        if self._pool is not None:
+            return list(self._pool.map(score, features))
+        with ThreadPoolExecutor(n_jobs) as pool:
+            return list(pool.map(score, features))
+
+    def _n_threads(self) -> int:
+        n_jobs = getattr(self, 'n_jobs', None) or 1
+        return (os.cpu_count() or 1) if n_jobs < 0 else n_jobs
+
+    @contextmanager
+    def threads(self):
+        """Keep one pool of ``n_jobs`` feature-scoring threads for the block, e.g. one fit.
+
+        Outside such a block every search starts and shuts down its own pool;
+        no thread outlives the block."""
+        n_jobs = self._n_threads()
+        if n_jobs <= 1 or self._pool is not None:
+            yield
+            return
+        with ThreadPoolExecutor(n_jobs) as pool:
+            self._pool = pool
+            try:
+                yield
+            finally:
+                self._pool = None
+
+    @staticmethod
+    def _trace_scores(trace, features, scores) -> None:
+        """Report each feature's (score, threshold, branches, table), in feature order"""
+        for feature, (score, threshold, branches, table) in zip(features, scores):
+            # Features without an allowed split have no table to report
+            if table is not None:
+                trace(feature, branches, table, threshold, score)
+
+    def __getstate__(self):
+        # Thread pools do not pickle; a copy opens its own
+        state = self.__dict__.copy()
+        state.pop('_pool', None)
+        return state
+
+    def _impurity_from_counts(self, counts: np.ndarray):
+        """Impurity of every class-count vector along the last axis of ``counts``"""
+        raise NotImplementedError
+
+    # Split kernel. A criterion scores a split from its branch x class count
+    # table as ``_gains_from_terms(sum of _branch_terms over the branches)``:
+    # the per-branch terms add up, so dense tables, ragged runs of branches
+    # (see levelwise) and the two sides of every threshold are all scored by
+    # a few array operations, however many splits there are. Gains are
+    # always higher-is-better. The default terms are size x impurity, giving
+    # the impurity decrease.
+
+    def _branch_terms(self, counts: np.ndarray, parent: np.ndarray) -> np.ndarray:
+        """Additive terms (..., k) of branches with class ``counts`` (..., C) of nodes with class counts ``parent``"""
+        sizes = counts.sum(axis=-1)
+        return (sizes * self._impurity_from_counts(counts))[..., None]
+
+    def _gains_from_terms(self, terms: np.ndarray, parent: np.ndarray) -> np.ndarray:
+        """Gains of splits whose branch terms sum to ``terms``, of nodes with class counts ``parent``"""
+        totals = parent.sum(axis=-1)
+        weighted = np.divide(terms[..., 0], totals, out=np.zeros(np.shape(totals)), where=totals > 0)
+        return self._impurity_from_counts(parent) - weighted
+
+    def _gain_range(self, n_classes: int) -> float:
+        """Largest gain any split over ``n_classes`` classes can reach"""
+        return float(self._impurity_from_counts(np.ones(n_classes)))
+
+    def split_gains(self, tables: np.ndarray) -> np.ndarray:
+        """Gain of every branch x class table along the last two axes of ``tables``"""
+        tables = np.asarray(tables)
+        parent = tables.sum(axis=-2)
+        terms = self._branch_terms(tables, parent[..., None, :]).sum(axis=-2)
+        return self._gains_from_terms(terms, parent)
+
+    def _binary_gains(self, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        """Gains of two-way splits into ``left`` and ``right`` class counts, without stacking them"""
+        parent = left + right
+        return self._gains_from_terms(self._branch_terms(left, parent) + self._branch_terms(right, parent), parent)
+
+    def _weighted_impurity(self, table: np.ndarray) -> float:
+        """Sample-weighted impurity of the branches (rows) of a value x class table"""
+        sizes = table.sum(axis=1)
+        return float((sizes * self._impurity_from_counts(table)).sum() / sizes.sum())
+
+    @staticmethod
+    def _encoded(data, target: str) -> Dataset:
+        """``data`` as a Dataset, encoding a DataFrame once for all features"""
+        return data if isinstance(data, Dataset) else Dataset(data, target)
+
+    @staticmethod
+    def _features(data, target: str):
+        """Candidate feature names of a DataFrame or Dataset"""
+        if isinstance(data, Dataset):
+            return list(data.feature_names)
+        return [f for f in data.columns if f != target]
+
+    @staticmethod
+    def _class_counts(data, target: str) -> np.ndarray:
+        """Per-class sample counts of the target"""
+        if isinstance(data, Dataset):
+            return data.tally(data.y, minlength=data.n_classes)
+        return data[target].value_counts().to_numpy()
+
+    @staticmethod
+    def _contingency(data, feature: str, target: str, samples=None):
+        """Value x class count table of ``feature``, from a single bincount.
+
+        ``samples`` optionally restricts a Dataset to those row positions.
+        Returns (values, classes, table) where ``values`` labels the rows and
+        ``classes`` the columns. Rows of values absent from ``data`` are dropped.
+        """
+        if not isinstance(data, Dataset):
+            data = Dataset(data[[feature, target]], target)
+        position = data.feature_position(feature)
+        values = data.vocabularies[position]
+        n_values, n_classes = len(values), data.n_classes
+        codes, y = data.columns[position], data.y
+        if samples is not None:
+            codes, y = codes[samples], y[samples]
+        keys = codes.astype(np.intp) * n_classes + y
+        table = data.tally(keys, samples, n_values * n_classes).reshape(n_values, n_classes)
+        present = table.any(axis=1)
+        return values[present], data.classes, table[present]
+
+    def _best_cut(self, cumulative: np.ndarray, cuts: np.ndarray, min_samples_leaf: int = 1):
+        """Highest gain among the candidate ``cuts``, all scored in one kernel call.
+
+        ``cumulative[i]`` holds the class counts of everything ordered up to and
+        including position ``i``; a cut at ``i`` sends exactly that to the left.
+        Cuts leaving fewer than ``min_samples_leaf`` samples on a side are skipped.
+        Returns (index into ``cuts``, 2 x class table of the best cut), or None
+        if no cut is allowed.
+        """
+        left = cumulative[cuts]
+        right = cumulative[-1] - left
+        gains = self._binary_gains(left, right)
+        if min_samples_leaf > 1:
+            sizes_left = left.sum(axis=1)
+            total = cumulative[-1].sum()
+            allowed = (sizes_left >= min_samples_leaf) & (total - sizes_left >= min_samples_leaf)
+            if not allowed.any():
+                return None
+            gains = np.where(allowed, gains, -np.inf)
+        best = int(np.argmax(gains))
+        return best, np.stack([left[best], right[best]])
+
+    def _threshold_sweep(self, data: Dataset, feature: str, samples=None, order=None, min_samples_leaf: int = 1):
+        """Best binary ``feature <= threshold`` cut of a numeric feature, in one pass.
+
+        ``order`` is the node's samples already sorted by the feature (otherwise
+        they are sorted here). Cumulative class counts along that order give the
+        left/right tables of every cut between distinct values at once.
+        Returns (threshold, split code, 2 x class table), or None if the feature is
+        constant or no cut leaves ``min_samples_leaf`` samples on both sides.
+        This and _histogram_sweep are the only places a threshold is chosen;
+        strategies that choose differently override both (see ExtraTrees).
+        """
+        position = data.feature_position(feature)
+        codes = data.columns[position]
+        if order is None:
+            order = np.arange(len(codes)) if samples is None else samples
+            order = order[np.argsort(codes[order], kind='stable')]
+        sorted_codes = codes[order]
+        cuts = np.flatnonzero(sorted_codes[1:] != sorted_codes[:-1])
+        if len(cuts) == 0:
+            return None
+        weights = 1 if data.weights is None else data.weights[order]
+        onehot = np.zeros((len(order), data.n_classes), dtype=np.int64 if np.ndim(weights) == 0
+                          or weights.dtype.kind in 'iu' else np.float64)
+        onehot[np.arange(len(order)), data.y[order]] = weights
+        found = self._best_cut(np.cumsum(onehot, axis=0), cuts, min_samples_leaf)
+        if found is None:
+            return None
+        best, table = found
+        split_code = int(sorted_codes[cuts[best]])
+        return self._threshold_value(data, position, split_code), split_code, table
+
+    def _histogram_sweep(self, data: Dataset, feature: str, histogram: np.ndarray, min_samples_leaf: int = 1):
+        """Same as _threshold_sweep, from a node's bin x class histogram in O(bins)"""
+        position = data.feature_position(feature)
+        cuts = np.flatnonzero(histogram.any(axis=1))[:-1]
+        if len(cuts) == 0:
+            return None
+        found = self._best_cut(np.cumsum(histogram, axis=0), cuts, min_samples_leaf)
+        if found is None:
+            return None
+        best, table = found
+        split_code = int(cuts[best])
+        return self._threshold_value(data, position, split_code), split_code, table
+
+    @staticmethod
+    def _threshold_value(data: Dataset, position: int, split_code: int) -> float:
+        """Threshold equivalent to ``code <= split_code`` on raw feature values.
+
+        Binned columns store it as the bin's upper bound; otherwise it is the
+        midpoint between the split value and the next one (NaN, if present, sorts last).
+        """
+        vocabulary = data.vocabularies[position]
+        if data.binned[position]:
+            return float(vocabulary[split_code])
+        return float(_midpoint(vocabulary[split_code], vocabulary[split_code + 1]))
+
+    def _split_table(self, data, feature: str, target: str, samples=None, order=None, histogram=None,
+                     min_samples_leaf: int = 1):
+        """Branch x class table of the split ``feature`` would make.
+
+        Categorical features branch on every value; numeric ones on the best
+        threshold. A precomputed value x class ``histogram`` of the node replaces
+        any pass over its samples. Returns (branch labels, classes, table,
+        threshold), with threshold None for categorical splits, or None if every
+        split of the feature has a branch under ``min_samples_leaf`` samples.
+        """
+        if not isinstance(data, Dataset):
+            data = Dataset(data[[feature, target]], target)
+        position = data.feature_position(feature)
+        sweep = None
+        if data.numeric[position]:
+            if histogram is not None:
+                sweep = self._histogram_sweep(data, feature, histogram, min_samples_leaf)
+            else:
+                sweep = self._threshold_sweep(data, feature, samples, order, min_samples_leaf)
+            if sweep is None and min_samples_leaf > 1:
+                return None
+        if sweep is not None:
+            threshold, _, table = sweep
+            return np.array([f"<= {threshold:g}", f"> {threshold:g}"], dtype=object), data.classes, table, threshold
+        if histogram is not None:
+            present = histogram.any(axis=1)
+            values, classes, table = data.vocabularies[position][present], data.classes, histogram[present]
+        else:
+            values, classes, table = self._contingency(data, feature, target, samples)
+        if min_samples_leaf > 1 and table.sum(axis=1).min() < min_samples_leaf:
+            return None
+        return values, classes, table, None
+
+    def _detailed_splits(self, data, feature: str, target: str, impurity_key: str):
+        """Per-branch breakdown used by get_detailed_calculations, plus the weighted impurity"""
+        values, classes, table, threshold = self._split_table(data, feature, target)
+        sizes = table.sum(axis=1)
+        proportions = sizes / sizes.sum()
+        impurities = self._impurity_from_counts(table)
+        splits = []
+        for value, size, proportion, impurity, counts in zip(values, sizes, proportions, impurities, table):
+            splits.append({
+                'value': value,
+                'condition': f"{feature} {value}" if threshold is not None else f"{feature} = {value}",
+                'samples': int(size),
+                'proportion': float(proportion),
+                impurity_key: float(impurity),
+                'weighted_contribution': float(proportion * impurity),
+                'class_distribution': {classes[c]: int(n) for c, n in enumerate(counts) if n > 0}
+            })
+        return splits, float(np.dot(proportions, impurities))
@@ -1,3 +1,7 @@
 from .Strategy import ImpurityStrategy
 from .Entropy import Entropy
-from .GiniIndex import GiniIndex
\ No newline at end of file
+from .GiniIndex import GiniIndex
+from .GainRatio import GainRatio
+from .ChiSquare import ChiSquare
+from .RandomSubspace import RandomSubspace
+from .ExtraTrees import ExtraTrees
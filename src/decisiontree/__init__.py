@@ -1,2 +1,10 @@
 from .ImpurityStrategy import Strategy
-from .tree import Tree
\ No newline at end of file
+from .dataset import Dataset
+from .tree import Tree
+from .forest import RandomForest
+from .serialization import save_model, load_model, export_json
+from .registry import ModelRegistry
+from .streaming import predict_csv
+from .trace import TextSink, JsonlSink, ListSink
+from .hoeffding import HoeffdingTree
+from .tuning import cross_validate, grid_search
@@ -3,7 +3,8 @@
 Decision Tree Classifier CLI
 ============================
 
-Build decision trees from CSV data with detailed metric calculations.
+Build decision trees from CSV data with detailed metric calculations, train
+models into the binary model format and predict with them.
 """
 
 import click
@@ -11,7 +12,11 @@ import pandas as pd
 from pathlib import Path
 
 from .tree import Tree
-from .ImpurityStrategy import GiniIndex, Entropy
+from .ImpurityStrategy import GiniIndex, Entropy, GainRatio, ChiSquare
+from .serialization import save_model, load_model, export_json
+from .streaming import predict_csv
+from .trace import JsonlSink
+from .profile import Profiler
 
 
 def validate_csv_file(ctx, param, value):
@@ -34,51 +39,196 @@ def validate_csv_file(ctx, param, value):
     return value
 
 
-@click.command()
-@click.option('--file', '-f', required=True, callback=validate_csv_file,
-              help='Path to the CSV file')
-@click.option('--target', '-t', required=True,
-              help='Name of the target column to predict')
-@click.option('--criterion', '-c', type=click.Choice(['gini', 'entropy'], case_sensitive=False),
-              default='gini', help='Impurity criterion (default: gini)')
-def build_tree(file, target, criterion):
-    """Build a decision tree from CSV data showing detailed calculations.
-    
-    This command loads a CSV dataset, builds a decision tree using the specified
-    criterion, and displays intermediate metric calculations and the final tree.
-    
-    Example:
-        decisiontree -f data.csv -t species -c entropy
-    """
-    
-    # Load dataset
+def load_training_data(file, target):
+    """Read a CSV file and check that ``target`` is one of its columns"""
     try:
         df = pd.read_csv(file)
         print(f"Loaded dataset: {file}")
     except Exception as e:
         print(f"Error loading dataset: {e}")
         raise click.Abort()
-    
-    # Validate target column
+
     if target not in df.columns:
         available_cols = ', '.join(df.columns.tolist())
         print(f"Error: Target column '{target}' not found")
         print(f"Available columns: {available_cols}")
         raise click.Abort()
+    return df
+
+
+CRITERIA = {'gini': GiniIndex, 'entropy': Entropy, 'gain_ratio': GainRatio, 'chi_square': ChiSquare}
+
+
+def make_criterion(criterion):
+    return CRITERIA.get(criterion.lower(), GiniIndex)()
+
+
+def stopping_options(command):
+    """Pre-pruning options shared by the tree-growing commands, named as Tree's arguments"""
+    options = [
+        click.option('--max-depth', type=click.IntRange(min=0), help='Stop growing at this depth'),
+        click.option('--min-samples-split', default=2, show_default=True, type=click.IntRange(min=2),
+                     help='Only split nodes with at least this many samples'),
+        click.option('--min-samples-leaf', default=1, show_default=True, type=click.IntRange(min=1),
+                     help='Only consider splits leaving at least this many samples in every branch'),
+        click.option('--min-impurity-decrease', default=0.0, show_default=True, type=click.FloatRange(min=0),
+                     help='Only split where the weighted impurity decrease is at least this much'),
+        click.option('--max-leaf-nodes', type=click.IntRange(min=2),
+                     help='Grow best-first until the tree has this many leaves'),
+    ]
+    for option in reversed(options):
+        command = option(command)
+    return command
+
+
+@click.group()
+def cli():
+    """Decision tree classifier: build, train and predict from CSV data."""
+
+
+@cli.command('build')
+@click.option('--file', '-f', required=True, callback=validate_csv_file,
+              help='Path to the CSV file')
+@click.option('--target', '-t', required=True,
+              help='Name of the target column to predict')
+@click.option('--criterion', '-c', type=click.Choice(list(CRITERIA), case_sensitive=False),
+              default='gini', help='Impurity criterion (default: gini)')
+@stopping_options
+def build_tree(file, target, criterion, **limits):
+    """Build a decision tree from CSV data showing detailed calculations.
     
-    # Get criterion
-    if criterion.lower() == 'entropy':
-        criterion_obj = Entropy()
-    else:
-        criterion_obj = GiniIndex()
+    This command loads a CSV dataset, builds a decision tree using the specified
+    criterion, and displays intermediate metric calculations and the final tree.
     
+    Example:
+        decisiontree build -f data.csv -t species -c entropy
+    """
+    df = load_training_data(file, target)
+
     # Build tree with verbose output
-    tree = Tree(criterion_obj, verbose=True)
+    tree = Tree(make_criterion(criterion), verbose=True, **limits)
     tree.fit(df, target)
     
     # Display the final tree
     tree.display_tree()
 
 
+@cli.command()
+@click.option('--file', '-f', required=True, callback=validate_csv_file,
+              help='Path to the training CSV file')
+@click.option('--target', '-t', required=True,
+              help='Name of the target column to predict')
+@click.option('--criterion', '-c', type=click.Choice(list(CRITERIA), case_sensitive=False),
+              default='gini', help='Impurity criterion (default: gini)')
+@click.option('--output', '-o', type=click.Path(dir_okay=False),
+              help='Binary model file to write (.npz)')
+@click.option('--export-json', 'json_output', type=click.Path(dir_okay=False),
+              help='Also write a human-readable JSON view of the tree')
+@click.option('--verbose/--quiet', default=False,
+              help='Show the split calculations while building (default: quiet)')
+@click.option('--chunksize', type=click.IntRange(min=1),
+              help='Train out of core, streaming the file this many rows at a time once per tree level')
+@click.option('--trace', 'trace_output', type=click.Path(dir_okay=False),
+              help='Write structured build events to this file, one JSON object per line')
+@click.option('--profile', 'profile_output', type=click.Path(dir_okay=False),
+              help='Write a JSON report of phase timings, memory peaks and counters to this file')
+@stopping_options
+@click.option('--ccp-alpha', default=0.0, show_default=True, type=click.FloatRange(min=0),
+              help='Cost-complexity prune the fitted tree at this alpha')
+def train(file, target, criterion, output, json_output, verbose, chunksize, trace_output, profile_output, ccp_alpha,
+          **limits):
+    """Train a decision tree and save it in the binary model format.
+    
+    Example:
+        decisiontree train -f data.csv -t species -c entropy -o model.npz
+    """
+    sink = JsonlSink(trace_output) if trace_output else None
+    tree = Tree(make_criterion(criterion), verbose=verbose, trace=sink, profile=bool(profile_output),
+                **limits)
+    try:
+        if chunksize:
+            try:
+                tree.fit_csv(file, target, chunksize=chunksize)
+            except (KeyError, ValueError) as e:
+                print(f"Error: {e.args[0]}")
+                raise click.Abort()
+        else:
+            tree.fit(load_training_data(file, target), target)
+    finally:
+        if sink is not None:
+            sink.close()
+    if ccp_alpha > 0:
+        tree.prune(ccp_alpha)
+    compiled = tree.compile()
+    print(f"Trained tree: {compiled.n_nodes} nodes, {len(tree.dataset.classes)} classes")
+    if profile_output:
+        tree.profiler.save(profile_output)
+        print(f"Profile saved to: {profile_output}")
+
+    if output:
+        save_model(tree, output)
+        print(f"Model saved to: {output}")
+    if json_output:
+        export_json(tree, json_output)
+        print(f"JSON view saved to: {json_output}")
+    if not output and not json_output:
+        tree.display_tree()
+
+
+@cli.command()
+@click.option('--model', '-m', required=True, type=click.Path(exists=True, dir_okay=False),
+              help='Binary model file written by train')
+@click.option('--file', '-f', 'test_file', required=True, callback=validate_csv_file,
+              help='CSV file with the rows to predict')
+@click.option('--output', '-o', type=click.Path(dir_okay=False),
+              help='CSV file for the rows plus a prediction column (default: standard output)')
+@click.option('--chunksize', default=100_000, show_default=True, type=click.IntRange(min=1),
+              help='Rows read and predicted at a time')
+@click.option('--keep', '-k', multiple=True,
+              help='Input column to copy to the output, e.g. an ID (repeatable; default: all)')
+@click.option('--progress/--no-progress', default=False,
+              help='Report rows and rows/s on standard error while predicting')
+@click.option('--profile', 'profile_output', type=click.Path(dir_okay=False),
+              help='Write a JSON report of encoding and prediction timings and memory peaks to this file')
+def predict(model, test_file, output, chunksize, keep, progress, profile_output):
+    """Predict every row of a CSV file with a saved model.
+    
+    The file is streamed in chunks, so it may be larger than memory;
+    predictions are written incrementally in input row order.
+    
+    Example:
+        decisiontree predict -m model.npz -f test.csv -o predictions.csv -k id
+    """
+    try:
+        tree = load_model(model)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error loading model: {e}")
+        raise click.Abort()
+
+    def report(rows, seconds):
+        rate = rows / seconds if seconds > 0 else 0
+        click.echo(f"\r{rows:,} rows, {rate:,.0f} rows/s", nl=False, err=True)
+
+    if profile_output:
+        tree.profiler = Profiler()
+        tree.profiler.start()
+    try:
+        summary = predict_csv(tree, test_file, output, chunksize=chunksize, keep=keep or None,
+                              progress=report if progress else None)
+    except KeyError as e:
+        print(f"Error: {e.args[0]}")
+        raise click.Abort()
+    finally:
+        if profile_output:
+            tree.profiler.stop()
+    if profile_output:
+        tree.profiler.save(profile_output)
+    if progress:
+        click.echo(err=True)
+    if output:
+        print(f"Predictions saved to: {output} "
+              f"({summary['rows']:,} rows, {summary['rows_per_second']:,.0f} rows/s)")
+
+
 if __name__ == '__main__':
-    build_tree()
\ No newline at end of file
+    cli()
@@ -0,0 +1,204 @@
+import numpy as np
+
+
+class CompiledTree:
+    """Flat, array-backed form of a fitted tree for vectorized routing.
+
+    Node ``i`` splits on column ``feature[i]`` (-1 for leaves). Numeric nodes
+    send ``x <= threshold[i]`` to ``left[i]`` and everything else, NaN included,
+    to ``right[i]``. Categorical nodes (``threshold`` NaN) find their child at
+    ``lookup[lookup_start[i] + code]``, where -1 marks a value the node never
+    saw. ``counts[i]`` holds the training class counts that reached node ``i``
+    and ``impurity[i]`` their impurity; routing that stops at node ``i``
+    predicts ``value[i]``, the majority class of those counts, so an unseen
+    value falls back to its node's majority in O(1).
+    """
+
+    # Rows routed per block, bounding the temporary feature matrix
+    block_size = 65536
+
+    def __init__(self, feature, threshold, left, right, lookup_start, lookup, counts, impurity):
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        self.lookup_start = np.asarray(lookup_start, dtype=np.int64)
+        self.lookup = np.asarray(lookup, dtype=np.int32)
+        self.counts = np.asarray(counts)
+        self.impurity = np.asarray(impurity, dtype=np.float64)
+        self.value = np.argmax(self.counts, axis=1).astype(np.int32)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    @property
+    def n_samples(self) -> np.ndarray:
+        return self.counts.sum(axis=1)
+
+    @classmethod
+    def from_nodes(cls, root, vocabulary_sizes):
+        """Flatten a Node tree in depth-first preorder.
+
+        ``vocabulary_sizes[j]`` is the vocabulary size of feature ``j``, which is
+        also its unseen-value sentinel code.
+        """
+        nodes, stack = [], [root]
+        while stack:
+            node = stack.pop()
+            nodes.append(node)
+            if not node.is_leaf:
+                stack.extend(reversed(list(node.children.values())))
+        index = {id(node): i for i, node in enumerate(nodes)}
+
+        n = len(nodes)
+        feature = np.full(n, -1, dtype=np.int32)
+        threshold = np.full(n, np.nan)
+        left = np.full(n, -1, dtype=np.int32)
+        right = np.full(n, -1, dtype=np.int32)
+        lookup_start = np.zeros(n, dtype=np.int64)
+        counts = np.stack([node.counts for node in nodes])
+        impurity = np.array([node.impurity for node in nodes], dtype=np.float64)
+        lookup = []
+        size = 0
+        for i, node in enumerate(nodes):
+            if node.is_leaf:
+                continue
+            feature[i] = node.feature
+            if node.threshold is not None:
+                threshold[i] = node.threshold
+                left[i] = index[id(node.children[0])]
+                right[i] = index[id(node.children[1])]
+            else:
+                table = np.full(vocabulary_sizes[node.feature] + 1, -1, dtype=np.int32)
+                for code, child in node.children.items():
+                    table[code] = index[id(child)]
+                lookup_start[i] = size
+                lookup.append(table)
+                size += len(table)
+        lookup = np.concatenate(lookup) if lookup else np.zeros(0, dtype=np.int32)
+        return cls(feature, threshold, left, right, lookup_start, lookup, counts, impurity)
+
+    def parents(self) -> np.ndarray:
+        """Parent index of every node (-1 for the root)"""
+        parent = np.full(self.n_nodes, -1, dtype=np.int64)
+        split = self.feature >= 0
+        numeric = np.flatnonzero(split & ~np.isnan(self.threshold))
+        parent[self.left[numeric]] = numeric
+        parent[self.right[numeric]] = numeric
+        categorical = np.flatnonzero(split & np.isnan(self.threshold))
+        starts = self.lookup_start[categorical]
+        sizes = self.lookup_end()[categorical] - starts
+        owner = np.repeat(categorical, sizes)
+        # Every position of every categorical node's slice
+        positions = np.arange(sizes.sum()) + np.repeat(starts - (np.cumsum(sizes) - sizes), sizes)
+        children = self.lookup[positions]
+        parent[children[children >= 0]] = owner[children >= 0]
+        return parent
+
+    def lookup_end(self) -> np.ndarray:
+        """End of every node's ``lookup`` slice, which begins at ``lookup_start`` (empty unless categorical)"""
+        end = self.lookup_start.copy()
+        categorical = np.flatnonzero((self.feature >= 0) & np.isnan(self.threshold))
+        if len(categorical):
+            # Categorical lookup slices are laid out back to back in node order
+            end[categorical] = np.append(self.lookup_start[categorical[1:]], len(self.lookup))
+        return end
+
+    def children(self) -> list:
+        """Child indices of every node (empty for leaves)"""
+        parent = self.parents()
+        children = [[] for _ in range(self.n_nodes)]
+        for node in range(1, self.n_nodes):
+            children[parent[node]].append(node)
+        return children
+
+    def collapse(self, nodes) -> "CompiledTree":
+        """Copy of the tree with ``nodes`` turned into leaves and their descendants dropped.
+
+        Kept nodes stay in their original order, so parents still precede their
+        children; leaves keep predicting the majority of their stored counts."""
+        parent = self.parents()
+        collapsed = np.zeros(self.n_nodes, dtype=bool)
+        collapsed[np.asarray(nodes, dtype=np.int64)] = True
+        dropped = np.zeros(self.n_nodes, dtype=bool)
+        for node in range(1, self.n_nodes):
+            dropped[node] = dropped[parent[node]] or collapsed[parent[node]]
+        kept = np.flatnonzero(~dropped)
+        index = np.full(self.n_nodes + 1, -1, dtype=np.int32)
+        index[kept] = np.arange(len(kept))
+
+        feature = np.where(collapsed[kept], -1, self.feature[kept])
+        split = feature >= 0
+        threshold = np.where(split, self.threshold[kept], np.nan)
+        # -1 children index the trailing -1 of ``index``
+        left = np.where(split, index[self.left[kept]], -1)
+        right = np.where(split, index[self.right[kept]], -1)
+        lookup_start = np.zeros(len(kept), dtype=np.int64)
+        lookup_end = self.lookup_end()
+        lookup, size = [], 0
+        for new in np.flatnonzero(split & np.isnan(threshold)):
+            old = kept[new]
+            lookup.append(index[self.lookup[self.lookup_start[old]:lookup_end[old]]])
+            lookup_start[new] = size
+            size += len(lookup[-1])
+        lookup = np.concatenate(lookup) if lookup else np.zeros(0, dtype=np.int32)
+        return CompiledTree(feature, threshold, left, right, lookup_start, lookup,
+                            self.counts[kept], self.impurity[kept])
+
+    def depths(self) -> np.ndarray:
+        """Depth of every node; every builder numbers parents before their children"""
+        parent = self.parents()
+        depth = np.zeros(self.n_nodes, dtype=np.int64)
+        for node in range(1, self.n_nodes):
+            depth[node] = depth[parent[node]] + 1
+        return depth
+
+    def apply(self, columns) -> np.ndarray:
+        """Index of the node where each row of the encoded feature columns stops"""
+        n_rows = len(columns[0]) if columns else 0
+        nodes = np.empty(n_rows, dtype=np.int32)
+        for start in range(0, n_rows, self.block_size):
+            block = [column[start:start + self.block_size] for column in columns]
+            nodes[start:start + self.block_size] = self._route(block)
+        return nodes
+
+    def predict_codes(self, columns) -> np.ndarray:
+        """Class codes for encoded feature columns (see Dataset.encode)"""
+        return self.value[self.apply(columns)]
+
+    def predict_proba_codes(self, columns) -> np.ndarray:
+        """Rows x classes probabilities from the class counts of each row's final node"""
+        counts = self.counts[self.apply(columns)].astype(np.float64)
+        total = counts.sum(axis=1, keepdims=True)
+        # A node that holds no weight predicts uniformly rather than NaN
+        return np.divide(counts, total, out=np.full_like(counts, 1 / counts.shape[1]), where=total > 0)
+
+    def _route(self, columns) -> np.ndarray:
+        """Route one block of rows level by level, all active rows per step"""
+        n_rows = len(columns[0])
+        X = np.empty((n_rows, len(columns)), dtype=np.float64)
+        for j, column in enumerate(columns):
+            X[:, j] = column
+        node = np.zeros(n_rows, dtype=np.int32)
+        rows = np.arange(n_rows)
+        while rows.size:
+            current = node[rows]
+            feature = self.feature[current]
+            internal = feature >= 0
+            rows, current, feature = rows[internal], current[internal], feature[internal]
+            if not rows.size:
+                break
+            x = X[rows, feature]
+            threshold = self.threshold[current]
+            child = np.where(x <= threshold, self.left[current], self.right[current])
+            categorical = np.isnan(threshold)
+            if categorical.any():
+                positions = self.lookup_start[current[categorical]] + x[categorical].astype(np.int64)
+                child[categorical] = self.lookup[positions]
+            # Rows reaching a value the node never saw stop there
+            child = np.where(child < 0, current, child)
+            moved = child != current
+            node[rows] = child
+            rows = rows[moved]
+        return node
@@ -0,0 +1,375 @@
+import numpy as np
+import pandas as pd
+
+
+def _code_dtype(n_values: int):
+    """Smallest unsigned dtype holding ``n_values`` codes plus the unseen-value sentinel."""
+    if n_values < np.iinfo(np.uint8).max:
+        return np.uint8
+    if n_values < np.iinfo(np.uint16).max:
+        return np.uint16
+    return np.uint32
+
+
+def _factorize(values, numeric=False):
+    """Sorted integer codes and vocabulary for a column, keeping NaN as its own value.
+
+    Numeric vocabularies are float arrays in ascending order with NaN last, so
+    their codes are ranks and ``code <= c`` is the same cut as ``value <= vocabulary[c]``.
+    """
+    try:
+        codes, uniques = pd.factorize(values, sort=True, use_na_sentinel=False)
+    except TypeError:
+        # Mixed, unorderable values: keep first-seen order instead
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    if numeric:
+        vocabulary = np.asarray(uniques, dtype=np.float64)
+    else:
+        vocabulary = np.empty(len(uniques), dtype=object)
+        vocabulary[:] = list(uniques)
+    return codes.astype(_code_dtype(len(uniques))), vocabulary
+
+
+def tally(keys: np.ndarray, weights=None, minlength: int = 0) -> np.ndarray:
+    """``np.bincount`` of ``keys``, each counting its weight; int64 unless a weight is fractional"""
+    if weights is None:
+        return np.bincount(keys, minlength=minlength)
+    counts = np.bincount(keys, weights, minlength=minlength)
+    return counts.astype(np.int64) if weights.dtype.kind in 'iu' else counts
+
+
+def _check_weights(weights, n_samples: int) -> np.ndarray:
+    """``weights`` as int64 (integer weights) or float64, if they are one finite, non-negative value per row"""
+    weights = np.asarray(weights)
+    if weights.shape != (n_samples,):
+        raise ValueError(f"Expected {n_samples} sample weights, got shape {weights.shape}")
+    if weights.dtype.kind not in 'iuf':
+        raise ValueError("Sample weights must be numeric")
+    if weights.dtype.kind == 'f' and not np.isfinite(weights).all() or (weights < 0).any():
+        raise ValueError("Sample weights must be finite and non-negative")
+    return weights.astype(np.int64 if weights.dtype.kind in 'iu' else np.float64)
+
+
+def _is_numeric(column: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column)
+
+
+def _midpoint(low, high):
+    """Threshold between consecutive sorted values ``low`` and ``high``: their midpoint,
+    or ``low`` itself when ``high`` is NaN"""
+    midpoint = (low + high) / 2
+    # Adjacent floats can round the midpoint up onto the next value
+    return np.where(np.isnan(high) | (midpoint == high), low, midpoint)
+
+
+def _bin_edges(counts: np.ndarray, vocabulary: np.ndarray, max_bins: int):
+    """Rank-to-bin map and bin upper bounds from the sample count of every rank.
+
+    ``vocabulary`` is a numeric vocabulary (ascending, NaN last) and ``counts``
+    holds how many samples have each of its values.
+    """
+    has_nan = len(vocabulary) > 0 and np.isnan(vocabulary[-1])
+    n_values = len(vocabulary) - has_nan
+    n_bins = max_bins - has_nan
+    if n_values <= n_bins:
+        ends = np.arange(n_values)
+    else:
+        # Last rank of every bin: where the cumulative count first reaches each quantile
+        cumulative = np.cumsum(counts[:n_values])
+        quantiles = cumulative[-1] * np.arange(1, n_bins) / n_bins
+        ends = np.unique(np.searchsorted(cumulative, quantiles, side='left'))
+        ends = np.append(ends[ends < n_values - 1], n_values - 1)
+    sizes = np.diff(np.concatenate(([-1], ends)))
+    rank_to_bin = np.empty(len(vocabulary), dtype=np.uint8)
+    rank_to_bin[:n_values] = np.repeat(np.arange(len(ends)), sizes)
+    low, high = vocabulary[ends[:-1]], vocabulary[ends[:-1] + 1]
+    upper = np.concatenate((_midpoint(low, high), vocabulary[n_values - 1:n_values]))
+    if has_nan:
+        rank_to_bin[-1] = len(ends)
+        upper = np.append(upper, np.nan)
+    return rank_to_bin, upper
+
+
+def _compact(codes: np.ndarray, vocabulary: np.ndarray):
+    """``codes`` renumbered, in the same order, over the values of ``vocabulary`` they use, and those values"""
+    used = np.zeros(len(vocabulary), dtype=bool)
+    used[codes] = True
+    if used.all():
+        return codes, vocabulary
+    renumbered = np.cumsum(used) - 1
+    return renumbered[codes].astype(_code_dtype(int(used.sum()))), vocabulary[used]
+
+
+def _bin_column(codes: np.ndarray, vocabulary: np.ndarray, max_bins: int, weights=None):
+    """Quantile bin codes and bin upper bounds for a numeric column of rank codes"""
+    counts = np.bincount(codes, weights, minlength=len(vocabulary))
+    rank_to_bin, upper = _bin_edges(counts, vocabulary, max_bins)
+    return rank_to_bin[codes], upper
+
+
+class Dataset:
+    """Column-wise integer encoding of a DataFrame.
+
+    Every feature and the target are factorized once into compact unsigned
+    codes (uint8/uint16/uint32 depending on cardinality) together with the
+    code-to-label vocabularies. Building, scoring and batch prediction work on
+    these codes only, and the same object can be fitted any number of times.
+
+    Numeric columns are detected from their dtype and split on thresholds;
+    ``categorical`` lists columns to treat as categories anyway (``True`` for all).
+
+    Rows may carry ``weights`` (None: every row counts once); every count
+    taken through ``tally`` is then a sum of weights, so a row of weight k
+    builds the same tree as k copies of it (see ``compress``).
+    """
+
+    def __init__(self, df: pd.DataFrame, target: str | None = None, categorical=None) -> None:
+        if target is not None and target not in df.columns:
+            raise KeyError(f"Target column '{target}' not found")
+        self.target = target
+        self.feature_names = [col for col in df.columns if col != target]
+        self.columns = []
+        self.vocabularies = []
+        self.numeric = []
+        self.binned = []
+        for feature in self.feature_names:
+            numeric = (categorical is not True and feature not in (categorical or ())
+                       and _is_numeric(df[feature]))
+            codes, vocabulary = _factorize(df[feature], numeric)
+            self.columns.append(codes)
+            self.vocabularies.append(vocabulary)
+            self.numeric.append(numeric)
+            self.binned.append(False)
+        if target is None:
+            self.y, self.classes = None, None
+        else:
+            self.y, self.classes = _factorize(df[target])
+        self.weights = None
+        self._positions = {name: j for j, name in enumerate(self.feature_names)}
+        self._code_maps = {}
+        self._binned_cache = {}
+
+    @classmethod
+    def _from_parts(cls, template: "Dataset", columns, y) -> "Dataset":
+        """New dataset sharing ``template``'s names, vocabularies and row weights."""
+        dataset = cls.__new__(cls)
+        dataset.target = template.target
+        dataset.feature_names = template.feature_names
+        dataset.vocabularies = template.vocabularies
+        dataset.numeric = template.numeric
+        dataset.binned = template.binned
+        dataset.classes = template.classes
+        dataset._positions = template._positions
+        dataset._code_maps = template._code_maps
+        dataset._binned_cache = {}
+        dataset.columns = columns
+        dataset.y = y
+        dataset.weights = template.weights
+        return dataset
+
+    @classmethod
+    def from_vocabularies(cls, feature_names, vocabularies, numeric, binned, target, classes) -> "Dataset":
+        """A dataset without rows that only carries an encoding, e.g. of a loaded model."""
+        dataset = cls.__new__(cls)
+        dataset.target = target
+        dataset.feature_names = list(feature_names)
+        dataset.vocabularies = list(vocabularies)
+        dataset.numeric = list(numeric)
+        dataset.binned = list(binned)
+        dataset.classes = classes
+        dataset.columns = [np.zeros(0, dtype=_code_dtype(len(vocabulary))) for vocabulary in vocabularies]
+        dataset.y = np.zeros(0, dtype=_code_dtype(len(classes)))
+        dataset.weights = None
+        dataset._positions = {name: j for j, name in enumerate(dataset.feature_names)}
+        dataset._code_maps = {}
+        dataset._binned_cache = {}
+        return dataset
+
+    def __len__(self) -> int:
+        return self.n_samples
+
+    @property
+    def n_samples(self) -> int:
+        if self.y is not None:
+            return len(self.y)
+        return len(self.columns[0]) if self.columns else 0
+
+    @property
+    def n_features(self) -> int:
+        return len(self.feature_names)
+
+    @property
+    def n_classes(self) -> int:
+        return 0 if self.classes is None else len(self.classes)
+
+    def feature_position(self, feature: str) -> int:
+        return self._positions[feature]
+
+    def column(self, feature: str) -> np.ndarray:
+        return self.columns[self._positions[feature]]
+
+    def take(self, indices) -> "Dataset":
+        """Rows ``indices`` (positions or boolean mask) as a dataset with the same vocabularies."""
+        columns = [codes[indices] for codes in self.columns]
+        y = None if self.y is None else self.y[indices]
+        dataset = Dataset._from_parts(self, columns, y)
+        dataset.weights = None if self.weights is None else self.weights[indices]
+        return dataset
+
+    def select(self, features) -> "Dataset":
+        """The same rows restricted to ``features``, without copying any codes."""
+        dataset = Dataset._from_parts(self, [self.column(f) for f in features], self.y)
+        dataset.feature_names = list(features)
+        dataset.vocabularies = [self.vocabularies[self._positions[f]] for f in features]
+        dataset.numeric = [self.numeric[self._positions[f]] for f in features]
+        dataset.binned = [self.binned[self._positions[f]] for f in features]
+        dataset._positions = {name: j for j, name in enumerate(dataset.feature_names)}
+        dataset._code_maps = {}
+        return dataset
+
+    def to_bins(self, max_bins: int = 255) -> "Dataset":
+        """Copy with every numeric column quantile-binned into at most ``max_bins`` uint8 codes.
+
+        Bin boundaries follow the sample quantiles and fall midway between
+        training values; a binned column's vocabulary holds each bin's inclusive
+        upper bound, so cutting after bin ``c`` is the threshold ``vocabulary[c]``.
+        NaN keeps a bin of its own. Columns with few distinct values keep one bin
+        per value. Categorical columns and the target are shared, and the result
+        is cached per ``max_bins``.
+        """
+        if not 2 <= max_bins <= 256:
+            raise ValueError("max_bins must be between 2 and 256")
+        if max_bins in self._binned_cache:
+            return self._binned_cache[max_bins]
+        columns, vocabularies = list(self.columns), list(self.vocabularies)
+        for j in range(self.n_features):
+            if self.numeric[j] and not self.binned[j]:
+                columns[j], vocabularies[j] = _bin_column(self.columns[j], self.vocabularies[j], max_bins,
+                                                          self.weights)
+        dataset = Dataset._from_parts(self, columns, self.y)
+        dataset.vocabularies = vocabularies
+        dataset.binned = [binned or numeric for binned, numeric in zip(self.binned, self.numeric)]
+        dataset._code_maps = {}
+        self._binned_cache[max_bins] = dataset
+        return dataset
+
+    @property
+    def total_weight(self):
+        return self.n_samples if self.weights is None else self.weights.sum()
+
+    def tally(self, keys: np.ndarray, rows=None, minlength: int = 0) -> np.ndarray:
+        """``np.bincount(keys)`` where the key of row ``rows[i]`` counts that row's weight.
+
+        Counts stay int64 when every weight is an integer, as after ``compress``."""
+        if self.weights is None:
+            return np.bincount(keys, minlength=minlength)
+        return tally(keys, self.weights if rows is None else self.weights[rows], minlength)
+
+    def with_weights(self, weights) -> "Dataset":
+        """The same rows weighted by ``weights`` (one non-negative, finite value per row)"""
+        dataset = Dataset._from_parts(self, self.columns, self.y)
+        dataset.weights = _check_weights(weights, self.n_samples)
+        return dataset
+
+    def compact(self) -> "Dataset":
+        """The same rows with every vocabulary, and the classes, cut down to the values the rows hold.
+
+        Codes keep their order, so numeric codes stay ranks and a cut's
+        midpoint falls between values some row has, as if the other values
+        had never been encoded (see Tree.fit with zero sample weights)."""
+        columns, vocabularies = [], []
+        for codes, vocabulary in zip(self.columns, self.vocabularies):
+            codes, vocabulary = _compact(codes, vocabulary)
+            columns.append(codes)
+            vocabularies.append(vocabulary)
+        y, classes = (None, None) if self.y is None else _compact(self.y, self.classes)
+        dataset = Dataset._from_parts(self, columns, y)
+        dataset.vocabularies, dataset.classes = vocabularies, classes
+        dataset._code_maps = {}
+        return dataset
+
+    def compress(self) -> "Dataset":
+        """Identical rows (features and target) collapsed into one, weighted by their total weight.
+
+        Vocabularies are kept, so codes, thresholds and every weighted count a
+        build takes are those of the full dataset. Zero-weight rows are dropped."""
+        keys = np.zeros(self.n_samples, dtype=np.int64)
+        n_keys = 1
+        for codes, size in zip(self.columns + [self.y], [len(v) + 1 for v in self.vocabularies] + [self.n_classes]):
+            if n_keys * size >= 2 ** 62:
+                # Renumber the distinct prefixes before the mixed-radix key overflows
+                _, keys = np.unique(keys, return_inverse=True)
+                n_keys = int(keys.max()) + 1 if len(keys) else 1
+            keys = keys * size + codes
+            n_keys *= size
+        _, first, groups = np.unique(keys, return_index=True, return_inverse=True)
+        weights = np.bincount(groups, self.weights)
+        if self.weights is None or self.weights.dtype.kind in 'iu':
+            weights = weights.astype(np.int64)
+        kept = weights > 0
+        dataset = self.take(first[kept])
+        dataset.weights = weights[kept]
+        return dataset
+
+    def code_map(self, position: int) -> dict:
+        """Label-to-code dictionary for feature ``position``, built on first use."""
+        if position not in self._code_maps:
+            vocabulary = self.vocabularies[position]
+            self._code_maps[position] = {label: code for code, label in enumerate(vocabulary)}
+        return self._code_maps[position]
+
+    def encode(self, X) -> list:
+        """Encode the features of ``X`` (DataFrame or Dataset) with this dataset's vocabularies.
+
+        Categorical values that were not seen here get the sentinel code
+        ``len(vocabulary)``. Numeric features are returned as float values, since
+        thresholds have to route values that fall between training values.
+        """
+        encoded = []
+        for j, feature in enumerate(self.feature_names):
+            if self.numeric[j]:
+                if isinstance(X, Dataset):
+                    position = X.feature_position(feature)
+                    values = pd.to_numeric(pd.Series(X.vocabularies[position]), errors='coerce')
+                    encoded.append(values.to_numpy(np.float64)[X.columns[position]])
+                else:
+                    encoded.append(pd.to_numeric(X[feature], errors='coerce').to_numpy(np.float64))
+                continue
+            vocabulary = pd.Index(self.vocabularies[j])
+            sentinel = len(vocabulary)
+            if isinstance(X, Dataset):
+                # Remap X's (small) vocabulary once, then gather through it
+                mapping = vocabulary.get_indexer(pd.Index(X.vocabularies[X.feature_position(feature)]))
+                mapping[mapping < 0] = sentinel
+                codes = mapping[X.column(feature)]
+            else:
+                codes = vocabulary.get_indexer(X[feature])
+                codes[codes < 0] = sentinel
+            encoded.append(codes.astype(self.columns[j].dtype, copy=False))
+        return encoded
+
+    def prediction_columns(self) -> list:
+        """This dataset's own rows encoded as ``encode`` encodes rows to predict:
+        numeric features as values, which compiled trees route on"""
+        return self.encode(self)
+
+    def encode_value(self, position: int, value):
+        """Encode one value of feature ``position`` like ``encode`` does for a column"""
+        if self.numeric[position]:
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                return np.nan
+        mapping = self.code_map(position)
+        return mapping.get(value, len(mapping))
+
+    def decode_target(self, codes) -> np.ndarray:
+        return self.classes[np.asarray(codes, dtype=np.intp)]
+
+    def to_frame(self) -> pd.DataFrame:
+        """Decode back into a DataFrame of the original labels."""
+        data = {feature: self.vocabularies[j][self.columns[j]]
+                for j, feature in enumerate(self.feature_names)}
+        if self.y is not None:
+            data[self.target] = self.classes[self.y]
+        return pd.DataFrame(data)
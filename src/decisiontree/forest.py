@@ -0,0 +1,183 @@
+"""
+Random forests
+==============
+
+``RandomForest`` bags ``Tree``s: every tree grows on a bootstrap sample of
+the rows of one shared encoded Dataset. A bootstrap sample is only an index
+array drawn with replacement; the tree's builder partitions that array in
+place, so no rows are ever copied. With ``n_jobs`` the encoded columns and the
+target are placed in shared memory once and worker processes, which map them
+at start-up, grow whole trees from a seed each and send back only the
+compiled arrays.
+
+Every tree draws its sample, and its random features or cuts with
+``max_features`` or ``splitter="random"``, from its own child of
+``random_state``'s seed sequence, so a forest does not depend on how many workers grew it. With
+``oob_score=True`` each tree also predicts the rows it never drew, and those
+out-of-bag probabilities are summed into ``oob_proba`` and ``oob_accuracy``.
+
+Prediction encodes the features once, routes them through every tree's
+compiled arrays and aggregates in NumPy: ``predict_proba`` averages the trees'
+leaf class frequencies and ``predict_batch`` takes a majority vote of their
+predicted classes.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import copy
+import os
+import numpy as np
+
+from .dataset import Dataset
+from .ImpurityStrategy import ImpurityStrategy, RandomSubspace
+from .parallel import SharedArrays
+from .tree import Tree
+
+_worker = {}
+
+
+def _grow_one(template: Tree, data: Dataset, seed, bootstrap: bool, encoded=None):
+    """Fit a copy of ``template`` on the sample drawn from ``seed``; returns (compiled tree, OOB rows,
+    OOB probabilities). The template itself is left unfitted.
+
+    ``encoded`` is ``data`` encoded for prediction, given when OOB rows are to be scored."""
+    n_samples = data.n_samples
+    tree = copy.copy(template)
+    if isinstance(tree.criterion, RandomSubspace):
+        # Each tree draws its features (and random cuts) from its own seed too
+        tree.criterion = tree.criterion.seeded(seed)
+    rows = np.random.default_rng(seed).integers(0, n_samples, n_samples) if bootstrap else None
+    tree._fit(data, None, rows)
+    compiled = tree.compile()
+    if encoded is None:
+        return compiled, None, None
+    out = np.flatnonzero(np.bincount(rows, minlength=n_samples) == 0)
+    proba = compiled.predict_proba_codes([column[out] for column in encoded])
+    return compiled, out, proba
+
+
+def _init_worker(tree: Tree, data_spec, encoded_specs) -> None:
+    shared = SharedArrays()
+    _worker.update(tree=tree, data=shared.attach_dataset(data_spec),
+                   encoded=[shared.attach(spec) for spec in encoded_specs] if encoded_specs else None,
+                   shared=shared)
+
+
+def _grow_task(seed, bootstrap: bool):
+    return _grow_one(_worker['tree'], _worker['data'], seed, bootstrap, _worker['encoded'])
+
+
+class RandomForest:
+    def __init__(self, criterion: ImpurityStrategy, n_estimators=100, bootstrap=True, oob_score=False,
+                 n_jobs=None, random_state=None, binning=None, max_bins=255, max_depth=None,
+                 min_samples_split=2, min_samples_leaf=1, min_impurity_decrease=0.0, max_leaf_nodes=None,
+                 max_features=None, splitter="best") -> None:
+        """``n_estimators`` trees, each grown by a ``Tree`` with ``criterion`` and the
+        given binning, stopping rules and randomized search (``max_features``,
+        ``splitter``; see Tree) on a bootstrap sample of the rows (all rows
+        with ``bootstrap=False``). ``n_jobs`` worker processes grow
+        trees in parallel (-1: one per CPU). ``oob_score=True`` scores every
+        row on the trees that did not draw it."""
+        if n_estimators < 1:
+            raise ValueError("n_estimators must be at least 1")
+        if oob_score and not bootstrap:
+            raise ValueError("oob_score needs bootstrap samples")
+        self.criterion = criterion
+        self.n_estimators = n_estimators
+        self.bootstrap = bootstrap
+        self.oob_score = oob_score
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        # Validates the tree parameters once; every tree of the forest grows on a copy of it
+        self._template = Tree(criterion, binning=binning, max_bins=max_bins, max_depth=max_depth,
+                              min_samples_split=min_samples_split, min_samples_leaf=min_samples_leaf,
+                              min_impurity_decrease=min_impurity_decrease, max_leaf_nodes=max_leaf_nodes,
+                              max_features=max_features, splitter=splitter)
+        self.dataset = None
+        self.target = None
+        self.trees = []
+        self.oob_proba = None
+        self.oob_accuracy = None
+
+    def fit(self, df, target: str | None = None):
+        """Fit on a DataFrame or on an already encoded Dataset; encoding and binning happen once"""
+        template = self._template
+        if isinstance(df, Dataset):
+            if target is not None and target != df.target:
+                raise ValueError(f"Dataset was encoded with target '{df.target}', not '{target}'")
+            dataset = df
+        else:
+            dataset = template._encode(df, target)
+        if template.binning == "histogram":
+            dataset = dataset.to_bins(template.max_bins)
+        self.dataset = dataset
+        self.target = dataset.target
+
+        seeds = np.random.SeedSequence(self.random_state).spawn(self.n_estimators)
+        encoded = dataset.prediction_columns() if self.oob_score else None
+        n_jobs = (os.cpu_count() or 1) if self.n_jobs == -1 else (self.n_jobs or 1)
+        if n_jobs > 1 and self.n_estimators > 1:
+            results = self._grow_parallel(dataset, encoded, seeds, min(n_jobs, self.n_estimators))
+        else:
+            results = [_grow_one(template, dataset, seed, self.bootstrap, encoded) for seed in seeds]
+
+        self.trees = [self._wrap(compiled) for compiled, _, _ in results]
+        if self.oob_score:
+            proba = np.zeros((dataset.n_samples, dataset.n_classes))
+            for _, out, tree_proba in results:
+                proba[out] += tree_proba
+            scored = proba.sum(axis=1) > 0
+            proba[scored] /= proba[scored].sum(axis=1, keepdims=True)
+            self.oob_proba = proba
+            self.oob_accuracy = (float(np.mean(np.argmax(proba[scored], axis=1) == dataset.y[scored]))
+                                 if scored.any() else np.nan)
+        return self
+
+    def _grow_parallel(self, dataset: Dataset, encoded, seeds, n_workers: int) -> list:
+        with SharedArrays() as shared:
+            encoded_specs = [shared.share(column)[0] for column in encoded] if encoded is not None else None
+            initargs = (self._template, shared.share_dataset(dataset), encoded_specs)
+            with ProcessPoolExecutor(n_workers, initializer=_init_worker, initargs=initargs) as pool:
+                return list(pool.map(_grow_task, seeds, [self.bootstrap] * len(seeds)))
+
+    def _wrap(self, compiled) -> Tree:
+        """Standalone Tree around a compiled forest member"""
+        tree = Tree(self._template.criterion, binning=self._template.binning, max_bins=self._template.max_bins)
+        tree.dataset = self.dataset
+        tree.target = self.target
+        tree._compiled = compiled
+        return tree
+
+    def _codes(self, X) -> list:
+        if not self.trees:
+            raise ValueError("RandomForest is not fitted")
+        return self.dataset.encode(X)
+
+    def votes(self, X) -> np.ndarray:
+        """Rows x classes count of trees predicting each class"""
+        columns = self._codes(X)
+        n_rows = len(columns[0]) if columns else 0
+        votes = np.zeros((n_rows, self.dataset.n_classes), dtype=np.int64)
+        rows = np.arange(n_rows)
+        for tree in self.trees:
+            votes[rows, tree._compiled.predict_codes(columns)] += 1
+        return votes
+
+    def predict_batch(self, X):
+        """Majority vote of the trees for every row; ties go to the first class"""
+        votes = self.votes(X)
+        return self.dataset.decode_target(np.argmax(votes, axis=1))
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Class probabilities averaged over the trees; columns follow ``self.dataset.classes``"""
+        columns = self._codes(X)
+        n_rows = len(columns[0]) if columns else 0
+        proba = np.zeros((n_rows, self.dataset.n_classes))
+        for tree in self.trees:
+            proba += tree._compiled.predict_proba_codes(columns)
+        return proba / len(self.trees)
+
+    def feature_importances(self) -> dict:
+        """Per-feature importances averaged over the trees"""
+        importances = [tree.feature_importances() for tree in self.trees]
+        return {feature: float(np.mean([tree[feature] for tree in importances]))
+                for feature in self.dataset.feature_names}
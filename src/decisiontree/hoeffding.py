@@ -0,0 +1,296 @@
+"""
+Streaming Hoeffding trees
+=========================
+
+A Hoeffding tree (VFDT) learns from rows as they arrive instead of from a
+complete training set. Every leaf keeps value x class counts per feature of
+the rows that reached it since it was created; each time a leaf has seen
+``grace_period`` more (weighted) rows, its splits are scored from those
+counts as the level-wise builder scores a frontier node. The leaf splits
+when the best split's gain beats the runner-up's, or not
+splitting at all, by more than the Hoeffding bound
+
+    epsilon = R * sqrt(ln(1 / delta) / (2 n))
+
+where R is the largest gain the criterion reaches and n the leaf's row
+count: with probability 1 - delta that is the split a batch build over
+unlimited rows would pick. Splits too close to call are settled once epsilon
+falls below ``tie_threshold``.
+
+Rows are routed and counted in vectorized blocks of ``grace_period``, so a
+row costs the same however many came before it, and memory is bounded by
+the leaves' count tables. Numeric features are quantile-binned on the first
+batch, as in histogram mode, and keep those bins; categorical values and
+classes first seen in a later batch are appended to the vocabularies.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .dataset import Dataset, tally, _check_weights
+from .compiled import CompiledTree
+from .levelwise import FrontierTree, count_frontier, _score_dense
+from .tree import Tree
+
+
+def _extend(vocabulary: np.ndarray, values):
+    """Codes of ``values`` in ``vocabulary``, which gets the values it lacks appended in first-seen order"""
+    values = np.asarray(values, dtype=object)
+    codes = pd.Index(vocabulary).get_indexer(values)
+    new = codes < 0
+    if new.any():
+        added = pd.unique(values[new])
+        extended = np.empty(len(vocabulary) + len(added), dtype=object)
+        extended[:len(vocabulary)] = vocabulary
+        extended[len(vocabulary):] = added
+        vocabulary = extended
+        codes = pd.Index(vocabulary).get_indexer(values)
+    return vocabulary, codes.astype(np.intp)
+
+
+def _padded(counts: np.ndarray, shape) -> np.ndarray:
+    """``counts`` zero-padded at the end of each axis to ``shape``, for vocabularies that grew"""
+    if counts.shape == tuple(shape):
+        return counts
+    return np.pad(counts, [(0, size - current) for current, size in zip(counts.shape, shape)])
+
+
+class HoeffdingTree(Tree):
+    """Tree learnt incrementally from a stream; ``partial_fit`` takes one batch of rows at a time.
+
+    The model is an ordinary compiled tree, so ``predict``, ``predict_batch``,
+    ``predict_proba`` and ``save_model`` work as for a batch-trained Tree and
+    ``load_model`` reads it back as one. ``criterion`` must be exhaustive
+    (Entropy, GiniIndex). ``max_depth``, ``min_samples_split``,
+    ``min_samples_leaf`` and ``max_leaf_nodes`` bound the growth as in Tree;
+    leaves that can never split keep no counts.
+    """
+
+    def __init__(self, criterion, grace_period=200, delta=1e-7, tie_threshold=0.05, max_bins=255,
+                 max_depth=None, min_samples_split=2, min_samples_leaf=1, max_leaf_nodes=None,
+                 categorical=None) -> None:
+        if not (criterion.accepts_dataset and criterion.exhaustive and np.isfinite(criterion._gain_range(2))):
+            raise ValueError(f"{type(criterion).__name__} does not support streaming training")
+        if grace_period < 1:
+            raise ValueError("grace_period must be at least 1")
+        if not 0 < delta < 1:
+            raise ValueError("delta must be between 0 and 1")
+        if tie_threshold < 0:
+            raise ValueError("tie_threshold must be non-negative")
+        super().__init__(criterion, binning="histogram", max_bins=max_bins, max_depth=max_depth,
+                         min_samples_split=min_samples_split, min_samples_leaf=min_samples_leaf,
+                         max_leaf_nodes=max_leaf_nodes)
+        self.grace_period = grace_period
+        self.delta = delta
+        self.tie_threshold = tie_threshold
+        self.categorical = categorical
+        self._reset()
+
+    def _reset(self) -> None:
+        self.dataset = None
+        self.target = None
+        self._growing = None
+        self._router = None
+        self._counts = None
+        self._parent, self._depth = [], []
+        # Per collecting leaf: value x class table per feature, class counts, rows since last scored
+        self._stats, self._seen, self._since = {}, {}, {}
+        self._root = self._tree = self._compiled = None
+
+    def fit(self, df, target: str | None = None, sample_weight=None):
+        """Forget what was learnt and learn from the rows of ``df`` in order, as one stream"""
+        self._reset()
+        self.partial_fit(df, target, sample_weight)
+
+    def partial_fit(self, df: pd.DataFrame, target: str | None = None, sample_weight=None) -> "HoeffdingTree":
+        """Learn from one more batch of rows; ``target`` is only needed on the first.
+
+        ``sample_weight`` weighs the rows as in Tree.fit. The fitted tree is
+        updated when the batch is done."""
+        if self.dataset is None:
+            if target is None:
+                raise ValueError("The first batch needs a target")
+            if target not in df.columns:
+                raise KeyError(f"Target column '{target}' not found")
+            self._start(df, target, sample_weight)
+        elif target is not None and target != self.target:
+            raise ValueError(f"Tree was trained with target '{self.target}', not '{target}'")
+        weights = None if sample_weight is None else _check_weights(sample_weight, len(df))
+        with self._profiling(fit=True):
+            with self._phase('encode'):
+                columns, y = self._encode_batch(df)
+            with self._phase('learn'):
+                for start in range(0, len(y), self.grace_period):
+                    block = slice(start, start + self.grace_period)
+                    self._learn([codes[block] for codes in columns], y[block],
+                                None if weights is None else weights[block])
+        self._export()
+        return self
+
+    def _start(self, df: pd.DataFrame, target: str, sample_weight) -> None:
+        """Fix the features, their kinds and the numeric bins from the first batch"""
+        dataset = Dataset(df, target, self.categorical)
+        if sample_weight is not None:
+            dataset = dataset.with_weights(sample_weight)
+        dataset = dataset.to_bins(self.max_bins)
+        vocabularies = []
+        for vocabulary, numeric in zip(dataset.vocabularies, dataset.numeric):
+            if numeric and not (len(vocabulary) and np.isnan(vocabulary[-1])):
+                # A bin for missing values that only show up in later batches
+                vocabulary = np.append(vocabulary, np.nan)
+            vocabularies.append(vocabulary)
+        self.dataset = Dataset.from_vocabularies(dataset.feature_names, vocabularies, dataset.numeric,
+                                                 dataset.binned, target, dataset.classes)
+        self.target = target
+        self._growing = FrontierTree(np.zeros(dataset.n_classes, dtype=np.int64),
+                                     lambda counts: float(self.criterion._impurity_from_counts(counts)))
+        self._counts = np.zeros((1, dataset.n_classes), dtype=np.int64)
+        self._parent, self._depth = [-1], [0]
+        self._open(0)
+
+    def _encode_batch(self, df: pd.DataFrame):
+        """Bin codes of numeric features, codes of categorical ones and class codes of ``df``"""
+        data = self.dataset
+        vocabularies = list(data.vocabularies)
+        columns = []
+        for j, feature in enumerate(data.feature_names):
+            if data.numeric[j]:
+                values = pd.to_numeric(df[feature], errors='coerce').to_numpy(np.float64)
+                upper = vocabularies[j][:-1]
+                codes = np.minimum(np.searchsorted(upper, values, side='left'), max(len(upper) - 1, 0))
+                codes[np.isnan(values)] = len(upper)
+            else:
+                vocabularies[j], codes = _extend(vocabularies[j], df[feature])
+            columns.append(codes.astype(np.intp))
+        classes, y = _extend(data.classes, df[self.target])
+        if len(classes) > data.n_classes or any(len(new) > len(old)
+                                                for new, old in zip(vocabularies, data.vocabularies)):
+            self.dataset = Dataset.from_vocabularies(data.feature_names, vocabularies, data.numeric, data.binned,
+                                                     self.target, classes)
+            self._router = None
+        return columns, y
+
+    def _open(self, leaf: int) -> None:
+        """Start counting at a new leaf, unless it is too deep to ever split"""
+        if self.max_depth is not None and self._depth[leaf] >= self.max_depth:
+            return
+        n_classes = self.dataset.n_classes
+        self._stats[leaf] = [np.zeros((len(vocabulary), n_classes), dtype=np.int64)
+                             for vocabulary in self.dataset.vocabularies]
+        self._seen[leaf] = np.zeros(n_classes, dtype=np.int64)
+        self._since[leaf] = 0
+
+    def _route(self, columns) -> np.ndarray:
+        if self._router is None:
+            # Numeric nodes compare bin codes, as FrontierTree.partial does
+            tree = self._growing
+            lookup_start, lookup = tree.padded_lookups([len(vocabulary) for vocabulary in self.dataset.vocabularies])
+            self._router = CompiledTree(tree.feature, tree.cut, tree.left, tree.right, lookup_start, lookup,
+                                        np.zeros((tree.n_nodes, 1), dtype=np.int64), np.zeros(tree.n_nodes))
+        return self._router.apply(columns)
+
+    def _learn(self, columns, y: np.ndarray, weights) -> None:
+        """Count one block of encoded rows and score the leaves that are due"""
+        n_nodes, n_classes = self._growing.n_nodes, self.dataset.n_classes
+        nodes = self._route(columns).astype(np.intp)
+        stopped = tally(nodes * n_classes + y, weights, n_nodes * n_classes).reshape(n_nodes, n_classes)
+        # Credit every row to each node on its path; parents are numbered before their children
+        depth, parent = np.asarray(self._depth), np.asarray(self._parent)
+        for level in range(depth.max(), 0, -1):
+            at = np.flatnonzero(depth == level)
+            np.add.at(stopped, parent[at], stopped[at])
+        self._counts = _padded(self._counts, stopped.shape) + stopped
+
+        collecting = np.zeros(n_nodes, dtype=bool)
+        collecting[list(self._stats)] = True
+        rows = np.flatnonzero(collecting[nodes])
+        if not len(rows):
+            return
+        leaves, slots = np.unique(nodes[rows], return_inverse=True)
+        sizes = [len(vocabulary) for vocabulary in self.dataset.vocabularies]
+        leaf_counts, tables = count_frontier([codes[rows] for codes in columns], y[rows], slots.ravel(), len(leaves),
+                                             sizes, n_classes, None if weights is None else weights[rows])
+        due = []
+        for slot, leaf in enumerate(leaves.tolist()):
+            stats = self._stats[leaf]
+            for j, table in enumerate(tables):
+                stats[j] = _padded(stats[j], table.shape[1:]) + table[slot]
+            self._seen[leaf] = _padded(self._seen[leaf], (n_classes,)) + leaf_counts[slot]
+            self._since[leaf] += leaf_counts[slot].sum()
+            if self._since[leaf] >= self.grace_period:
+                self._since[leaf] = 0
+                due.append(leaf)
+        limits = self._limits()
+        due = [leaf for leaf in due if limits.expandable(self._seen[leaf], self._depth[leaf])]
+        if due and self.dataset.n_features:
+            self._attempt(due)
+
+    def _attempt(self, leaves: list) -> None:
+        """Split those of ``leaves`` whose best split is ahead by the Hoeffding bound"""
+        data, criterion = self.dataset, self.criterion
+        n_classes = data.n_classes
+        class_counts = np.stack([self._seen[leaf] for leaf in leaves])
+        totals = class_counts.sum(axis=1).astype(np.float64)
+        gains = np.empty((len(leaves), data.n_features))
+        cuts = {}
+        for j, vocabulary in enumerate(data.vocabularies):
+            table = np.stack([_padded(self._stats[leaf][j], (len(vocabulary), n_classes)) for leaf in leaves])
+            gains[:, j], codes, left = _score_dense(criterion, table, class_counts, totals, data.numeric[j],
+                                                    self.min_samples_leaf)
+            cuts[j] = codes, left
+        ranked = np.sort(gains, axis=1)
+        best = ranked[:, -1]
+        # Not splitting at all is always a candidate, with no gain
+        runner_up = np.maximum(ranked[:, -2], 0) if data.n_features > 1 else np.zeros(len(leaves))
+        epsilon = criterion._gain_range(n_classes) * np.sqrt(np.log(1 / self.delta) / (2 * totals))
+        ready = (best > 0) & ((best - runner_up > epsilon) | (epsilon < self.tie_threshold))
+        for slot in sorted(np.flatnonzero(ready), key=lambda slot: -best[slot]):
+            position = int(np.argmax(gains[slot]))
+            codes, left = cuts[position]
+            if data.numeric[position]:
+                self._split(leaves[slot], position, int(codes[slot]), left[slot])
+            else:
+                self._split(leaves[slot], position, None, None)
+
+    def _split(self, leaf: int, position: int, split_code, left) -> None:
+        tree, data = self._growing, self.dataset
+        n_values = len(data.vocabularies[position])
+        if split_code is not None:
+            branches = [(0, left), (1, self._seen[leaf] - left)]
+            threshold = self.criterion._threshold_value(data, position, split_code)
+        else:
+            table = _padded(self._stats[leaf][position], (n_values, data.n_classes))
+            branches = [(code, table[code]) for code in np.flatnonzero(table.any(axis=1)).tolist()]
+            threshold = None
+        if self.max_leaf_nodes is not None and self._n_leaves() - 1 + len(branches) > self.max_leaf_nodes:
+            # Skipped for good, as Tree's best-first growth skips it: the leaf stops counting
+            self._close(leaf)
+            return
+        children = tree.split(leaf, position, n_values, split_code, threshold, branches)
+        # Children start from the counts that chose the split, so a new leaf predicts sensibly
+        self._counts = np.vstack([self._counts] + [counts for _, counts in branches])
+        self._close(leaf)
+        for child in children:
+            self._parent.append(leaf)
+            self._depth.append(self._depth[leaf] + 1)
+            self._open(child)
+        self._router = None
+        if self.max_leaf_nodes is not None and self._n_leaves() >= self.max_leaf_nodes:
+            # No leaf can split any more; stop counting and scoring them all
+            for open_leaf in list(self._stats):
+                self._close(open_leaf)
+
+    def _close(self, leaf: int) -> None:
+        """Stop counting at ``leaf``; it stays a leaf and its class counts keep growing"""
+        del self._stats[leaf], self._seen[leaf], self._since[leaf]
+
+    def _n_leaves(self) -> int:
+        return sum(feature < 0 for feature in self._growing.feature)
+
+    def _export(self) -> None:
+        """Publish the tree grown so far, with real thresholds, as the fitted tree"""
+        tree = self._growing
+        lookup_start, lookup = tree.padded_lookups([len(vocabulary) for vocabulary in self.dataset.vocabularies])
+        self._compiled = CompiledTree(tree.feature, tree.threshold, tree.left, tree.right, lookup_start, lookup,
+                                      self._counts, self.criterion._impurity_from_counts(self._counts))
+        self._root = self._tree = None
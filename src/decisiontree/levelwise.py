@@ -0,0 +1,384 @@
+"""
+Level-wise growth
+=================
+
+Grow a tree breadth-first, one whole frontier at a time. Every row carries
+the id of the node it has reached; for each feature a single ``np.bincount``
+over ``(frontier slot, value code, class)`` keys yields the value x class
+table of every frontier node at once, and every node's best split is then
+chosen from those tables with a few array operations per feature. The
+per-node interpreter work of the recursive builder becomes a handful of
+large vectorized calls per level.
+
+Features with many distinct values (exact numeric columns, for instance)
+would make those dense tables mostly empty; their counts are kept sparse
+instead, as the sorted (slot, value) pairs that actually occur.
+
+The search is the same as the recursive builder's, so the trees agree up to
+floating-point ties between splits that are equally good.
+"""
+
+from typing import NamedTuple
+import numpy as np
+
+from .dataset import Dataset, tally
+from .compiled import CompiledTree
+from .trace import LevelGrown
+
+
+class FrontierTree:
+    """Flat node arrays of a tree that grows one level at a time.
+
+    Nodes are numbered in creation (breadth-first) order. Numeric nodes keep
+    their cut as a value code as well as a threshold, so ``partial()`` routes
+    encoded rows while ``finish()`` returns the tree with real thresholds.
+    """
+
+    def __init__(self, root_counts: np.ndarray, impurity_of) -> None:
+        self.impurity_of = impurity_of
+        self.feature, self.cut, self.threshold = [], [], []
+        self.left, self.right, self.lookup_start = [], [], []
+        self.lookups, self.counts, self.impurity = [], [], []
+        self.lookup_nodes = []
+        self._lookup_size = 0
+        self._add(root_counts)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    def _add(self, counts: np.ndarray) -> int:
+        self.feature.append(-1)
+        self.cut.append(np.nan)
+        self.threshold.append(np.nan)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.lookup_start.append(0)
+        self.counts.append(counts)
+        self.impurity.append(self.impurity_of(counts))
+        return len(self.feature) - 1
+
+    def split(self, node: int, position: int, n_values: int, split_code, threshold, branches) -> list:
+        """Split ``node`` on feature ``position`` into the ``(branch, class counts)`` pairs.
+
+        ``split_code`` is None for a categorical split (branches are value
+        codes), otherwise the last value code sent left (branches 0 and 1).
+        Returns the ids of the new children.
+        """
+        self.feature[node] = position
+        if split_code is not None:
+            self.cut[node], self.threshold[node] = split_code, threshold
+            (_, left), (_, right) = branches
+            self.left[node], self.right[node] = children = [self._add(left), self._add(right)]
+            return children
+        lookup = np.full(n_values + 1, -1, dtype=np.int32)
+        self.lookup_start[node] = self._lookup_size
+        self.lookups.append(lookup)
+        self.lookup_nodes.append(node)
+        self._lookup_size += len(lookup)
+        children = []
+        for code, counts in branches:
+            lookup[code] = child = self._add(counts)
+            children.append(child)
+        return children
+
+    def _lookup(self) -> np.ndarray:
+        return np.concatenate(self.lookups) if self.lookups else np.zeros(0, dtype=np.int32)
+
+    def padded_lookups(self, sizes):
+        """``lookup_start`` and ``lookup``, laid out in node order, for vocabularies that
+        grew to ``sizes`` since their nodes split (see hoeffding); the new codes lead nowhere"""
+        lookup_start = list(self.lookup_start)
+        lookups, offset = [], 0
+        for node, lookup in sorted(zip(self.lookup_nodes, self.lookups), key=lambda pair: pair[0]):
+            padded = np.full(sizes[self.feature[node]] + 1, -1, dtype=np.int32)
+            padded[:len(lookup) - 1] = lookup[:-1]
+            lookup_start[node] = offset
+            lookups.append(padded)
+            offset += len(padded)
+        return lookup_start, np.concatenate(lookups) if lookups else np.zeros(0, dtype=np.int32)
+
+    def partial(self) -> CompiledTree:
+        """The tree so far, routing encoded rows (numeric cuts compare value codes)"""
+        return CompiledTree(self.feature, self.cut, self.left, self.right, self.lookup_start, self._lookup(),
+                            np.zeros((self.n_nodes, 1), dtype=np.int64), self.impurity)
+
+    def finish(self) -> CompiledTree:
+        return CompiledTree(self.feature, self.threshold, self.left, self.right, self.lookup_start, self._lookup(),
+                            np.stack(self.counts), self.impurity)
+
+
+def count_frontier(columns, y: np.ndarray, slots: np.ndarray, n_slots: int, sizes, n_classes: int, weights=None):
+    """Class counts and per-feature value x class tables of every frontier slot.
+
+    ``slots[i]`` is the frontier slot of row ``i`` (rows outside the frontier
+    must already be dropped) and ``weights[i]``, if given, its weight. Returns
+    an (n_slots, n_classes) array and, per feature, an (n_slots, n_values,
+    n_classes) array, one bincount each.
+    """
+    y = y.astype(np.intp)
+    class_counts = tally(slots * n_classes + y, weights, n_slots * n_classes).reshape(n_slots, n_classes)
+    tables = []
+    for codes, size in zip(columns, sizes):
+        keys = (slots * size + codes) * n_classes + y
+        tables.append(tally(keys, weights, n_slots * size * n_classes).reshape(n_slots, size, n_classes))
+    return class_counts, tables
+
+
+def _sparse_counts(slots: np.ndarray, codes: np.ndarray, y: np.ndarray, size: int, n_classes: int, weights=None):
+    """The (slot, value code) pairs that occur, sorted, with their class counts"""
+    unique, inverse = np.unique(slots.astype(np.int64) * size + codes, return_inverse=True)
+    counts = tally(inverse.ravel() * n_classes + y, weights, len(unique) * n_classes)
+    return unique // size, unique % size, counts.reshape(len(unique), n_classes)
+
+
+def _numeric_gains(criterion, cumulative, right, valid):
+    """Gain of every cut, as ImpurityStrategy._best_cut ranks them"""
+    return np.where(valid, criterion._binary_gains(cumulative, right), -np.inf)
+
+
+def _score_dense(criterion, table, class_counts, totals, numeric: bool, min_samples_leaf: int = 1):
+    """Per-node (gain, split code, left counts) of one feature from its dense tables"""
+    n_nodes = len(table)
+    present = table.any(axis=2)
+    separates = np.count_nonzero(present, axis=1) > 1
+    if not numeric:
+        if min_samples_leaf > 1:
+            separates &= ~(present & (table.sum(axis=2) < min_samples_leaf)).any(axis=1)
+        return np.where(separates, criterion.split_gains(table), -np.inf), None, None
+    cumulative = np.cumsum(table, axis=1)
+    right = class_counts[:, None, :] - cumulative
+    # A cut after value c needs rows at c and rows above it
+    sizes_left = cumulative.sum(axis=2)
+    valid = present & (sizes_left < totals[:, None])
+    if min_samples_leaf > 1:
+        valid &= (sizes_left >= min_samples_leaf) & (totals[:, None] - sizes_left >= min_samples_leaf)
+        separates &= valid.any(axis=1)
+    gains = _numeric_gains(criterion, cumulative, right, valid)
+    codes = np.argmax(gains, axis=1)
+    rows = np.arange(n_nodes)
+    return np.where(separates, gains[rows, codes], -np.inf), codes, cumulative[rows, codes]
+
+
+def _score_sparse(criterion, node, code, counts, class_counts, totals, numeric: bool, min_samples_leaf: int = 1):
+    """Same as _score_dense from the sorted (node, code) pairs of _sparse_counts"""
+    n_nodes = len(class_counts)
+    starts = np.flatnonzero(np.concatenate(([True], node[1:] != node[:-1])))
+    lengths = np.diff(np.append(starts, len(node)))
+    owners = node[starts]
+    score = np.full(n_nodes, -np.inf)
+    separates = lengths > 1
+    if not numeric:
+        if min_samples_leaf > 1:
+            separates &= np.minimum.reduceat(counts.sum(axis=1), starts) >= min_samples_leaf
+        # Branch terms add up, so each node's run of values is one reduceat
+        terms = np.add.reduceat(criterion._branch_terms(counts, class_counts[node]), starts, axis=0)
+        score[owners] = np.where(separates, criterion._gains_from_terms(terms, class_counts[owners]), -np.inf)
+        return score, None, None
+    cumulative = np.cumsum(counts, axis=0)
+    before = np.zeros((len(starts), counts.shape[1]), dtype=cumulative.dtype)
+    before[1:] = cumulative[starts[1:] - 1]
+    cumulative -= np.repeat(before, lengths, axis=0)
+    node_totals = totals[node]
+    right = class_counts[node] - cumulative
+    sizes_left = cumulative.sum(axis=1)
+    valid = sizes_left < node_totals
+    if min_samples_leaf > 1:
+        valid &= (sizes_left >= min_samples_leaf) & (node_totals - sizes_left >= min_samples_leaf)
+    gains = _numeric_gains(criterion, cumulative, right, valid)
+    # First maximum of every node's run of cuts
+    maxima = np.repeat(np.maximum.reduceat(gains, starts), lengths)
+    candidates = np.flatnonzero((gains == maxima) & np.isfinite(gains))
+    chosen_nodes, first = np.unique(node[candidates], return_index=True)
+    chosen = candidates[first]
+    codes = np.zeros(n_nodes, dtype=np.int64)
+    left = np.zeros_like(class_counts)
+    codes[chosen_nodes], left[chosen_nodes] = code[chosen], cumulative[chosen]
+    score[chosen_nodes] = gains[chosen]
+    return score, codes, left
+
+
+class Limits(NamedTuple):
+    """Pre-pruning rules shared by the level-wise builders (see Tree)"""
+    max_depth: int | None = None
+    min_samples_split: int = 2
+    min_samples_leaf: int = 1
+    min_impurity_decrease: float = 0.0
+
+    def expandable(self, counts: np.ndarray, depth: int) -> bool:
+        """Whether a node with class ``counts`` at ``depth`` is searched for a split"""
+        return (np.count_nonzero(counts) > 1 and counts.sum() >= self.min_samples_split
+                and (self.max_depth is None or depth < self.max_depth))
+
+    def decreases_enough(self, criterion, impurity: float, table: np.ndarray, n_samples) -> bool:
+        """Whether splitting a node of ``impurity`` into the branch x class ``table`` decreases
+        impurity, weighted by the node's share of ``n_samples`` training samples, by
+        ``min_impurity_decrease``"""
+        if self.min_impurity_decrease <= 0:
+            return True
+        decrease = table.sum() / n_samples * (impurity - criterion._weighted_impurity(table))
+        return decrease >= self.min_impurity_decrease
+
+
+class _Choice:
+    """Running best split of every frontier node over the features scored so far"""
+
+    def __init__(self, n_nodes: int, n_classes: int, dtype=np.int64) -> None:
+        self.gain = np.full(n_nodes, -np.inf)
+        self.feature = np.full(n_nodes, -1)
+        self.code = np.full(n_nodes, -1)
+        self.left = np.zeros((n_nodes, n_classes), dtype=dtype)
+
+    def update(self, position: int, gain, codes, left) -> None:
+        # Strictly better only, so ties keep the earlier feature as the recursive builder does
+        better = gain > self.gain
+        self.gain[better] = gain[better]
+        self.feature[better] = position
+        if codes is not None:
+            self.code[better] = codes[better]
+            self.left[better] = left[better]
+
+    def splits(self, criterion, data: Dataset) -> list:
+        """Per node None, or (feature position, split code or None, threshold or None)"""
+        splits = []
+        for node, position in enumerate(self.feature.tolist()):
+            if position < 0:
+                splits.append(None)
+            elif data.numeric[position]:
+                code = int(self.code[node])
+                splits.append((position, code, criterion._threshold_value(data, position, code)))
+            else:
+                splits.append((position, None, None))
+        return splits
+
+
+def best_splits(criterion, data: Dataset, class_counts: np.ndarray, tables, impurity, n_samples: int,
+                limits: Limits = Limits()) -> list:
+    """Best split of every frontier node from the dense tables of count_frontier.
+
+    Numeric features are scored on every cut between present values (as
+    ImpurityStrategy._threshold_sweep does), categorical ones on all their
+    present values. ``impurity`` holds the frontier nodes' impurities and
+    ``n_samples`` the training set size, for ``limits.min_impurity_decrease``.
+    Returns what _Choice.splits does.
+    """
+    totals = class_counts.sum(axis=1).astype(np.float64)
+    choice = _Choice(len(class_counts), class_counts.shape[1], class_counts.dtype)
+    for position, table in enumerate(tables):
+        choice.update(position, *_score_dense(criterion, table, class_counts, totals, data.numeric[position],
+                                              limits.min_samples_leaf))
+    splits = choice.splits(criterion, data)
+    for slot, split in enumerate(splits):
+        if split is None:
+            continue
+        position, split_code, _ = split
+        table = (tables[position][slot] if split_code is None
+                 else np.stack([choice.left[slot], class_counts[slot] - choice.left[slot]]))
+        if not limits.decreases_enough(criterion, impurity[slot], table, n_samples):
+            splits[slot] = None
+    return splits
+
+
+def grow_levelwise(criterion, data: Dataset, trace=None, limits: Limits = Limits()) -> CompiledTree:
+    """Grow a tree over all rows of ``data`` one level at a time, within ``limits``.
+
+    A feature whose frontier tables would have more (node, value) cells than
+    the frontier has rows is counted sparsely. ``trace`` receives a LevelGrown
+    event per level.
+    """
+    n_classes = data.n_classes
+    sizes = [len(vocabulary) for vocabulary in data.vocabularies]
+    root_counts = data.tally(data.y, minlength=n_classes)
+    tree = FrontierTree(root_counts, lambda counts: float(criterion._impurity_from_counts(counts)))
+    node_of_row = np.zeros(data.n_samples, dtype=np.int32)
+    rows = np.arange(data.n_samples)
+    frontier = [0] if limits.expandable(root_counts, 0) else []
+    depth = 0
+    while frontier:
+        slot_of = np.full(tree.n_nodes, -1, dtype=np.intp)
+        slot_of[frontier] = np.arange(len(frontier))
+        slots = slot_of[node_of_row[rows]]
+        rows, slots = rows[slots >= 0], slots[slots >= 0]
+        y = data.y[rows].astype(np.intp)
+        weights = None if data.weights is None else data.weights[rows]
+        n_slots = len(frontier)
+        class_counts = tally(slots * n_classes + y, weights, n_slots * n_classes).reshape(n_slots, n_classes)
+        totals = class_counts.sum(axis=1).astype(np.float64)
+
+        def score(feature):
+            position = data.feature_position(feature)
+            size = sizes[position]
+            codes = data.columns[position][rows]
+            numeric = data.numeric[position]
+            if n_slots * size <= len(rows):
+                table = count_frontier([codes], y, slots, n_slots, [size], n_classes, weights)[1][0]
+                return _score_dense(criterion, table, class_counts, totals, numeric, limits.min_samples_leaf)
+            node, code, counts = _sparse_counts(slots, codes, y, size, n_classes, weights)
+            return _score_sparse(criterion, node, code, counts, class_counts, totals, numeric,
+                                 limits.min_samples_leaf)
+
+        # Features are scored as the criterion scores them elsewhere (threaded, timed by a
+        # Profiler); results come back in feature order, so ties still go to the earlier one
+        choice = _Choice(n_slots, n_classes, class_counts.dtype)
+        for position, scored in enumerate(criterion._map_features(score, data.feature_names)):
+            choice.update(position, *scored)
+        splits = choice.splits(criterion, data)
+        branches = _categorical_branches(data, choice, rows, slots, y, n_classes, weights)
+        next_frontier = []
+        for slot, split in enumerate(splits):
+            if split is None:
+                continue
+            position, split_code, threshold = split
+            if split_code is not None:
+                left = choice.left[slot]
+                node_branches = [(0, left), (1, class_counts[slot] - left)]
+            else:
+                node_branches = branches[slot]
+            table = np.stack([counts for _, counts in node_branches])
+            if not limits.decreases_enough(criterion, tree.impurity[frontier[slot]], table, data.total_weight):
+                choice.feature[slot] = -1
+                continue
+            children = tree.split(frontier[slot], position, sizes[position], split_code, threshold, node_branches)
+            next_frontier.extend(child for child in children if limits.expandable(tree.counts[child], depth + 1))
+
+        # Move the rows of the nodes just split one level down
+        split_rows = choice.feature[slots] >= 0
+        rows, slots = rows[split_rows], slots[split_rows]
+        node_of_row[rows] = _route_one_level(tree, data, node_of_row[rows], rows)
+        if trace is not None:
+            trace.emit(LevelGrown(depth, n_slots))
+        frontier = next_frontier
+        depth += 1
+    return tree.finish()
+
+
+def _categorical_branches(data: Dataset, choice: _Choice, rows, slots, y, n_classes: int, weights=None) -> dict:
+    """Per-value class counts of every node whose best split is categorical"""
+    branches = {}
+    for position in np.unique(choice.feature[choice.feature >= 0]):
+        if data.numeric[position]:
+            continue
+        mine = choice.feature[slots] == position
+        node, code, counts = _sparse_counts(slots[mine], data.columns[position][rows[mine]], y[mine],
+                                            len(data.vocabularies[position]), n_classes,
+                                            None if weights is None else weights[mine])
+        for slot, value, value_counts in zip(node.tolist(), code.tolist(), counts):
+            branches.setdefault(slot, []).append((value, value_counts))
+    return branches
+
+
+def _route_one_level(tree: FrontierTree, data: Dataset, nodes: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Child of each of ``nodes`` (all just split) for the matching ``rows``"""
+    feature = np.asarray(tree.feature)[nodes]
+    cut = np.asarray(tree.cut)[nodes]
+    left, right = np.asarray(tree.left)[nodes], np.asarray(tree.right)[nodes]
+    lookup_start, lookup = np.asarray(tree.lookup_start)[nodes], tree._lookup()
+    children = np.empty(len(nodes), dtype=np.int32)
+    for position in np.unique(feature):
+        mine = feature == position
+        codes = data.columns[position][rows[mine]]
+        if data.numeric[position]:
+            children[mine] = np.where(codes <= cut[mine], left[mine], right[mine])
+        else:
+            children[mine] = lookup[lookup_start[mine] + codes]
+    return children
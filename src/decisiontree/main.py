@@ -157,8 +157,14 @@ def select_criterion():
         console.print("✅ [green]Selected:[/green] Gini Index")
         return GiniIndex()
 
-def build_rich_tree(tree_dict, name="Decision Tree"):
-    """Convert decision tree to rich Tree for beautiful display"""
+def build_rich_tree(tree_dict, name="Decision Tree", branch_text=None):
+    """Convert decision tree to rich Tree for beautiful display.
+
+    ``branch_text(feature, value)`` words each branch, e.g. Tree.branch_text"""
+    if branch_text is None:
+        def branch_text(feature, value):
+            return f"{feature} = '{value}'"
+
     def add_branches(tree_node, tree_dict):
         if not isinstance(tree_dict, dict):
             # Leaf node
@@ -168,7 +174,7 @@ def build_rich_tree(tree_dict, name="Decision Tree"):
         for feature, branches in tree_dict.items():
             feature_node = tree_node.add(f"🔍 [bold blue]{feature}[/bold blue]")
             for value, subtree in branches.items():
-                value_node = feature_node.add(f"├─ [yellow]if {feature} = '{value}'[/yellow]")
+                value_node = feature_node.add(f"├─ [yellow]if {branch_text(feature, value)}[/yellow]")
                 add_branches(value_node, subtree)
     
     tree = RichTree(f"🌳 [bold magenta]{name}[/bold magenta]")
@@ -273,7 +279,7 @@ def main():
         
         # Step 6: Display tree
         console.print("\n🌳 [bold]Decision Tree Structure[/bold]")
-        rich_tree = build_rich_tree(tree.tree)
+        rich_tree = build_rich_tree(tree.tree, branch_text=tree.branch_text)
         console.print(rich_tree)
         
         # Step 7: Predictions
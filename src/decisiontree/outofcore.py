@@ -0,0 +1,205 @@
+"""
+Out-of-core training
+====================
+
+Grow a tree from a CSV file that does not fit in memory. One scan collects
+every column's vocabulary (numeric columns are quantile-binned from their
+value counts, as in histogram mode); afterwards the tree is grown one level
+per pass. Each pass routes every chunk through the levels built so far and
+accumulates, for every node of the frontier, a value (or bin) x class table
+per feature. Splits for the whole frontier are then chosen from those tables
+alone (see levelwise). Memory is bounded by the chunk size plus frontier
+size x feature cardinality x classes, never by the number of rows.
+"""
+
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from .dataset import Dataset, _bin_edges, _code_dtype, _factorize, _is_numeric
+from .compiled import CompiledTree
+from .levelwise import FrontierTree, Limits, best_splits, count_frontier
+from .trace import LevelGrown
+
+
+class CsvChunks:
+    """Encoded chunks of a CSV file, re-read from disk on every pass.
+
+    ``scan`` reads the file once to build the encoding Dataset (it has no rows).
+    Iterating then yields ``(columns, y)`` code arrays per chunk. With
+    ``cache_dir`` the first iteration also stores the encoded chunks there as
+    ``.npy`` files, and later passes memory-map those instead of parsing CSV.
+    """
+
+    def __init__(self, path, target: str, chunksize: int = 100_000, categorical=None, dtype=None,
+                 cache_dir=None) -> None:
+        if chunksize <= 0:
+            raise ValueError("chunksize must be positive")
+        self.path = path
+        self.target = target
+        self.chunksize = chunksize
+        self.categorical = categorical
+        self.dtype = dtype
+        self.cache_dir = None if cache_dir is None else Path(cache_dir)
+        self.dataset = None
+        self.n_samples = 0
+        self._n_cached = None
+        self._ends = []
+
+    def _read(self):
+        return pd.read_csv(self.path, chunksize=self.chunksize, dtype=self.dtype)
+
+    def _categorical(self, name: str) -> bool:
+        return name == self.target or self.categorical is True or name in (self.categorical or ())
+
+    def scan(self, max_bins: int = 255) -> Dataset:
+        """Read the file once and build the (row-less) encoding of every column"""
+        if not 2 <= max_bins <= 256:
+            raise ValueError("max_bins must be between 2 and 256")
+        names, numeric, values, counts, missing = None, {}, {}, {}, {}
+        self.n_samples = 0
+        for chunk in self._read():
+            if names is None:
+                if self.target not in chunk.columns:
+                    raise KeyError(f"Target column '{self.target}' not found")
+                names = list(chunk.columns)
+                for name in names:
+                    numeric[name], values[name], missing[name] = None, set(), False
+                    counts[name] = pd.Series(dtype=np.float64)
+            self.n_samples += len(chunk)
+            for name in names:
+                column = chunk[name]
+                missing[name] |= bool(column.isna().any())
+                present = column.dropna()
+                if present.empty:
+                    continue
+                is_numeric = not self._categorical(name) and _is_numeric(column)
+                if numeric[name] not in (None, is_numeric):
+                    raise ValueError(f"Column '{name}' parses as numbers in some chunks and not in others; "
+                                     "pass its dtype or list it as categorical")
+                numeric[name] = is_numeric
+                if is_numeric:
+                    counts[name] = counts[name].add(present.value_counts(), fill_value=0)
+                else:
+                    values[name].update(present.unique().tolist())
+        if names is None:
+            raise ValueError("No rows to train on")
+
+        feature_names = [name for name in names if name != self.target]
+        vocabularies, flags, self._ends = [], [], []
+        for name in feature_names:
+            # Columns without a single value read as float, like a full read_csv would
+            is_numeric = not self._categorical(name) if numeric[name] is None else numeric[name]
+            flags.append(is_numeric)
+            if is_numeric:
+                value_counts = counts[name].sort_index()
+                vocabulary = value_counts.index.to_numpy(np.float64)
+                value_counts = value_counts.to_numpy(np.int64)
+                if missing[name]:
+                    vocabulary = np.append(vocabulary, np.nan)
+                    value_counts = np.append(value_counts, 0)
+                _, upper = _bin_edges(value_counts, vocabulary, max_bins)
+                vocabularies.append(upper)
+                # A value falls in the first bin whose upper bound is not below it
+                self._ends.append(upper[:len(upper) - missing[name]])
+            else:
+                vocabularies.append(self._vocabulary(values[name], missing[name]))
+                self._ends.append(None)
+        classes = self._vocabulary(values[self.target], missing[self.target])
+        self.dataset = Dataset.from_vocabularies(feature_names, vocabularies, flags, flags, self.target, classes)
+        self._n_cached = None
+        return self.dataset
+
+    @staticmethod
+    def _vocabulary(values: set, missing: bool) -> np.ndarray:
+        labels = pd.Series(list(values) + ([np.nan] if missing else []), dtype=object)
+        return _factorize(labels)[1]
+
+    def _encode(self, chunk: pd.DataFrame):
+        dataset = self.dataset
+        columns = []
+        for j, feature in enumerate(dataset.feature_names):
+            vocabulary = dataset.vocabularies[j]
+            if dataset.numeric[j]:
+                values = pd.to_numeric(chunk[feature], errors='coerce').to_numpy(np.float64)
+                codes = np.searchsorted(self._ends[j], values, side='left')
+                codes[np.isnan(values)] = len(vocabulary) - 1
+            else:
+                codes = pd.Index(vocabulary).get_indexer(chunk[feature])
+            columns.append(codes.astype(_code_dtype(len(vocabulary))))
+        y = pd.Index(dataset.classes).get_indexer(chunk[self.target]).astype(_code_dtype(dataset.n_classes))
+        return columns, y
+
+    def __iter__(self):
+        if self.dataset is None:
+            self.scan()
+        if self._n_cached is not None:
+            for i in range(self._n_cached):
+                columns = [np.load(self.cache_dir / f"chunk{i}_x{j}.npy", mmap_mode='r')
+                           for j in range(self.dataset.n_features)]
+                yield columns, np.load(self.cache_dir / f"chunk{i}_y.npy", mmap_mode='r')
+            return
+        n_chunks = 0
+        for chunk in self._read():
+            columns, y = self._encode(chunk)
+            if self.cache_dir is not None:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                for j, codes in enumerate(columns):
+                    np.save(self.cache_dir / f"chunk{n_chunks}_x{j}.npy", codes)
+                np.save(self.cache_dir / f"chunk{n_chunks}_y.npy", y)
+            n_chunks += 1
+            yield columns, y
+        if self.cache_dir is not None:
+            self._n_cached = n_chunks
+
+
+def grow_out_of_core(criterion, chunks: CsvChunks, trace=None, limits: Limits = Limits()) -> CompiledTree:
+    """Grow a tree breadth-first with one pass over ``chunks`` per level.
+
+    Every pass routes each chunk through the partial tree, adds its frontier
+    tables (see levelwise.count_frontier) to the running totals, and the whole
+    frontier is then split at once from those totals, within ``limits``.
+    ``trace`` receives a LevelGrown event per pass.
+    """
+    dataset = chunks.dataset if chunks.dataset is not None else chunks.scan()
+    n_classes = dataset.n_classes
+    sizes = [len(vocabulary) for vocabulary in dataset.vocabularies]
+    tree = None
+    frontier, depth = [0], 0
+    while frontier:
+        partial = tree.partial() if tree is not None else None
+        slot_of = np.full(len(frontier) if tree is None else tree.n_nodes, -1, dtype=np.intp)
+        slot_of[frontier] = np.arange(len(frontier))
+        class_counts, tables = 0, [0] * len(sizes)
+        for columns, y in chunks:
+            slots = slot_of[partial.apply(columns)] if partial is not None else np.zeros(len(y), dtype=np.intp)
+            rows = np.flatnonzero(slots >= 0)
+            chunk_counts, chunk_tables = count_frontier([column[rows] for column in columns], y[rows], slots[rows],
+                                                        len(frontier), sizes, n_classes)
+            class_counts = class_counts + chunk_counts
+            tables = [total + table for total, table in zip(tables, chunk_tables)]
+        if trace is not None:
+            trace.emit(LevelGrown(depth, len(frontier)))
+        if tree is None:
+            tree = FrontierTree(class_counts[0], lambda counts: float(criterion._impurity_from_counts(counts)))
+            if not limits.expandable(class_counts[0], 0):
+                break
+
+        next_frontier = []
+        impurity = np.asarray(tree.impurity)[frontier]
+        splits = best_splits(criterion, dataset, class_counts, tables, impurity, chunks.n_samples, limits)
+        for slot, split in enumerate(splits):
+            if split is None:
+                continue
+            position, split_code, threshold = split
+            table = tables[position][slot]
+            if split_code is not None:
+                branches = [(0, table[:split_code + 1].sum(axis=0)), (1, table[split_code + 1:].sum(axis=0))]
+            else:
+                branches = [(code, table[code]) for code in np.flatnonzero(table.any(axis=1))]
+            children = tree.split(frontier[slot], position, sizes[position], split_code, threshold, branches)
+            # Pure children are final; the rest need their tables from the next pass
+            next_frontier.extend(child for child in children if limits.expandable(tree.counts[child], depth + 1))
+        frontier = next_frontier
+        depth += 1
+    return tree.finish()
@@ -0,0 +1,146 @@
+"""
+Parallel tree building
+======================
+
+Subtrees below a split are independent: each child owns a disjoint range of
+the shared sample array (and of every presorted order), so they can be built
+by different processes at once. The encoded columns, the target and those
+index arrays are placed in shared memory; every worker maps them once and
+partitions its own ranges in place, so a task is only a (start, end, depth)
+range plus, in histogram mode, the node's histograms.
+
+A task builds its node and every child smaller than ``min_task_samples``
+inline. Larger children are handed back unbuilt as new tasks, so big subtrees
+spread over whichever workers are idle. Only finished subtrees travel back,
+and the result is identical to the serial build.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+
+from .dataset import Dataset
+
+_worker = {}
+
+
+class SharedArrays:
+    """Shared memory blocks of one parallel run.
+
+    The parent process ``share``s copies of its arrays inside
+    ``with SharedArrays() as shared:`` and hands the specs to its workers,
+    which ``attach`` them once at start-up through an instance of their own.
+    Leaving the block closes and unlinks the blocks it created.
+    """
+
+    def __init__(self) -> None:
+        self.blocks = []
+        self._created = []
+
+    def __enter__(self) -> "SharedArrays":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def share(self, array: np.ndarray):
+        """Copy ``array`` into a new shared memory block; returns (spec, shared view)"""
+        block = SharedMemory(create=True, size=max(array.nbytes, 1))
+        self.blocks.append(block)
+        self._created.append(block)
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+        view[...] = array
+        return (block.name, array.shape, array.dtype.str), view
+
+    def attach(self, spec) -> np.ndarray:
+        """View of the block another process shared as ``spec``"""
+        name, shape, dtype = spec
+        block = SharedMemory(name=name)
+        self.blocks.append(block)
+        return np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+    def share_dataset(self, data: Dataset):
+        """Spec of ``data`` with its columns and target in shared memory, for attach_dataset"""
+        return (Dataset._from_parts(data, [], None), [self.share(column)[0] for column in data.columns],
+                self.share(data.y)[0])
+
+    def attach_dataset(self, spec) -> Dataset:
+        template, column_specs, y_spec = spec
+        return Dataset._from_parts(template, [self.attach(column) for column in column_specs], self.attach(y_spec))
+
+    def close(self) -> None:
+        for block in self.blocks:
+            try:
+                block.close()
+            except BufferError:
+                # Still referenced by a propagating traceback; the mapping goes with the process
+                pass
+        for block in self._created:
+            block.unlink()
+        self.blocks, self._created = [], []
+
+
+def _init_worker(tree, data_spec, samples_spec, order_specs) -> None:
+    shared = SharedArrays()
+    _worker.update(tree=tree, data=shared.attach_dataset(data_spec), samples=shared.attach(samples_spec),
+                   orders={j: shared.attach(spec) for j, spec in order_specs.items()}, shared=shared)
+
+
+def _build_task(start: int, end: int, depth: int, histograms):
+    """Build one deferred node in a worker; returns (subtree, its own deferred children)"""
+    tree = _worker['tree']
+    tree._deferred = []
+    with tree.criterion.threads():
+        node = tree._build(_worker['data'], _worker['samples'], _worker['orders'], start, end, depth, histograms)
+    return node, tree._deferred
+
+
+def _fill(placeholder, node) -> None:
+    for slot in type(node).__slots__:
+        setattr(placeholder, slot, getattr(node, slot))
+
+
+def build_parallel(tree, data: Dataset, samples: np.ndarray, orders: dict, histograms, depth: int,
+                   n_workers: int):
+    """Grow ``tree`` over ``data`` with ``n_workers`` processes, like Tree._build from the root"""
+    with SharedArrays() as shared:
+        return _build_shared(tree, data, samples, orders, histograms, depth, n_workers, shared)
+
+
+def _build_shared(tree, data: Dataset, samples: np.ndarray, orders: dict, histograms, depth: int,
+                  n_workers: int, shared: SharedArrays):
+    data_spec = shared.share_dataset(data)
+    samples_spec, shared_samples = shared.share(samples)
+    order_specs, shared_orders = {}, {}
+    for j, order in orders.items():
+        order_specs[j], shared_orders[j] = shared.share(order)
+
+    worker_tree = tree.__class__.__new__(tree.__class__)
+    worker_tree.__dict__.update({key: value for key, value in tree.__dict__.items()
+                                 if key not in ('df', 'dataset', '_root', '_tree', '_compiled')})
+    worker_tree.build_jobs = None
+
+    # The root is split here; everything below it that is large enough becomes a task
+    tree._deferred = []
+    try:
+        root = tree._build(data, shared_samples, shared_orders, 0, len(samples), depth, histograms)
+        deferred = tree._deferred
+    finally:
+        tree._deferred = None
+    if deferred:
+        initargs = (worker_tree, data_spec, samples_spec, order_specs)
+        with ProcessPoolExecutor(n_workers, initializer=_init_worker, initargs=initargs) as pool:
+            tasks = {pool.submit(_build_task, start, end, task_depth, task_histograms): placeholder
+                     for placeholder, start, end, task_depth, task_histograms in deferred}
+            while tasks:
+                done, _ = wait(tasks, return_when=FIRST_COMPLETED)
+                for task in done:
+                    placeholder = tasks.pop(task)
+                    node, children = task.result()
+                    _fill(placeholder, node)
+                    for child, start, end, task_depth, task_histograms in children:
+                        tasks[pool.submit(_build_task, start, end, task_depth, task_histograms)] = child
+    samples[:] = shared_samples
+    for j, order in orders.items():
+        order[:] = shared_orders[j]
+    return root
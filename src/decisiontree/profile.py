@@ -0,0 +1,178 @@
+"""
+Profiling
+=========
+
+``Tree(profile=True)`` attaches a Profiler that times the phases of fitting
+and predicting (encoding, presorting or histogramming, split scoring,
+partitioning, leaf creation, prediction), the scoring time of every feature,
+the number of impurity evaluations (node impurities and candidate split gains)
+and the nodes made at each depth. With
+``memory=True`` (the default) each phase also records the peak memory traced
+by ``tracemalloc`` while it ran; tracing every allocation slows a build
+several times over, so ``Tree(profile="time")`` leaves it off when the
+timings themselves matter. ``report()`` returns it all as plain data and
+``save(path)`` writes it as JSON.
+
+Trees without a profiler run their phases through a shared null context.
+"""
+
+from contextlib import contextmanager, nullcontext
+import json
+import threading
+import time
+import tracemalloc
+import numpy as np
+
+_UNTIMED = nullcontext()
+
+
+def _leading(array, trailing: int) -> int:
+    """Number of vectors (or tables) along all but the last ``trailing`` axes of ``array``"""
+    return int(np.prod(np.shape(array)[:-trailing]))
+
+
+# Criterion kernels the profiler counts, with the number of impurities or gains
+# each call evaluates; branch terms are only part of a gain, so they count nothing
+_KERNELS = {
+    '_impurity_from_counts': lambda counts: _leading(counts, 1),
+    'split_gains': lambda tables: _leading(tables, 2),
+    '_binary_gains': lambda left, right: _leading(left, 1),
+    '_gains_from_terms': lambda terms, parent: _leading(parent, 1),
+    '_branch_terms': None,
+}
+
+
+def untimed(name: str):
+    """Stand-in for Profiler.phase when nothing is being profiled"""
+    return _UNTIMED
+
+
+class Profiler:
+    def __init__(self, memory: bool = True) -> None:
+        self.memory = memory
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.phases = {}
+        self.features = {}
+        self.impurity_calls = 0
+        self.impurity_evaluations = 0
+        self.nodes_per_depth = []
+        self._open = []
+        self._started_tracing = False
+
+    def start(self) -> None:
+        """Begin tracing memory, if asked to and nobody else already does"""
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop(self) -> None:
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _fold_peak(self) -> None:
+        # Credit the peak since the last reset to every open phase, then start a new interval
+        if not tracemalloc.is_tracing():
+            return
+        peak = tracemalloc.get_traced_memory()[1]
+        for stats in self._open:
+            stats['peak_bytes'] = max(stats['peak_bytes'], peak)
+        tracemalloc.reset_peak()
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time (and trace the peak memory of) the enclosed block as phase ``name``"""
+        stats = self.phases.setdefault(name, {'seconds': 0.0, 'calls': 0, 'peak_bytes': 0})
+        self._fold_peak()
+        self._open.append(stats)
+        start = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            stats['seconds'] += time.perf_counter() - start
+            stats['calls'] += 1
+            self._fold_peak()
+            self._open.pop()
+
+    def time_feature(self, feature: str, seconds: float) -> None:
+        with self._lock:
+            stats = self.features.setdefault(feature, {'seconds': 0.0, 'calls': 0})
+            stats['seconds'] += seconds
+            stats['calls'] += 1
+
+    def count_impurity(self, evaluations: int) -> None:
+        """One outermost call of a criterion's kernels, evaluating ``evaluations`` impurities or gains"""
+        with self._lock:
+            self.impurity_calls += 1
+            self.impurity_evaluations += evaluations
+
+    @contextmanager
+    def instrument(self, criterion):
+        """Count ``criterion``'s impurity evaluations and time each feature it scores.
+
+        Node impurities (one per class-count vector) and split gains (one per
+        candidate split) are counted where they enter the kernels; a kernel
+        calling another, as GiniIndex's gains call its impurity, counts once, so
+        every criterion reports the same thing. Strategies wrapping another
+        criterion (RandomSubspace, ExtraTrees) have it instrumented too. The
+        kernels are shadowed by wrappers on the instances for the duration of
+        the block only.
+        """
+        local = threading.local()
+
+        def counted(kernel, evaluations):
+            def wrapper(*args):
+                depth = getattr(local, 'depth', 0)
+                if depth == 0 and evaluations is not None:
+                    self.count_impurity(evaluations(*args))
+                local.depth = depth + 1
+                try:
+                    return kernel(*args)
+                finally:
+                    local.depth = depth
+            return wrapper
+
+        def timed_map(map_features):
+            def wrapper(score, features):
+                def timed(feature):
+                    start = time.perf_counter()
+                    result = score(feature)
+                    self.time_feature(feature, time.perf_counter() - start)
+                    return result
+                return map_features(timed, features)
+            return wrapper
+
+        instrumented = []
+        while criterion is not None and criterion not in instrumented:
+            for name, evaluations in _KERNELS.items():
+                setattr(criterion, name, counted(getattr(criterion, name), evaluations))
+            criterion._map_features = timed_map(criterion._map_features)
+            instrumented.append(criterion)
+            criterion = getattr(criterion, 'criterion', None)
+        try:
+            yield
+        finally:
+            for criterion in instrumented:
+                for name in (*_KERNELS, '_map_features'):
+                    delattr(criterion, name)
+
+    def count_nodes(self, compiled) -> None:
+        """Nodes per depth of a compiled tree"""
+        self.nodes_per_depth = np.bincount(compiled.depths()).tolist() if compiled.n_nodes else []
+
+    def report(self) -> dict:
+        return {
+            'phases': {name: dict(stats) for name, stats in self.phases.items()},
+            'features': {name: dict(stats) for name, stats in self.features.items()},
+            'impurity_calls': self.impurity_calls,
+            'impurity_evaluations': self.impurity_evaluations,
+            'nodes_per_depth': list(self.nodes_per_depth),
+            'memory_traced': self.memory,
+        }
+
+    def save(self, path) -> None:
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
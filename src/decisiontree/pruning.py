@@ -0,0 +1,101 @@
+"""
+Cost-complexity pruning
+=======================
+
+Minimal cost-complexity pruning works on the statistics every fitted tree
+already keeps: node ``t`` costs ``R(t) = n_t / n * impurity(t)`` as a leaf,
+and the subtree below it costs the sum of its leaves. Collapsing ``t`` saves
+``|leaves(t)| - 1`` leaves for ``R(t) - R(subtree(t))`` more cost, so its
+effective alpha is the ratio of the two. The weakest link, the node with the
+smallest effective alpha, is collapsed repeatedly until only the root is
+left. Each collapse only changes its ancestors' alphas, which go back on a
+heap, so the whole sequence takes one pass over the compiled arrays and
+never looks at training data.
+"""
+
+import heapq
+import numpy as np
+
+from .compiled import CompiledTree
+
+
+def weakest_links(compiled: CompiledTree):
+    """Yield (alpha, node, total leaf cost, leaves) for each collapse in weakest-link order.
+
+    ``alpha`` is non-decreasing: a link that becomes weaker than an earlier one
+    is collapsed at the earlier alpha."""
+    if np.isnan(compiled.impurity).any():
+        raise ValueError("Cost-complexity pruning needs node impurities; "
+                         "this tree was grown by a strategy without count kernels")
+    n_nodes = compiled.n_nodes
+    samples = compiled.n_samples.astype(np.float64)
+    risk = samples / samples[0] * compiled.impurity
+    parent = compiled.parents()
+    children = compiled.children()
+    internal = compiled.feature >= 0
+
+    # Cost and leaf count of every subtree; parents are numbered before children
+    subtree = np.where(internal, 0.0, risk)
+    leaves = np.where(internal, 0, 1).astype(np.int64)
+    for node in range(n_nodes - 1, 0, -1):
+        subtree[parent[node]] += subtree[node]
+        leaves[parent[node]] += leaves[node]
+
+    def link(node):
+        return max(risk[node] - subtree[node], 0.0) / (leaves[node] - 1)
+
+    heap = [(link(node), node) for node in np.flatnonzero(internal).tolist()]
+    heapq.heapify(heap)
+    alive = internal.copy()
+    alpha = 0.0
+    while heap:
+        strength, node = heapq.heappop(heap)
+        # Entries of collapsed nodes, and those superseded by a descendant's collapse, are stale
+        if not alive[node] or strength != link(node):
+            continue
+        alpha = max(alpha, strength)
+        saved_cost, saved_leaves = risk[node] - subtree[node], leaves[node] - 1
+        stack = [node]
+        while stack:
+            below = stack.pop()
+            if alive[below]:
+                alive[below] = False
+                stack.extend(children[below])
+        subtree[node], leaves[node] = risk[node], 1
+        ancestor = parent[node]
+        while ancestor >= 0:
+            subtree[ancestor] += saved_cost
+            leaves[ancestor] -= saved_leaves
+            heapq.heappush(heap, (link(ancestor), ancestor))
+            ancestor = parent[ancestor]
+        yield alpha, node, subtree[0], int(leaves[0])
+
+
+def cost_complexity_path(compiled: CompiledTree) -> dict:
+    """Effective alphas of the pruning sequence, with the total leaf impurity
+    and leaf count of the tree pruned at each one.
+
+    The first alpha is 0 (the fitted tree, less any splits that decreased
+    impurity by nothing) and the last leaves only the root."""
+    internal = compiled.feature >= 0
+    samples = compiled.n_samples.astype(np.float64)
+    leaf_cost = float((samples / samples[0] * compiled.impurity)[~internal].sum())
+    alphas, impurities, n_leaves = [0.0], [leaf_cost], [int(np.count_nonzero(~internal))]
+    for alpha, _, cost, leaves in weakest_links(compiled):
+        if alpha == alphas[-1]:
+            impurities[-1], n_leaves[-1] = cost, leaves
+        else:
+            alphas.append(alpha)
+            impurities.append(cost)
+            n_leaves.append(leaves)
+    return {'ccp_alphas': np.array(alphas), 'impurities': np.array(impurities), 'n_leaves': np.array(n_leaves)}
+
+
+def prune(compiled: CompiledTree, ccp_alpha: float) -> CompiledTree:
+    """The subtree left after collapsing every weakest link with effective alpha <= ``ccp_alpha``"""
+    collapsed = []
+    for alpha, node, _, _ in weakest_links(compiled):
+        if alpha > ccp_alpha:
+            break
+        collapsed.append(node)
+    return compiled.collapse(collapsed) if collapsed else compiled
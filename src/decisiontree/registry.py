@@ -0,0 +1,178 @@
+"""
+Model registry
+==============
+
+Serve many saved trees from one process. Models are registered by name and
+opened lazily, memory-mapped, the first time they are used; the most recently
+used ones stay open within a memory budget and the least recently used are
+closed first when it is exceeded.
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from .serialization import load_model
+from .tree import Tree
+
+
+def _array_nbytes(array) -> int:
+    """Bytes of an array, counting the Python objects an object array points to"""
+    array = np.asarray(array)
+    if array.dtype != object:
+        return array.nbytes
+    return array.nbytes + sum(sys.getsizeof(value) for value in array.tolist())
+
+
+def model_nbytes(tree: Tree) -> int:
+    """Bytes held by a loaded tree's node arrays and vocabularies"""
+    compiled = tree.compile()
+    arrays = [compiled.feature, compiled.threshold, compiled.left, compiled.right, compiled.lookup_start,
+              compiled.lookup, compiled.counts, compiled.impurity, compiled.value, tree.dataset.classes]
+    arrays.extend(tree.dataset.vocabularies)
+    return int(sum(_array_nbytes(array) for array in arrays))
+
+
+class ModelRegistry:
+    """Named saved models behind an LRU cache bounded by ``memory_budget`` bytes.
+
+    Models are opened with ``load_model(path, mmap_mode)``; with the default
+    ``"r"`` their arrays are mapped read-only, so the budget bounds what this
+    process keeps mapped while the OS shares and pages the data. A model larger
+    than the whole budget is still served, it just evicts everything else.
+    ``hits``, ``misses`` and ``evictions`` count cache activity.
+    """
+
+    def __init__(self, memory_budget: int = 256 * 2**20, mmap_mode: str | None = 'r') -> None:
+        if memory_budget <= 0:
+            raise ValueError("memory_budget must be positive")
+        self.memory_budget = memory_budget
+        self.mmap_mode = mmap_mode
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._paths = {}
+        self._loaded = OrderedDict()  # name -> (tree, nbytes), least recently used first
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self._loading = {}  # name -> lock held while that model loads
+
+    def register(self, name: str, path) -> None:
+        """Make the model saved at ``path`` available as ``name`` (loaded on first use)"""
+        path = Path(path)
+        if not path.is_file():
+            raise FileNotFoundError(f"Model file not found: {path}")
+        with self._lock:
+            if name in self._loaded and self._paths[name] != path:
+                self._discard(name)
+            self._paths[name] = path
+
+    def register_directory(self, directory, pattern: str = '*.npz') -> list:
+        """Register every model file in ``directory`` under its file stem; returns the names"""
+        names = []
+        for path in sorted(Path(directory).glob(pattern)):
+            self.register(path.stem, path)
+            names.append(path.stem)
+        return names
+
+    def unregister(self, name: str) -> None:
+        with self._lock:
+            self._paths.pop(name)
+            if name in self._loaded:
+                self._discard(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._paths
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    @property
+    def names(self) -> list:
+        return list(self._paths)
+
+    @property
+    def loaded(self) -> list:
+        """Names of the open models, least recently used first"""
+        return list(self._loaded)
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def get(self, name: str) -> Tree:
+        """The tree registered as ``name``, opening it if it is not cached.
+
+        Models are opened outside the registry's lock, so cached models are
+        served while another one loads; concurrent requests for the same
+        model wait for a single load."""
+        with self._lock:
+            if name in self._loaded:
+                return self._hit(name)
+            if name not in self._paths:
+                raise KeyError(f"No model registered as '{name}'")
+            path = self._paths[name]
+            guard = self._loading.setdefault(name, threading.Lock())
+        with guard:
+            with self._lock:
+                if name in self._loaded:
+                    return self._hit(name)
+                self.misses += 1
+            try:
+                tree = load_model(path, mmap_mode=self.mmap_mode)
+                size = model_nbytes(tree)
+            finally:
+                with self._lock:
+                    self._loading.pop(name, None)
+            with self._lock:
+                if self._paths.get(name) != path:
+                    # Re-registered or unregistered while loading: serve it, but do not cache it
+                    return tree
+                while self._loaded and self._nbytes + size > self.memory_budget:
+                    self._discard(next(iter(self._loaded)))
+                    self.evictions += 1
+                self._loaded[name] = (tree, size)
+                self._nbytes += size
+            return tree
+
+    def predict(self, name: str, X):
+        """Predict with model ``name``: one row (dict) or a DataFrame in batch.
+
+        Both route through the compiled arrays; a single row never builds the
+        Node tree, which the memory budget does not count."""
+        tree = self.get(name)
+        if isinstance(X, dict):
+            return tree.predict_batch(pd.DataFrame([X]))[0]
+        return tree.predict_batch(X)
+
+    def predict_proba(self, name: str, X) -> np.ndarray:
+        return self.get(name).predict_proba(X)
+
+    def stats(self) -> dict:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'loaded': len(self._loaded),
+            'registered': len(self._paths),
+            'nbytes': self._nbytes,
+            'memory_budget': self.memory_budget,
+        }
+
+    def clear(self) -> None:
+        """Close every open model; registrations and counters are kept"""
+        with self._lock:
+            self._loaded.clear()
+            self._nbytes = 0
+
+    def _hit(self, name: str) -> Tree:
+        self.hits += 1
+        self._loaded.move_to_end(name)
+        return self._loaded[name][0]
+
+    def _discard(self, name: str) -> None:
+        _, size = self._loaded.pop(name)
+        self._nbytes -= size
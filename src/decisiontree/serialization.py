@@ -0,0 +1,236 @@
+"""
+Model persistence
+=================
+
+Fitted trees are stored as uncompressed ``.npz`` archives: the compiled node
+arrays, one typed array per vocabulary and a small JSON header describing the
+features. Nothing is pickled, label types (str, int, float, bool) round-trip
+exactly, and loading is a handful of array reads however large the tree is.
+A JSON export of the nested-dict view is available for humans.
+
+Because the archive is stored uncompressed, every array in it can also be
+memory-mapped in place (``load_model(path, mmap_mode="r")``), letting
+processes that serve the same models share pages through the OS cache.
+"""
+
+import json
+import struct
+import zipfile
+import numpy as np
+import pandas as pd
+
+from .dataset import Dataset
+from .compiled import CompiledTree
+from .tree import Tree
+from .ImpurityStrategy import Entropy, GiniIndex, GainRatio, ChiSquare, RandomSubspace, ExtraTrees
+
+FORMAT = "decisiontree"
+FORMAT_VERSION = 1
+
+_CRITERIA = {'Entropy': Entropy, 'GiniIndex': GiniIndex, 'GainRatio': GainRatio, 'ChiSquare': ChiSquare}
+_RANDOMIZED = {'RandomSubspace': RandomSubspace, 'ExtraTrees': ExtraTrees}
+# Tree parameters that shape growth, stored so a loaded tree refits to the same tree
+_GROWTH = {'builder': 'recursive', 'max_depth': None, 'min_samples_split': 2, 'min_samples_leaf': 1,
+           'min_impurity_decrease': 0.0, 'max_leaf_nodes': None, 'compress': False}
+_NODE_ARRAYS = ('feature', 'threshold', 'left', 'right', 'lookup_start', 'lookup', 'counts', 'impurity')
+_KIND_DTYPES = {'bool': np.bool_, 'int': np.int64, 'float': np.float64, 'str': np.str_}
+_KIND_FILL = {'bool': False, 'int': 0, 'float': np.nan, 'str': ''}
+
+
+def _value_kind(values) -> str:
+    if all(isinstance(v, (bool, np.bool_)) for v in values):
+        return 'bool'
+    if all(isinstance(v, (int, np.integer)) and not isinstance(v, (bool, np.bool_)) for v in values):
+        return 'int'
+    if all(isinstance(v, (int, float, np.integer, np.floating)) for v in values):
+        return 'float'
+    if all(isinstance(v, str) for v in values):
+        return 'str'
+    raise ValueError(f"Cannot save labels of mixed types: {sorted({type(v).__name__ for v in values})}")
+
+
+def _pack_values(values):
+    """Typed array, missing-value mask and kind of a vocabulary"""
+    missing = pd.isna(pd.Series(values, dtype=object)).to_numpy()
+    present = [v for v, m in zip(values, missing) if not m]
+    kind = _value_kind(present)
+    fill = _KIND_FILL[kind]
+    packed = np.array([fill if m else v for v, m in zip(values, missing)], dtype=_KIND_DTYPES[kind])
+    return packed, missing, kind
+
+
+def _unpack_values(packed: np.ndarray, missing: np.ndarray, numeric: bool) -> np.ndarray:
+    if numeric:
+        return packed.astype(np.float64, copy=False)
+    values = np.empty(len(packed), dtype=object)
+    values[:] = packed.tolist()
+    values[missing] = np.nan
+    return values
+
+
+def _plain(value):
+    """``value`` as a built-in Python scalar, as JSON needs"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _pack_seed(random_state):
+    """``random_state`` in JSON: None, an int, or a SeedSequence's entropy and spawn key"""
+    if random_state is None or isinstance(random_state, (int, np.integer)):
+        return None if random_state is None else int(random_state)
+    if isinstance(random_state, np.random.SeedSequence):
+        return {'entropy': random_state.entropy, 'spawn_key': list(random_state.spawn_key)}
+    raise ValueError(f"Cannot save random_state of type {type(random_state).__name__}")
+
+
+def _unpack_seed(seed):
+    if isinstance(seed, dict):
+        return np.random.SeedSequence(seed['entropy'], spawn_key=seed['spawn_key'])
+    return seed
+
+
+def _pack_criterion(criterion) -> dict:
+    """Header fields naming the criterion and, if it is randomized, the strategy wrapping it"""
+    if not isinstance(criterion, RandomSubspace):
+        return {'criterion': type(criterion).__name__}
+    max_features = criterion.max_features
+    return {'criterion': type(criterion.criterion).__name__,
+            'randomized': {'strategy': type(criterion).__name__,
+                           'max_features': int(max_features) if isinstance(max_features, np.integer) else max_features,
+                           'random_state': _pack_seed(criterion.random_state)}}
+
+
+def _unpack_criterion(header: dict):
+    """The criterion _pack_criterion described, or None if it is not one of the built-in ones"""
+    criterion = _CRITERIA.get(header['criterion'])
+    if criterion is None:
+        return None
+    randomized = header.get('randomized')
+    if randomized is None:
+        return criterion()
+    strategy = _RANDOMIZED[randomized['strategy']]
+    return strategy(criterion(), randomized['max_features'], _unpack_seed(randomized['random_state']))
+
+
+def save_model(tree: Tree, path) -> None:
+    """Write a fitted tree to ``path`` in the binary model format"""
+    compiled = tree.compile()
+    dataset = tree.dataset
+    arrays = {f"node_{name}": getattr(compiled, name) for name in _NODE_ARRAYS}
+    features = []
+    for j, name in enumerate(dataset.feature_names):
+        packed, missing, kind = _pack_values(list(dataset.vocabularies[j]))
+        arrays[f"vocabulary_{j}"], arrays[f"missing_{j}"] = packed, missing
+        features.append({'name': name, 'kind': kind,
+                         'numeric': bool(dataset.numeric[j]), 'binned': bool(dataset.binned[j])})
+    arrays['classes'], arrays['classes_missing'], class_kind = _pack_values(list(dataset.classes))
+    header = {
+        'format': FORMAT,
+        'version': FORMAT_VERSION,
+        'target': dataset.target,
+        **_pack_criterion(tree.criterion),
+        'binning': tree.binning,
+        'max_bins': tree.max_bins,
+        'growth': {name: _plain(getattr(tree, name)) for name in _GROWTH},
+        'class_kind': class_kind,
+        'features': features,
+    }
+    arrays['header'] = np.array(json.dumps(header))
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+
+
+def read_header(archive) -> dict:
+    """Decode and validate the header of an opened model archive"""
+    header = json.loads(str(archive['header']))
+    if header.get('format') != FORMAT:
+        raise ValueError("Not a decisiontree model file")
+    if header['version'] > FORMAT_VERSION:
+        raise ValueError(f"Model format version {header['version']} is newer than supported ({FORMAT_VERSION})")
+    return header
+
+
+class _MappedArchive:
+    """Read-only view of an uncompressed ``.npz`` whose members are memory-mapped.
+
+    ``np.load(mmap_mode=...)`` only maps plain ``.npy`` files, so the offset of
+    each member's array data inside the zip is located here and mapped directly.
+    """
+
+    def __init__(self, path, mmap_mode: str = 'r') -> None:
+        self._arrays = {}
+        with open(path, 'rb') as f, zipfile.ZipFile(f) as archive:
+            for info in archive.infolist():
+                if info.compress_type != zipfile.ZIP_STORED:
+                    raise ValueError(f"Cannot memory-map compressed member '{info.filename}'")
+                # Local file header: fixed 30 bytes, then name and extra field
+                f.seek(info.header_offset + 26)
+                name_length, extra_length = struct.unpack('<HH', f.read(4))
+                f.seek(info.header_offset + 30 + name_length + extra_length)
+                version = np.lib.format.read_magic(f)
+                read_array_header = (np.lib.format.read_array_header_1_0 if version == (1, 0)
+                                     else np.lib.format.read_array_header_2_0)
+                shape, fortran_order, dtype = read_array_header(f)
+                if dtype.hasobject:
+                    raise ValueError(f"Member '{info.filename}' holds Python objects")
+                key = info.filename[:-len('.npy')] if info.filename.endswith('.npy') else info.filename
+                if 0 in shape:
+                    self._arrays[key] = np.empty(shape, dtype=dtype)
+                    continue
+                self._arrays[key] = np.memmap(path, dtype=dtype, mode=mmap_mode, offset=f.tell(), shape=shape,
+                                              order='F' if fortran_order else 'C')
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        return self._arrays[key]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+def load_model(path, mmap_mode: str | None = None) -> Tree:
+    """Read a tree written by save_model; it predicts without any training data.
+
+    With ``mmap_mode`` (e.g. ``"r"``) the node and vocabulary arrays are mapped
+    from the file instead of read into memory.
+    """
+    archive = _MappedArchive(path, mmap_mode) if mmap_mode else np.load(path, allow_pickle=False)
+    with archive:
+        header = read_header(archive)
+        compiled = CompiledTree(*(archive[f"node_{name}"] for name in _NODE_ARRAYS))
+        features = header['features']
+        vocabularies = [_unpack_values(archive[f"vocabulary_{j}"], archive[f"missing_{j}"], feature['numeric'])
+                        for j, feature in enumerate(features)]
+        classes = _unpack_values(archive['classes'], archive['classes_missing'], False)
+    dataset = Dataset.from_vocabularies(
+        [feature['name'] for feature in features], vocabularies,
+        [feature['numeric'] for feature in features], [feature['binned'] for feature in features],
+        header['target'], classes)
+    tree = Tree(_unpack_criterion(header))
+    tree.binning, tree.max_bins = header['binning'], header['max_bins']
+    # Files written before the growth parameters were saved hold the defaults
+    for name, value in {**_GROWTH, **header.get('growth', {})}.items():
+        setattr(tree, name, value)
+    tree.dataset, tree.target, tree.df = dataset, dataset.target, None
+    tree._compiled = compiled
+    return tree
+
+
+def export_json(tree: Tree, path) -> None:
+    """Write the human-readable nested-dict view of a tree (not loadable)"""
+    def plain(value):
+        return value.item() if isinstance(value, np.generic) else value
+
+    def convert(subtree):
+        if not isinstance(subtree, dict):
+            return plain(subtree)
+        return {str(key): convert(child) for key, child in subtree.items()}
+
+    model = {
+        'tree': convert(tree.tree),
+        'target': tree.target,
+        'criterion': type(tree.criterion).__name__,
+    }
+    with open(path, 'w') as f:
+        json.dump(model, f, indent=2)
@@ -0,0 +1,86 @@
+"""
+Streaming prediction
+====================
+
+Score CSV files of any size with a fitted or loaded tree: the input is read
+in chunks, every chunk is routed through the compiled tree in one vectorized
+pass, and its predictions are appended to the output before the next chunk is
+read. Memory is bounded by the chunk size, and rows come out in input order.
+"""
+
+import sys
+import time
+import pandas as pd
+
+from .tree import Tree
+
+
+def _csv_dtypes(tree: Tree) -> dict:
+    """Read categorical features whose training labels were all strings as strings.
+
+    Otherwise a chunk that happens to hold only digits would parse as numbers
+    and miss every label of the vocabulary.
+    """
+    dataset = tree.dataset
+    dtypes = {}
+    for j, feature in enumerate(dataset.feature_names):
+        labels = [v for v in dataset.vocabularies[j] if not pd.isna(v)]
+        if not dataset.numeric[j] and labels and all(isinstance(v, str) for v in labels):
+            dtypes[feature] = str
+    return dtypes
+
+
+def _check_columns(tree: Tree, columns, keep) -> None:
+    missing = [f for f in tree.dataset.feature_names if f not in columns]
+    if missing:
+        raise KeyError(f"Missing feature columns: {', '.join(missing)}")
+    unknown = [c for c in keep or () if c not in columns]
+    if unknown:
+        raise KeyError(f"Columns not found: {', '.join(unknown)}")
+
+
+def predict_csv(tree: Tree, source, output=None, chunksize: int = 100_000, keep=None,
+                prediction_column: str = 'prediction', progress=None) -> dict:
+    """Predict every row of the CSV ``source`` chunk by chunk and write them to ``output``.
+
+    Each output row holds the input columns (only those listed in ``keep``, e.g.
+    ID columns, if given) followed by ``prediction_column``. ``output`` is a path
+    or a text stream, standard output by default. ``progress(rows, seconds)`` is
+    called after every chunk. Returns the row count, chunk count, elapsed
+    seconds and throughput in rows per second.
+    """
+    if chunksize <= 0:
+        raise ValueError("chunksize must be positive")
+    keep = None if keep is None else list(keep)
+    dtypes = _csv_dtypes(tree)
+
+    if output is None:
+        stream, owned = sys.stdout, False
+    elif hasattr(output, 'write'):
+        stream, owned = output, False
+    else:
+        stream, owned = open(output, 'w', newline=''), True
+    rows = chunks = 0
+    start = time.perf_counter()
+    try:
+        for chunk in pd.read_csv(source, chunksize=chunksize, dtype=dtypes):
+            if chunks == 0:
+                _check_columns(tree, chunk.columns, keep)
+            predictions = tree.predict_batch(chunk)
+            result = chunk if keep is None else chunk[keep].copy()
+            result[prediction_column] = predictions
+            result.to_csv(stream, header=chunks == 0, index=False)
+            rows += len(chunk)
+            chunks += 1
+            if progress is not None:
+                progress(rows, time.perf_counter() - start)
+    finally:
+        if owned:
+            stream.close()
+    seconds = time.perf_counter() - start
+    return {
+        'rows': rows,
+        'chunks': chunks,
+        'seconds': seconds,
+        'rows_per_second': rows / seconds if seconds > 0 else float('inf'),
+    }
@@ -0,0 +1,223 @@
+"""
+Build tracing
+=============
+
+While a tree grows, the builders can report what they do as small structured
+events: the node being searched, every candidate split the criterion scored
+(with its per-branch class counts, straight from the tables the search built
+anyway), the split chosen and the leaves made. Events hold the raw arrays and
+codes; nothing is formatted or recomputed until a sink renders them.
+
+A sink is any object with an ``emit(event)`` method. ``TextSink`` prints the
+familiar verbose walkthrough, ``JsonlSink`` writes one JSON object per event
+and ``ListSink`` keeps the events in memory. A tree without a sink builds
+exactly as before: the builders only test ``trace is not None``.
+"""
+
+import json
+import sys
+from typing import NamedTuple
+import numpy as np
+
+
+class FitStarted(NamedTuple):
+    n_samples: int
+    dataset: object
+    criterion: object
+
+
+class NodeStarted(NamedTuple):
+    """A node is about to be searched; ``branch`` is its key in ``parent``'s children"""
+    node: int
+    depth: int
+    parent: int | None
+    branch: int | None
+    counts: np.ndarray
+    impurity: float
+
+
+class FeatureScored(NamedTuple):
+    """One candidate split: branch labels, branch x class counts and the criterion's score"""
+    node: int
+    feature: str
+    branches: np.ndarray
+    counts: np.ndarray
+    threshold: float | None
+    score: float
+
+
+class SplitChosen(NamedTuple):
+    node: int
+    feature: str
+    threshold: float | None
+    score: float
+
+
+class LeafMade(NamedTuple):
+    """``reason`` is "pure", "no features" or the stopping rule that applied, e.g. "max depth" """
+    node: int
+    label: int
+    reason: str
+
+
+class LevelGrown(NamedTuple):
+    """Level-wise builders: ``n_nodes`` frontier nodes were searched at ``depth``"""
+    depth: int
+    n_nodes: int
+
+
+def _plain(value):
+    """JSON-compatible form of a label, count array or scalar"""
+    if isinstance(value, np.ndarray):
+        return [_plain(v) for v in value.tolist()]
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def to_dict(event) -> dict:
+    """Plain-data form of an event, as written by JsonlSink"""
+    if isinstance(event, FitStarted):
+        dataset = event.dataset
+        return {'event': 'FitStarted', 'n_samples': event.n_samples,
+                'features': list(dataset.feature_names), 'classes': _plain(np.asarray(dataset.classes)),
+                'criterion': type(event.criterion).__name__}
+    record = {'event': type(event).__name__}
+    record.update((field, _plain(value)) for field, value in event._asdict().items())
+    return record
+
+
+class ListSink:
+    """Keep every event in ``events``"""
+
+    def __init__(self) -> None:
+        self.events = []
+
+    def emit(self, event) -> None:
+        self.events.append(event)
+
+    def of_type(self, kind) -> list:
+        return [event for event in self.events if isinstance(event, kind)]
+
+
+class JsonlSink:
+    """Write each event as one line of JSON to a path or an open text file"""
+
+    def __init__(self, target) -> None:
+        self._owned = isinstance(target, (str, bytes)) or hasattr(target, '__fspath__')
+        self.file = open(target, 'w') if self._owned else target
+
+    def emit(self, event) -> None:
+        self.file.write(json.dumps(to_dict(event)) + "\n")
+
+    def close(self) -> None:
+        if self._owned:
+            self.file.close()
+        else:
+            self.file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class TextSink:
+    """Human-readable walkthrough of the build, printed to ``stream`` (default stdout)"""
+
+    def __init__(self, stream=None) -> None:
+        self.stream = stream
+        self.dataset = None
+        self.criterion_name = "Impurity"
+        self._impurity = None
+        self._depth = {}
+        self._splits = {}
+        self._pending = None
+
+    def _print(self, text: str = "") -> None:
+        print(text, file=self.stream if self.stream is not None else sys.stdout)
+
+    def _class(self, code):
+        return self.dataset.classes[code] if self.dataset is not None else code
+
+    def _distribution(self, counts) -> dict:
+        return {self._class(c): int(n) for c, n in enumerate(counts) if n}
+
+    def _header(self) -> None:
+        # Node headers wait for the first feature or split event, so leaves print one line
+        if self._pending is None:
+            return
+        event, self._pending = self._pending, None
+        indent = "  " * event.depth
+        self._print(f"\n{indent}Node at depth {event.depth}:")
+        self._print(f"{indent}Samples: {int(np.sum(event.counts))}")
+        self._print(f"{indent}Current {self.criterion_name}: {event.impurity:.4f}")
+        self._print(f"{indent}Class distribution: {self._distribution(event.counts)}")
+        self._print(f"{indent}Evaluating features:")
+
+    def _branch(self, parent: int, branch: int) -> str:
+        feature, threshold = self._splits[parent]
+        if threshold is not None:
+            return f"{feature} {('<=', '>')[branch]} {threshold:g}"
+        if self.dataset is not None:
+            vocabulary = self.dataset.vocabularies[self.dataset.feature_position(feature)]
+            return f"{feature} = {vocabulary[branch]}"
+        return f"{feature} = {branch}"
+
+    def emit(self, event) -> None:
+        if isinstance(event, FitStarted):
+            self.dataset = event.dataset
+            criterion = event.criterion
+            self.criterion_name = type(criterion).__name__
+            # The class's kernel, not an instance attribute a Profiler may have shadowed to count
+            # calls; randomized strategies delegate theirs, so take the criterion they wrap
+            kernel = criterion
+            while getattr(kernel, 'criterion', None) is not None:
+                kernel = kernel.criterion
+            self._impurity = (type(kernel)._impurity_from_counts.__get__(kernel)
+                              if criterion.accepts_dataset else None)
+            self._print(f"\nDataset: {event.n_samples} samples, {event.dataset.n_features} features")
+            self._print(f"Target column: {event.dataset.target}")
+            self._print(f"Classes: {sorted(event.dataset.classes)}")
+            self._print(f"Criterion: {self.criterion_name}")
+        elif isinstance(event, NodeStarted):
+            self._header()
+            self._depth[event.node] = event.depth
+            if event.parent is not None:
+                indent = "  " * (event.depth - 1)
+                self._print(f"{indent}Branch: {self._branch(event.parent, event.branch)} "
+                            f"({int(np.sum(event.counts))} samples)")
+            self._pending = event
+        elif isinstance(event, FeatureScored):
+            self._header()
+            indent = "  " * self._depth.get(event.node, 0)
+            total = event.counts.sum()
+            impurities = self._impurity(event.counts) if self._impurity is not None else None
+            self._print(f"{indent}  Feature: {event.feature}")
+            self._print(f"{indent}    Splits:")
+            for i, (label, counts) in enumerate(zip(event.branches, event.counts)):
+                size = int(counts.sum())
+                condition = f"{event.feature} {label}" if event.threshold is not None else f"{event.feature} = {label}"
+                self._print(f"{indent}      {condition}: {size} samples")
+                self._print(f"{indent}        Class dist: {self._distribution(counts)}")
+                if impurities is not None:
+                    self._print(f"{indent}        {self.criterion_name}: {impurities[i]:.4f}")
+                self._print(f"{indent}        Weight: {size / total:.4f}")
+            self._print(f"{indent}    Score: {event.score:.4f}")
+            self._print()
+        elif isinstance(event, SplitChosen):
+            self._header()
+            self._splits[event.node] = (event.feature, event.threshold)
+            indent = "  " * self._depth.get(event.node, 0)
+            self._print(f"{indent}Best feature: {event.feature} (score = {event.score:.4f})")
+        elif isinstance(event, LeafMade):
+            self._pending = None
+            indent = "  " * self._depth.get(event.node, 0)
+            self._print(f"{indent}-> Leaf: {self._class(event.label)} ({event.reason})")
+        elif isinstance(event, LevelGrown):
+            self._print(f"Depth {event.depth}: {event.n_nodes} frontier nodes")
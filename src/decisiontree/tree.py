@@ -1,131 +1,701 @@
 from .ImpurityStrategy.Strategy import ImpurityStrategy
+from contextlib import contextmanager
+import heapq
+import itertools
+import os
 import pandas as pd
 import numpy as np
 
+from .dataset import Dataset
+from .compiled import CompiledTree
+from .trace import FitStarted, NodeStarted, FeatureScored, SplitChosen, LeafMade, TextSink
+from .profile import Profiler, untimed
+
+
+class Node:
+    """One tree node, referring to features by their Dataset position.
+
+    Numeric splits send ``value <= threshold`` to ``children[0]`` and everything
+    else (including NaN) to ``children[1]``; categorical splits map each value
+    code to its child. Leaves have no feature and carry the class code ``label``.
+    Every node records the training class ``counts`` that reached it and their
+    ``impurity`` (NaN for strategies without count kernels).
+    """
+    __slots__ = ('feature', 'threshold', 'children', 'label', 'counts', 'impurity')
+
+    def __init__(self, feature=None, threshold=None, children=None, label=None, counts=None, impurity=np.nan):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.label = label
+        self.counts = counts
+        self.impurity = impurity
+
+    @property
+    def is_leaf(self) -> bool:
+        return self.feature is None
+
+    @property
+    def n_samples(self) -> int:
+        return int(self.counts.sum())
+
+    @property
+    def majority(self) -> int:
+        """Class code with the most training samples at this node"""
+        return int(np.argmax(self.counts))
+
+
+class _Split:
+    """The best split found for samples[start:end], not yet applied (see Tree._evaluate)"""
+    __slots__ = ('start', 'end', 'depth', 'histograms', 'features', 'position', 'threshold',
+                 'branches', 'sizes', 'node_id', 'decrease')
+
+    def __init__(self, start, end, depth, histograms, features, position, threshold, branches, sizes, node_id):
+        self.start, self.end, self.depth = start, end, depth
+        self.histograms, self.features = histograms, features
+        self.position, self.threshold = position, threshold
+        self.branches, self.sizes = branches, sizes
+        self.node_id = node_id
+        self.decrease = np.inf
+
+    @property
+    def n_branches(self) -> int:
+        return int(np.count_nonzero(self.sizes))
+
+
+def best_first(candidates, max_leaf_nodes: int, n_branches, expand, skip=None) -> None:
+    """Apply splits largest decrease first (ties: the split found first) up to ``max_leaf_nodes`` leaves.
+
+    ``candidates`` are the root's (decrease, split) pairs; ``expand(split)``
+    applies a split and returns its children's. A multiway split whose
+    ``n_branches(split)`` would overshoot the budget is passed to ``skip``
+    and left unapplied, in favour of smaller ones."""
+    order = itertools.count()
+    heap = [(-decrease, next(order), split) for decrease, split in candidates]
+    n_leaves = 1
+    while heap:
+        _, _, split = heapq.heappop(heap)
+        branches = n_branches(split)
+        if n_leaves + branches - 1 > max_leaf_nodes:
+            if skip is not None:
+                skip(split)
+            continue
+        for decrease, child in expand(split):
+            heapq.heappush(heap, (-decrease, next(order), child))
+        n_leaves += branches - 1
+
+
 class Tree:
-    def __init__(self, criterion : ImpurityStrategy, verbose=False) -> None:
+    def __init__(self, criterion : ImpurityStrategy, verbose=False, binning=None, max_bins=255,
+                 n_jobs=None, build_jobs=None, min_task_samples=10_000, builder="recursive",
+                 trace=None, profile=False, max_depth=None, min_samples_split=2, min_samples_leaf=1,
+                 min_impurity_decrease=0.0, max_leaf_nodes=None, max_features=None, splitter="best",
+                 random_state=None, compress=False) -> None:
+        """``binning="histogram"`` quantile-bins numeric features into at most
+        ``max_bins`` uint8 codes and searches splits on per-node class histograms.
+        ``n_jobs`` sets the criterion's number of feature-scoring threads.
+        ``build_jobs`` processes build subtrees of at least ``min_task_samples``
+        samples in parallel (see parallel); the tree is the same as a serial build.
+        ``builder="levelwise"`` grows the tree breadth-first, a whole level per
+        few vectorized calls (see levelwise).
+        ``trace`` is a sink receiving structured build events (see trace);
+        ``verbose=True`` without one prints them through a TextSink.
+        ``profile=True`` records per-phase timings, memory peaks and counters
+        in ``self.profiler`` (see profile); ``profile="time"`` skips the memory
+        tracing, which slows the build several times over.
+
+        Growth stops at nodes ``max_depth`` deep, at nodes with fewer than
+        ``min_samples_split`` samples, and where the best split would decrease
+        impurity, weighted by the node's share of the training samples, by less
+        than ``min_impurity_decrease``. Splits leaving a branch with fewer than
+        ``min_samples_leaf`` samples are never considered. ``max_leaf_nodes``
+        grows the tree best-first, always splitting the leaf with the largest
+        decrease, up to that many leaves; a multiway split that would exceed
+        them is skipped in favour of smaller ones.
+
+        ``max_features`` searches a random subset of the features at each node
+        (see RandomSubspace); ``splitter="random"`` scores one random threshold
+        per numeric feature instead of every cut (see ExtraTrees). Both wrap
+        ``criterion`` in that strategy, seeded by ``random_state``.
+
+        ``compress=True`` collapses identical rows (features and target) into
+        one row weighted by their count before growing (see Dataset.compress);
+        the tree is the same, grown over fewer rows."""
+        if splitter not in ("best", "random"):
+            raise ValueError(f"Unknown splitter '{splitter}', expected 'best' or 'random'")
+        if max_features is not None or splitter == "random":
+            from .ImpurityStrategy import ExtraTrees, RandomSubspace
+            randomized = ExtraTrees if splitter == "random" else RandomSubspace
+            criterion = randomized(criterion, max_features, random_state)
+        if binning not in (None, "histogram"):
+            raise ValueError(f"Unknown binning '{binning}', expected None or 'histogram'")
+        if binning and not criterion.accepts_dataset:
+            raise ValueError(f"{type(criterion).__name__} does not support histogram binning")
+        if builder not in ("recursive", "levelwise"):
+            raise ValueError(f"Unknown builder '{builder}', expected 'recursive' or 'levelwise'")
+        if builder == "levelwise" and not (criterion.accepts_dataset and criterion.exhaustive):
+            raise ValueError(f"{type(criterion).__name__} does not support level-wise building")
+        if max_depth is not None and max_depth < 0:
+            raise ValueError("max_depth must be non-negative")
+        if min_samples_split < 2:
+            raise ValueError("min_samples_split must be at least 2")
+        if min_samples_leaf < 1:
+            raise ValueError("min_samples_leaf must be at least 1")
+        if min_impurity_decrease < 0:
+            raise ValueError("min_impurity_decrease must be non-negative")
+        if max_leaf_nodes is not None and max_leaf_nodes < 2:
+            raise ValueError("max_leaf_nodes must be at least 2")
+        if (min_samples_leaf > 1 or min_impurity_decrease > 0 or max_leaf_nodes is not None) and \
+                not criterion.accepts_dataset:
+            raise ValueError(f"{type(criterion).__name__} does not support min_samples_leaf, "
+                             "min_impurity_decrease or max_leaf_nodes")
+        if builder == "levelwise" and max_leaf_nodes is not None:
+            raise ValueError("max_leaf_nodes needs best-first growth; use builder='recursive'")
+        if compress and not criterion.accepts_dataset:
+            raise ValueError(f"{type(criterion).__name__} does not support sample weights")
         self.criterion = criterion
+        if n_jobs is not None:
+            criterion.n_jobs = n_jobs
+        self.n_jobs = n_jobs
+        self.build_jobs = build_jobs
+        self.min_task_samples = min_task_samples
+        self._deferred = None
         self.verbose = verbose
-        self.calculations = []  # Store intermediate calculations
+        self.trace = trace if trace is not None else (TextSink() if verbose else None)
+        self._trace_ids = None
+        if profile not in (False, True, "time"):
+            raise ValueError(f"Unknown profile '{profile}', expected True, False or 'time'")
+        self.profiler = Profiler(memory=profile is True) if profile else None
+        self.binning = binning
+        self.max_bins = max_bins
+        self.builder = builder
+        self.max_depth = max_depth
+        self.min_samples_split = min_samples_split
+        self.min_samples_leaf = min_samples_leaf
+        self.min_impurity_decrease = min_impurity_decrease
+        self.max_leaf_nodes = max_leaf_nodes
+        self.compress = compress
+        self._n_samples = 0
+        self.dataset = None
+        self._root = None
+        self._tree = None
+        self._compiled = None
         
-    def fit(self, df: pd.DataFrame, target: str):
-        self.df = df
+    def fit(self, df, target: str | None = None, sample_weight=None):
+        """Fit on a DataFrame or on an already encoded Dataset.
+
+        A Dataset is used as is, so repeated fits on it never re-encode.
+        ``sample_weight`` gives each row a non-negative weight; every class
+        count, stopping rule and impurity decrease then sums weights instead
+        of counting rows, so an integer weight counts as that many copies."""
+        with self._profiling(fit=True):
+            self._fit(df, target, sample_weight=sample_weight)
+
+    def _fit(self, df, target, rows=None, sample_weight=None):
+        # ``rows`` restricts the fit to those row indices, repeats counting as copies (see forest)
+        if isinstance(df, Dataset):
+            if target is not None and target != df.target:
+                raise ValueError(f"Dataset was encoded with target '{df.target}', not '{target}'")
+            self.df = None
+            dataset = df
+        else:
+            self.df = df
+            with self._phase('encode'):
+                dataset = self._encode(df, target)
+        if sample_weight is not None:
+            if not self.criterion.accepts_dataset:
+                raise ValueError(f"{type(self.criterion).__name__} does not support sample weights")
+            dataset = dataset.with_weights(sample_weight)
+        if dataset.weights is not None and not dataset.weights.all():
+            if not dataset.weights.any():
+                raise ValueError("Sample weights are all zero; there is nothing to fit")
+            # Zero-weight rows add nothing to any count, but left in they would still make
+            # features candidates and offer thresholds; nor may their values place midpoints.
+            # Fits restricted to rows keep the full encoding, as bootstrap samples do
+            if rows is None:
+                dataset = dataset.take(np.flatnonzero(dataset.weights)).compact()
+            else:
+                rows = np.asarray(rows, dtype=np.intp)
+                rows = rows[dataset.weights[rows] > 0]
+        if self.compress:
+            if rows is not None:
+                raise ValueError("Cannot compress a fit restricted to a subset of rows")
+            with self._phase('compress'):
+                dataset = dataset.compress()
+        if self.binning == "histogram":
+            with self._phase('bin'):
+                dataset = dataset.to_bins(self.max_bins)
+        self.dataset = dataset
+        self.target = dataset.target
+        if self.trace is not None:
+            self.trace.emit(FitStarted(dataset.n_samples, dataset, self.criterion))
+        self._tree = None
+        if self.builder == "levelwise":
+            if rows is not None:
+                raise ValueError("The level-wise builder always grows over every row")
+            from .levelwise import grow_levelwise
+            with self._phase('levelwise'), self.criterion.threads():
+                self._compiled = grow_levelwise(self.criterion, dataset, self.trace, self._limits())
+            self._root = None
+            return
+        with self.criterion.threads():
+            self._root = self._grow(dataset, depth=0, rows=rows)
+        self._compiled = None
+
+    def fit_csv(self, path, target: str, chunksize: int = 100_000, categorical=None, dtype=None,
+                cache_dir=None):
+        """Fit out of core on a CSV file, streaming it once per tree level.
+
+        Numeric features are quantile-binned into ``max_bins`` bins as in
+        histogram mode, which this fit matches exactly. ``cache_dir`` keeps the
+        encoded chunks on disk so only the first pass parses CSV. See outofcore."""
+        if not (self.criterion.accepts_dataset and self.criterion.exhaustive):
+            raise ValueError(f"{type(self.criterion).__name__} does not support out-of-core training")
+        if self.max_leaf_nodes is not None:
+            raise ValueError("max_leaf_nodes needs best-first growth, which out-of-core training does not do")
+        with self._profiling(fit=True):
+            self._fit_csv(path, target, chunksize, categorical, dtype, cache_dir)
+
+    def _fit_csv(self, path, target, chunksize, categorical, dtype, cache_dir):
+        from .outofcore import CsvChunks, grow_out_of_core
+        chunks = CsvChunks(path, target, chunksize, categorical, dtype, cache_dir)
+        with self._phase('scan'):
+            dataset = chunks.scan(self.max_bins)
+        if self.trace is not None:
+            self.trace.emit(FitStarted(chunks.n_samples, dataset, self.criterion))
+        self.df = None
+        self.dataset = dataset
         self.target = target
-        self.calculations = []
-        if self.verbose:
-            print(f"\nDataset: {df.shape[0]} samples, {df.shape[1]-1} features")
-            print(f"Target column: {target}")
-            print(f"Classes: {sorted(df[target].unique())}")
-            print(f"Criterion: {type(self.criterion).__name__}")
-        self.tree = self.build_tree(df, target, depth=0)
+        with self._phase('out_of_core'):
+            self._compiled = grow_out_of_core(self.criterion, chunks, self.trace, self._limits())
+        self._root = None
+        self._tree = None
+
+    def _limits(self):
+        from .levelwise import Limits
+        return Limits(self.max_depth, self.min_samples_split, self.min_samples_leaf, self.min_impurity_decrease)
+
+    @contextmanager
+    def _profiling(self, fit=False):
+        """Trace memory and instrument the criterion while profiling; a no-op otherwise"""
+        profiler = self.profiler
+        if profiler is None:
+            yield
+            return
+        if fit:
+            profiler.reset()
+        profiler.start()
+        try:
+            if fit:
+                with profiler.instrument(self.criterion):
+                    yield
+                profiler.count_nodes(self.compile())
+            else:
+                yield
+        finally:
+            profiler.stop()
+
+    def _phase(self, name: str):
+        return self.profiler.phase(name) if self.profiler is not None else untimed(name)
+
+    @property
+    def root(self) -> Node:
+        """Root Node of the fitted tree; models loaded from disk rebuild it on first use"""
+        if self._root is None and self._compiled is not None:
+            self._root = self._nodes_from_compiled(self._compiled)
+        return self._root
+
+    @property
+    def tree(self):
+        """Nested {feature: {value: subtree}} view of the fitted tree"""
+        if self._tree is None and self.root is not None:
+            self._tree = self._to_dict(self.root, self.dataset)
+        return self._tree
                 
-    def build_tree(self, df: pd.DataFrame, target: str, depth=0):
-        #ID 3 alg
-        features = [feat for feat in df.columns if feat != target]
-        indent = "  " * depth
+    def build_tree(self, df, target: str | None = None, depth=0):
+        """Build and return the nested-dict tree for a DataFrame or Dataset"""
+        dataset = df if isinstance(df, Dataset) else self._encode(df, target)
+        if self.binning == "histogram":
+            dataset = dataset.to_bins(self.max_bins)
+        with self.criterion.threads():
+            return self._to_dict(self._grow(dataset, depth), dataset)
+
+    def _encode(self, df: pd.DataFrame, target: str) -> Dataset:
+        # DataFrame-only strategies have no threshold search, so they see every feature as categorical
+        return Dataset(df, target, categorical=None if self.criterion.accepts_dataset else True)
+
+    def _grow(self, data: Dataset, depth=0, rows=None):
+        """Build over one shared sample-index array that is partitioned in place per node.
+
+        Each numeric feature also gets its samples sorted once here; those arrays
+        are partitioned stably in lockstep with ``samples``, so every node's range
+        stays sorted by that feature and thresholds need no further sorting.
+
+        In histogram mode nothing is presorted; the root's histograms are built
+        here and every node hands its own down to derive its children's.
+
+        ``rows`` grows over those row indices (repeats included) instead of all."""
+        if any(data.numeric) and not self.criterion.accepts_dataset:
+            raise ValueError(f"{type(self.criterion).__name__} cannot split numeric features; "
+                             "encode the Dataset with categorical=True")
+        if rows is None:
+            samples = np.arange(data.n_samples, dtype=np.intp)
+        else:
+            samples = np.sort(np.asarray(rows, dtype=np.intp))
+        histograms = None
+        if self.binning == "histogram":
+            with self._phase('histograms'):
+                histograms, orders = self._histograms(data, samples, data.feature_names), {}
+        elif not self.criterion.presorted:
+            orders = {}
+        else:
+            with self._phase('presort'):
+                orders = {j: samples[np.argsort(data.columns[j][samples], kind='stable')]
+                          for j in range(data.n_features) if data.numeric[j]}
+        build_jobs = (os.cpu_count() or 1) if self.build_jobs == -1 else (self.build_jobs or 1)
+        self._trace_ids = itertools.count() if self.trace is not None else None
+        self._n_samples = len(samples) if data.weights is None else data.weights[samples].sum()
+        if self.max_leaf_nodes is not None:
+            return self._build_best_first(data, samples, orders, depth, histograms)
+        # Trace events and profile counters follow the serial recursion in this
+        # process, so traced or profiled trees always build serially
+        if (build_jobs > 1 and self.trace is None and self.profiler is None
+                and len(samples) >= self.min_task_samples):
+            from .parallel import build_parallel
+            return build_parallel(self, data, samples, orders, histograms, depth, build_jobs)
+        return self._build(data, samples, orders, 0, len(samples), depth, histograms)
+
+    @staticmethod
+    def _histograms(data: Dataset, rows: np.ndarray, features) -> dict:
+        """Value (or bin) x class count table of each feature over ``rows``"""
+        y = data.y[rows]
+        histograms = {}
+        for feature in features:
+            position = data.feature_position(feature)
+            n_values = len(data.vocabularies[position])
+            keys = data.columns[position][rows].astype(np.intp) * data.n_classes + y
+            histograms[feature] = data.tally(keys, rows, n_values * data.n_classes).reshape(n_values, data.n_classes)
+        return histograms
+
+    def _build(self, data: Dataset, samples: np.ndarray, orders: dict, start: int, end: int, depth=0,
+               histograms=None, parent=None, branch=None):
+        #ID 3 alg on encoded columns, depth first. The node's rows are samples[start:end]
+        #(and the same range of every presorted array in ``orders``); ``histograms``
+        #holds the node's per-feature class histograms in histogram mode. ``parent``
+        #and ``branch`` only label trace events.
+        node, split = self._evaluate(data, samples, orders, start, end, depth, histograms, parent, branch)
+        if split is None:
+            return node
+        children = {}
+        for branch, child_start, child_end, child_histograms in self._partition(data, samples, orders, split):
+            if self._deferred is not None and child_end - child_start >= self.min_task_samples:
+                # Parallel build: large children become tasks of their own (see parallel)
+                children[branch] = Node()
+                self._deferred.append((children[branch], child_start, child_end, depth + 1, child_histograms))
+                continue
+            children[branch] = self._build(data, samples, orders, child_start, child_end, depth + 1,
+                                           child_histograms, split.node_id, branch)
+        node.children = children
+        return node
+
+    def _build_best_first(self, data: Dataset, samples: np.ndarray, orders: dict, depth=0, histograms=None):
+        """Grow at most ``max_leaf_nodes`` leaves, always splitting the leaf whose
+        split decreases impurity most (ties: the leaf made first)."""
+        root, split = self._evaluate(data, samples, orders, 0, len(samples), depth, histograms)
+
+        def expand(item):
+            node, split = item
+            children, candidates = {}, []
+            for branch, child_start, child_end, child_histograms in self._partition(data, samples, orders, split):
+                child, child_split = self._evaluate(data, samples, orders, child_start, child_end, split.depth + 1,
+                                                    child_histograms, split.node_id, branch)
+                children[branch] = child
+                if child_split is not None:
+                    candidates.append((child_split.decrease, (child, child_split)))
+            node.children = children
+            return candidates
+
+        best_first([] if split is None else [(split.decrease, (root, split))], self.max_leaf_nodes,
+                   lambda item: item[1].n_branches, expand, lambda item: self._unsplit(*item, "max leaf nodes"))
+        return root
+
+    def _unsplit(self, node: Node, split: "_Split", reason: str) -> None:
+        """Turn an evaluated but unapplied split node into a leaf"""
+        node.feature = node.threshold = None
+        node.label = node.majority
+        if self.trace is not None:
+            self.trace.emit(LeafMade(split.node_id, node.label, reason))
+
+    def _leaf(self, counts: np.ndarray, impurity: float, node_id, reason: str) -> Node:
+        with self._phase('leaf'):
+            label = int(np.argmax(counts))
+            if self.trace is not None:
+                self.trace.emit(LeafMade(node_id, label, reason))
+            return Node(label=label, counts=counts, impurity=impurity)
+
+    def _evaluate(self, data: Dataset, samples: np.ndarray, orders: dict, start: int, end: int, depth=0,
+                  histograms=None, parent=None, branch=None):
+        """Search the best split of samples[start:end] without applying it.
+
+        Returns (leaf Node, None) when the node stops growing, or (split Node
+        without children, _Split) for _partition to apply."""
+        with self._phase('node'):
+            node_samples = samples[start:end]
+            y = data.y[node_samples]
+            counts = data.tally(y, node_samples, data.n_classes)
+            impurity = self._node_impurity(counts)
+        trace = self.trace
+        node_id = None
+        if trace is not None:
+            node_id = next(self._trace_ids)
+            trace.emit(NodeStarted(node_id, depth, parent, branch, counts, impurity))
         
         #If target is pure return the only unique label
-        if len(df[target].unique()) == 1:
-            result = df[target].iloc[0]
-            if self.verbose:
-                print(f"{indent}-> Leaf: {result} (pure node)")
-            return result
+        if np.count_nonzero(counts) == 1:
+            return self._leaf(counts, impurity, node_id, "pure"), None
+        if self.max_depth is not None and depth >= self.max_depth:
+            return self._leaf(counts, impurity, node_id, "max depth"), None
+        if counts.sum() < self.min_samples_split:
+            return self._leaf(counts, impurity, node_id, "min samples split"), None
         
-        #If there are no more features but target still is impure
+        #If there are no more features that still split the node but target still is impure
+        with self._phase('candidates'):
+            if histograms is not None:
+                features = [feat for feat, hist in histograms.items()
+                            if np.count_nonzero(hist.any(axis=1)) > 1]
+            else:
+                features = []
+                for j, feat in enumerate(data.feature_names):
+                    codes = data.columns[j][node_samples]
+                    if codes.min() != codes.max():
+                        features.append(feat)
         if(len(features) == 0):
-            result = df[target].mode().iloc[0]
-            if self.verbose:
-                print(f"{indent}-> Leaf: {result} (no more features)")
-            return result
-        
-        # Calculate metrics for all features
-        if self.verbose:
-            current_impurity = self.criterion._get_impurity_measure(df, target)
-            print(f"\n{indent}Node at depth {depth}:")
-            print(f"{indent}Samples: {len(df)}")
-            print(f"{indent}Current {type(self.criterion).__name__}: {current_impurity:.4f}")
-            print(f"{indent}Class distribution: {dict(df[target].value_counts())}")
-            
-        best_feature, best_gain = self.criterion.get_best_feature(df, target)
-        
-        if self.verbose:
-            print(f"{indent}Evaluating features:")
-            # Show detailed calculations for all features
-            for feature in features:
-                calc = self.criterion.get_detailed_calculations(df, feature, target)
-                
-                # Check if we have detailed calculations or just basic gain
-                if 'splits' in calc:
-                    print(f"{indent}  Feature: {feature}")
-                    
-                    # Handle Entropy case
-                    if 'total_entropy' in calc:
-                        print(f"{indent}    Total entropy: {calc['total_entropy']:.4f}")
-                        print(f"{indent}    Splits:")
-                        for split in calc['splits']:
-                            print(f"{indent}      {feature} = {split['value']}: {split['samples']} samples")
-                            print(f"{indent}        Class dist: {split['class_distribution']}")
-                            print(f"{indent}        Entropy: {split['entropy']:.4f}")
-                            print(f"{indent}        Weight: {split['proportion']:.4f}")
-                            print(f"{indent}        Weighted contribution: {split['weighted_contribution']:.4f}")
-                        print(f"{indent}    Weighted entropy: {calc['weighted_entropy']:.4f}")
-                        print(f"{indent}    Information gain: {calc['information_gain']:.4f}")
-                    
-                    # Handle Gini case
-                    elif 'total_gini' in calc:
-                        print(f"{indent}    Total Gini: {calc['total_gini']:.4f}")
-                        print(f"{indent}    Splits:")
-                        for split in calc['splits']:
-                            print(f"{indent}      {feature} = {split['value']}: {split['samples']} samples")
-                            print(f"{indent}        Class dist: {split['class_distribution']}")
-                            print(f"{indent}        Gini: {split['gini']:.4f}")
-                            print(f"{indent}        Weight: {split['proportion']:.4f}")
-                            print(f"{indent}        Weighted contribution: {split['weighted_contribution']:.4f}")
-                        print(f"{indent}    Weighted Gini: {calc['weighted_gini']:.4f}")
-                        print(f"{indent}    Gini gain: {calc['gini_gain']:.4f}")
-                else:
-                    # Fallback for basic implementations
-                    gain = self.criterion._get_splitting_criterion(df, feature, target)
-                    print(f"{indent}  {feature}: gain = {gain:.4f}")
-                
-                print()  # Add spacing between features
-            
-            print(f"{indent}Best feature: {best_feature} (gain = {best_gain:.4f})")
-        
-        tree = {best_feature : {}}
-        
-        for value in df[best_feature].unique():
-            subset = df[df[best_feature] == value]
-            if self.verbose:
-                print(f"{indent}Branch: {best_feature} = {value} ({len(subset)} samples)")
-            tree[best_feature][value] = self.build_tree(subset, target, depth + 1)
+            return self._leaf(counts, impurity, node_id, "no features"), None
+
+        with self._phase('score'):
+            candidates = data.select(features)
+            target = data.target
+            if self.criterion.accepts_dataset:
+                node_orders = {data.feature_names[j]: order[start:end] for j, order in orders.items()}
+                scored = None
+                if trace is not None:
+                    def scored(feature, branches, table, threshold, score):
+                        trace.emit(FeatureScored(node_id, feature, branches, table, threshold, score))
+                best_feature, best_gain, threshold = self.criterion.get_best_split(
+                    candidates, target, samples=node_samples, orders=node_orders, histograms=histograms,
+                    trace=scored, min_samples_leaf=self.min_samples_leaf)
+            else:
+                best_feature, best_gain = self.criterion.get_best_feature(candidates.take(node_samples).to_frame(), target)
+                threshold = None
+        if best_feature is None:
+            return self._leaf(counts, impurity, node_id, "min samples leaf"), None
+        if trace is not None:
+            trace.emit(SplitChosen(node_id, best_feature, threshold, best_gain))
         
-        return tree
+        with self._phase('branches'):
+            position = data.feature_position(best_feature)
+            column = data.columns[position]
+            vocabulary = data.vocabularies[position]
+            if threshold is None:
+                n_branches = len(vocabulary)
+                branches = column[node_samples]
+            else:
+                n_branches = 2
+                split_code = int(np.searchsorted(vocabulary, threshold, side='right')) - 1
+                branches = (column[node_samples] > split_code).astype(np.uint8)
+            # Row counts place the children in ``samples``; weighted counts size them
+            sizes = np.bincount(branches, minlength=n_branches)
+            split = _Split(start, end, depth, histograms, features, position, threshold, branches, sizes, node_id)
+            if self.min_impurity_decrease > 0 or self.max_leaf_nodes is not None:
+                # Weighted as a fraction of all training samples, so decreases compare across nodes
+                table = data.tally(branches.astype(np.intp) * data.n_classes + y, node_samples,
+                                   n_branches * data.n_classes).reshape(n_branches, data.n_classes)
+                weighted = self.criterion._weighted_impurity(table[sizes > 0])
+                split.decrease = counts.sum() / self._n_samples * (impurity - weighted)
+        if split.decrease < self.min_impurity_decrease:
+            return self._leaf(counts, impurity, node_id, "min impurity decrease"), None
+        return Node(position, threshold, None, counts=counts, impurity=impurity), split
+
+    def _partition(self, data: Dataset, samples: np.ndarray, orders: dict, split: "_Split") -> list:
+        """Apply ``split``; returns (branch, start, end, histograms) of every non-empty child"""
+        start, end = split.start, split.end
+        with self._phase('partition'):
+            # Stable-sort the node's slice by branch so every child is a contiguous
+            # (start, end) range of the same samples array (and of every presorted order)
+            column = data.columns[split.position]
+            if split.threshold is None:
+                def branch_of(rows):
+                    return column[rows]
+            else:
+                split_code = int(np.searchsorted(data.vocabularies[split.position], split.threshold,
+                                                 side='right')) - 1
+                def branch_of(rows):
+                    return (column[rows] > split_code).astype(np.uint8)
+            node_samples = samples[start:end]
+            samples[start:end] = node_samples[np.argsort(split.branches, kind='stable')]
+            for order in orders.values():
+                segment = order[start:end]
+                order[start:end] = segment[np.argsort(branch_of(segment), kind='stable')]
+            sizes = split.sizes
+            offsets = start + np.concatenate(([0], np.cumsum(sizes)))
+            present = np.flatnonzero(sizes)
+        child_histograms = {}
+        if split.histograms is not None:
+            histograms, features = split.histograms, split.features
+            with self._phase('histograms'):
+                # Subtraction trick: only the smaller children are histogrammed from
+                # their rows, the largest one is its parent minus its siblings
+                largest = present[np.argmax(sizes[present])]
+                remainder = {feature: histograms[feature].copy() for feature in features}
+                for branch in present:
+                    if branch != largest:
+                        rows = samples[offsets[branch]:offsets[branch + 1]]
+                        child_histograms[branch] = self._histograms(data, rows, features)
+                        for feature in features:
+                            remainder[feature] -= child_histograms[branch][feature]
+                child_histograms[largest] = remainder
+        return [(int(branch), int(offsets[branch]), int(offsets[branch + 1]), child_histograms.get(branch))
+                for branch in present]
+
+    def _node_impurity(self, counts: np.ndarray) -> float:
+        if not self.criterion.accepts_dataset:
+            return np.nan
+        return float(self.criterion._impurity_from_counts(counts))
+
+    @staticmethod
+    def _to_dict(node: Node, dataset: Dataset):
+        """Nested {feature: {value: subtree}} view of an encoded subtree, leaves decoded.
+
+        Numeric splits use the keys "<= threshold" and "> threshold"."""
+        if node.is_leaf:
+            return dataset.classes[node.label]
+        if node.threshold is None:
+            keys = dataset.vocabularies[node.feature]
+        else:
+            keys = [f"<= {node.threshold:g}", f"> {node.threshold:g}"]
+        return {dataset.feature_names[node.feature]: {
+            keys[branch]: Tree._to_dict(child, dataset) for branch, child in node.children.items()
+        }}
+
+    @staticmethod
+    def _nodes_from_compiled(compiled: CompiledTree) -> Node:
+        """Rebuild the Node tree from its flat arrays"""
+        lookup_end = compiled.lookup_end()
+        nodes = [Node(counts=compiled.counts[i], impurity=float(compiled.impurity[i]))
+                 for i in range(compiled.n_nodes)]
+        for i, node in enumerate(nodes):
+            feature = int(compiled.feature[i])
+            if feature < 0:
+                node.label = int(compiled.value[i])
+            elif not np.isnan(compiled.threshold[i]):
+                node.feature, node.threshold = feature, float(compiled.threshold[i])
+                node.children = {0: nodes[compiled.left[i]], 1: nodes[compiled.right[i]]}
+            else:
+                node.feature = feature
+                table = compiled.lookup[compiled.lookup_start[i]:lookup_end[i]]
+                node.children = {int(code): nodes[child] for code, child in enumerate(table) if child >= 0}
+        return nodes[0]
 
     def predict(self, test):
-        return self.__prediction_helper(test, self.tree)
+        return self.dataset.classes[self.__prediction_helper(test, self.root)]
     
-    def __prediction_helper(self,sample, tree):
-        if not isinstance(tree, dict):
-            return tree
+    def __prediction_helper(self,sample, tree: Node):
+        if tree.is_leaf:
+            return tree.label
         
-        feature = list(tree.keys())[0]
-        feature_value = sample[feature]
+        value = self.dataset.encode_value(tree.feature, sample[self.dataset.feature_names[tree.feature]])
+        child = self.__route(tree, value)
 
         # Handle case where feature value was not seen during training
-        if feature_value not in tree[feature]:
-            # Return the most common class among all branches
-            leaves = []
-            self.__collect_leaves(tree[feature], leaves)
-            if leaves:
-                # Return most common prediction
-                from collections import Counter
-                most_common = Counter(leaves).most_common(1)
-                return most_common[0][0] if most_common else None
-            return None
-
-        return self.__prediction_helper(sample, tree[feature][feature_value])
-    
+        if child is None:
+            return tree.majority
+
+        return self.__prediction_helper(sample, child)
+
+    @staticmethod
+    def __route(node: Node, value):
+        """Child of ``node`` for an encoded value, or None if the value was never seen"""
+        if node.threshold is not None:
+            return node.children[0] if value <= node.threshold else node.children[1]
+        return node.children.get(int(value))
+
+    def compile(self) -> CompiledTree:
+        """Flat array form of the fitted tree, built once and reused by predict_batch"""
+        if self._compiled is None:
+            sizes = [len(vocabulary) for vocabulary in self.dataset.vocabularies]
+            self._compiled = CompiledTree.from_nodes(self.root, sizes)
+        return self._compiled
+
+    def predict_batch(self, X):
+        """Predict every row of a DataFrame or Dataset.
+
+        Columns are encoded once through the training vocabularies and all rows
+        are routed through the compiled tree together, one level at a time."""
+        with self._profiling(), self._phase('predict_encode'):
+            columns = self.dataset.encode(X)
+        with self._profiling(), self._phase('predict'):
+            return self.dataset.decode_target(self.compile().predict_codes(columns))
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Class probabilities for every row of a DataFrame or Dataset.
+
+        Each row gets the class frequencies recorded at the node where routing
+        ends; columns follow ``self.dataset.classes``."""
+        with self._profiling(), self._phase('predict_encode'):
+            columns = self.dataset.encode(X)
+        with self._profiling(), self._phase('predict_proba'):
+            return self.compile().predict_proba_codes(columns)
+
+    def cost_complexity_path(self) -> dict:
+        """Effective alphas of minimal cost-complexity pruning, from the stored node statistics.
+
+        Returns arrays ``ccp_alphas``, ``impurities`` (total leaf impurity,
+        weighted by sample share) and ``n_leaves`` of the tree pruned at each
+        alpha; any of the alphas can be passed to prune. See pruning."""
+        from .pruning import cost_complexity_path
+        return cost_complexity_path(self.compile())
+
+    def prune(self, ccp_alpha: float):
+        """Collapse every subtree whose effective alpha is at most ``ccp_alpha``, in place.
+
+        Needs no training data: the weakest-link sequence is computed from the
+        class counts and impurities recorded per node during fit."""
+        if ccp_alpha < 0:
+            raise ValueError("ccp_alpha must be non-negative")
+        from .pruning import prune
+        pruned = prune(self.compile(), ccp_alpha)
+        if pruned is not self._compiled:
+            self._compiled = pruned
+            self._root = None
+            self._tree = None
+        return self
+
+    def feature_importances(self) -> dict:
+        """Normalised total impurity decrease per feature, from the stored node statistics"""
+        if np.isnan(self.compile().impurity).any():
+            raise ValueError("Feature importances need node impurities; "
+                             "this tree was grown by a strategy without count kernels")
+        importances = np.zeros(self.dataset.n_features)
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node.is_leaf:
+                continue
+            children = list(node.children.values())
+            importances[node.feature] += node.n_samples * node.impurity - sum(
+                child.n_samples * child.impurity for child in children)
+            stack.extend(children)
+        total = importances.sum()
+        if total > 0:
+            importances /= total
+        return dict(zip(self.dataset.feature_names, importances.tolist()))
+
+    def branch_text(self, feature: str, value) -> str:
+        """Condition of one branch of the dict view: "x <= 5.3" for numeric features, "colour = red" otherwise"""
+        numeric = (self.dataset is not None and feature in self.dataset.feature_names
+                   and self.dataset.numeric[self.dataset.feature_position(feature)])
+        return f"{feature} {value}" if numeric else f"{feature} = {value}"
+
     def display_tree(self, tree=None, indent="", feature_name=""):
         """Display the tree structure in text format"""
         if tree is None:
@@ -141,20 +711,9 @@ class Tree:
             if feature_name:
                 print(f"{indent}{feature_name}")
             for value, subtree in branches.items():
-                branch_text = f"{indent}├─ {feature} = {value}"
+                branch_text = f"{indent}├─ {self.branch_text(feature, value)}"
                 if isinstance(subtree, dict):
                     print(f"{branch_text}")
                     self.display_tree(subtree, indent + "│  ", "")
                 else:
                     print(f"{branch_text} -> {subtree}")
-
-    def __collect_leaves(self, subtree, leaves):
-        """Helper method to collect all leaf nodes (predictions) from a subtree"""
-        if isinstance(subtree, dict):
-            for value in subtree.values():
-                self.__collect_leaves(value, leaves)
-        else:
-            # This is a leaf node
-            leaves.append(subtree)
-
-
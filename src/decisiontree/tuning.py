@@ -0,0 +1,243 @@
+"""
+Cross-validation and grid search
+================================
+
+``cross_validate`` and ``grid_search`` score Tree configurations by k-fold
+cross-validation without re-encoding anything: the data is encoded into one
+Dataset up front (and binned once per ``max_bins``, which Dataset caches),
+every fold is only a pair of train and test row index arrays, and each tree
+grows over its fold's train rows the way forest trees grow over bootstrap
+samples, so no rows are copied.
+
+Configurations that differ only in their stopping rules (``max_depth``,
+``min_samples_split``, ``min_impurity_decrease``, ``max_leaf_nodes``) share
+one tree per fold. Those rules never change which split a node takes, only
+whether it is applied, so the loosest configuration is grown and every other
+one is cut out of it by ``truncate``, which gives exactly the tree a fit with
+its rules grows. ``min_samples_leaf`` and the other arguments change the
+splits themselves, so configurations differing in them grow their own trees.
+
+With ``n_jobs`` the encoded columns, the target and the fold indices are
+placed in shared memory once and worker processes, which map them at
+start-up, each grow one (group, fold) tree at a time and send back only
+accuracies and timings. A configuration's fit time includes growing the tree
+it shares.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import os
+import time
+import numpy as np
+
+from .compiled import CompiledTree
+from .dataset import Dataset
+from .parallel import SharedArrays
+from .tree import Tree, best_first
+
+# Tree arguments that only stop growth, with Tree's defaults
+STOPPING_RULES = {'max_depth': None, 'min_samples_split': 2, 'min_impurity_decrease': 0.0, 'max_leaf_nodes': None}
+
+_worker = {}
+
+
+def kfold(y, n_splits=5, random_state=None) -> list:
+    """(train, test) row index arrays of ``n_splits`` folds stratified by the class codes ``y``.
+
+    Rows are shuffled and then dealt out to the folds class by class, so
+    every fold holds about the same share of each class."""
+    y = np.asarray(y)
+    if not 2 <= n_splits <= len(y):
+        raise ValueError(f"n_splits must be between 2 and the number of rows ({len(y)})")
+    shuffled = np.random.default_rng(random_state).permutation(len(y))
+    dealt = shuffled[np.argsort(y[shuffled], kind='stable')]
+    fold = np.empty(len(y), dtype=np.intp)
+    fold[dealt] = np.arange(len(y)) % n_splits
+    return [(np.flatnonzero(fold != k), np.flatnonzero(fold == k)) for k in range(n_splits)]
+
+
+def truncate(compiled: CompiledTree, criterion, max_depth=None, min_samples_split=2, min_impurity_decrease=0.0,
+             max_leaf_nodes=None) -> CompiledTree:
+    """The tree a fit with these stopping rules grows, cut out of ``compiled``.
+
+    ``compiled`` must have been grown by ``criterion`` with the same other
+    arguments and stopping rules no tighter than these. Decreases are
+    computed as Tree computes them, from the stored node counts and
+    impurities, and ``max_leaf_nodes`` replays its best-first order."""
+    internal = compiled.feature >= 0
+    samples = compiled.n_samples
+    stop = internal & (samples < min_samples_split)
+    if max_depth is not None:
+        stop |= internal & (compiled.depths() >= max_depth)
+    children = compiled.children()
+    if min_impurity_decrease > 0 or max_leaf_nodes is not None:
+        decrease = np.full(compiled.n_nodes, np.inf)
+        for node in np.flatnonzero(internal & ~stop):
+            weighted = criterion._weighted_impurity(compiled.counts[children[node]])
+            decrease[node] = samples[node] / samples[0] * (compiled.impurity[node] - weighted)
+        stop |= internal & (decrease < min_impurity_decrease)
+        if max_leaf_nodes is not None:
+            expandable, split = internal & ~stop, np.zeros(compiled.n_nodes, dtype=bool)
+
+            def expand(node):
+                split[node] = True
+                return [(decrease[child], child) for child in children[node] if expandable[child]]
+
+            best_first([(decrease[0], 0)] if expandable[0] else [], max_leaf_nodes,
+                       lambda node: len(children[node]), expand)
+            stop |= internal & ~split
+    return compiled.collapse(np.flatnonzero(stop)) if stop.any() else compiled
+
+
+def _groups(configs: list, keys: list) -> list:
+    """(Tree arguments to grow, [(config index, stopping rules or None)]) per group of equal ``keys``.
+
+    A group whose members all stop alike grows with their rules and needs no
+    truncation; otherwise it grows with the loosest of each rule."""
+    members = {}
+    for index, key in enumerate(keys):
+        members.setdefault(key, []).append(index)
+    groups = []
+    for indices in members.values():
+        rules = [{rule: configs[index].get(rule, default) for rule, default in STOPPING_RULES.items()}
+                 for index in indices]
+        grown = {name: value for name, value in configs[indices[0]].items() if name not in STOPPING_RULES}
+        if all(other == rules[0] for other in rules):
+            grown.update(rules[0])
+            groups.append((grown, [(index, None) for index in indices]))
+            continue
+        depths = [rule['max_depth'] for rule in rules]
+        grown.update(max_depth=None if None in depths else max(depths),
+                     min_samples_split=min(rule['min_samples_split'] for rule in rules),
+                     min_impurity_decrease=min(rule['min_impurity_decrease'] for rule in rules),
+                     max_leaf_nodes=None)
+        groups.append((grown, list(zip(indices, rules))))
+    return groups
+
+
+def _evaluate(data: Dataset, encoded: list, train: np.ndarray, test: np.ndarray, grown: dict, members: list) -> list:
+    """Grow one group's tree on the ``train`` rows and score its members on the ``test`` rows.
+
+    Returns (config index, accuracy, fit seconds, score seconds) per member."""
+    start = time.perf_counter()
+    tree = Tree(**grown)
+    if tree.builder == "levelwise" or tree.compress:
+        # These fits always take every row of their dataset
+        tree._fit(data.take(train), None)
+    else:
+        tree._fit(data, None, train)
+    compiled = tree.compile()
+    grow_time = time.perf_counter() - start
+    columns = [column[test] for column in encoded]
+    truth = data.y[test]
+    weights = None if data.weights is None else data.weights[test]
+    results = []
+    for index, rules in members:
+        start = time.perf_counter()
+        member = compiled if rules is None else truncate(compiled, tree.criterion, **rules)
+        fit_time = grow_time + time.perf_counter() - start
+        start = time.perf_counter()
+        accuracy = float(np.average(member.predict_codes(columns) == truth, weights=weights))
+        results.append((index, accuracy, fit_time, time.perf_counter() - start))
+    return results
+
+
+def _init_worker(data_spec, encoded_specs, fold_specs) -> None:
+    shared = SharedArrays()
+    _worker.update(data=shared.attach_dataset(data_spec), encoded=[shared.attach(spec) for spec in encoded_specs],
+                   folds=[(shared.attach(train), shared.attach(test)) for train, test in fold_specs],
+                   shared=shared)
+
+
+def _evaluate_task(fold: int, grown: dict, members: list) -> list:
+    train, test = _worker['folds'][fold]
+    return _evaluate(_worker['data'], _worker['encoded'], train, test, grown, members)
+
+
+def _run(data: Dataset, folds: list, groups: list, n_jobs) -> list:
+    """Results of every (group, fold), serially or over ``n_jobs`` worker processes"""
+    encoded = data.prediction_columns()
+    tasks = [(fold, grown, members) for grown, members in groups for fold in range(len(folds))]
+    n_jobs = (os.cpu_count() or 1) if n_jobs == -1 else (n_jobs or 1)
+    if n_jobs <= 1 or len(tasks) <= 1:
+        return [_evaluate(data, encoded, *folds[fold], grown, members) for fold, grown, members in tasks]
+    with SharedArrays() as shared:
+        fold_specs = [(shared.share(train)[0], shared.share(test)[0]) for train, test in folds]
+        initargs = (shared.share_dataset(data), [shared.share(column)[0] for column in encoded], fold_specs)
+        with ProcessPoolExecutor(min(n_jobs, len(tasks)), initializer=_init_worker, initargs=initargs) as pool:
+            return list(pool.map(_evaluate_task, *zip(*tasks)))
+
+
+def _search(df, target, configs: list, keys: list, cv, n_jobs, random_state) -> dict:
+    """Cross-validate every configuration; (configs x folds) accuracy and timing arrays"""
+    # Builds every Tree once up front, so invalid arguments fail before any work
+    trees = [Tree(**config) for config in configs]
+    if len({tree.criterion.accepts_dataset for tree in trees}) > 1:
+        raise ValueError("Criteria with and without count kernels need different encodings; search them separately")
+    if isinstance(df, Dataset):
+        if target is not None and target != df.target:
+            raise ValueError(f"Dataset was encoded with target '{df.target}', not '{target}'")
+        data = df
+    else:
+        data = trees[0]._encode(df, target)
+    if data.y is None:
+        raise ValueError("Cross-validation needs a target")
+    folds = kfold(data.y, cv, random_state) if isinstance(cv, (int, np.integer)) else [
+        (np.asarray(train, dtype=np.intp), np.asarray(test, dtype=np.intp)) for train, test in cv]
+    groups = _groups(configs, keys)
+    shape = (len(configs), len(folds))
+    accuracy, fit_time, score_time = np.empty(shape), np.empty(shape), np.empty(shape)
+    tasks = [(fold, group) for group in range(len(groups)) for fold in range(len(folds))]
+    for (fold, _), results in zip(tasks, _run(data, folds, groups, n_jobs)):
+        for index, *scores in results:
+            accuracy[index, fold], fit_time[index, fold], score_time[index, fold] = scores
+    return {'accuracy': accuracy, 'fit_time': fit_time, 'score_time': score_time, 'trees_grown': len(tasks)}
+
+
+def cross_validate(criterion, df, target: str | None = None, cv=5, n_jobs=None, random_state=None,
+                   **params) -> dict:
+    """Accuracy of a Tree with ``criterion`` and ``params`` on each of ``cv`` folds.
+
+    ``df`` is a DataFrame or an already encoded Dataset. ``cv`` is a number
+    of stratified folds, shuffled by ``random_state`` (see kfold), or a list of
+    (train, test) row index arrays. ``random_state`` also seeds randomized
+    splits (``max_features``, ``splitter``). Returns per-fold arrays
+    ``accuracy``, ``fit_time`` and ``score_time`` (seconds)."""
+    config = {'criterion': criterion, 'random_state': random_state, **params}
+    result = _search(df, target, [config], [0], cv, n_jobs, random_state)
+    return {name: result[name][0] for name in ('accuracy', 'fit_time', 'score_time')}
+
+
+def grid_search(criterion, df, target: str | None = None, param_grid=None, cv=5, n_jobs=None, random_state=None,
+                **params) -> dict:
+    """Cross-validate a Tree for every combination of ``param_grid``'s values.
+
+    ``param_grid`` maps Tree arguments (``criterion`` included) to the
+    values to try; ``params`` are fixed for every combination. ``df``,
+    ``cv``, ``n_jobs`` and ``random_state`` work as in cross_validate.
+    Combinations differing only in stopping rules share their trees. Returns
+    ``params`` (each combination's grid values), ``accuracy``, ``fit_time`` and
+    ``score_time`` as combinations x folds arrays, their means
+    (``mean_accuracy``, ``std_accuracy``, ``mean_fit_time``,
+    ``mean_score_time``), ``best_index`` and ``best_params`` (highest mean
+    accuracy, ties: the first), and ``trees_grown``."""
+    param_grid = dict(param_grid or {})
+    names = list(param_grid)
+    grid = [list(values) for values in param_grid.values()]
+    if any(len(values) == 0 for values in grid):
+        raise ValueError("Every parameter in param_grid needs at least one value")
+    combinations = list(itertools.product(*[range(len(values)) for values in grid]))
+    configs, keys, chosen = [], [], []
+    for combination in combinations:
+        values = {name: grid[j][i] for j, (name, i) in enumerate(zip(names, combination))}
+        configs.append({'criterion': criterion, 'random_state': random_state, **params, **values})
+        # Positions in the grid identify values, which need not be hashable or comparable
+        keys.append(tuple(i for name, i in zip(names, combination) if name not in STOPPING_RULES))
+        chosen.append(values)
+    result = _search(df, target, configs, keys, cv, n_jobs, random_state)
+    accuracy = result['accuracy']
+    mean_accuracy = accuracy.mean(axis=1)
+    best = int(np.argmax(mean_accuracy))
+    return {'params': chosen, **result, 'mean_accuracy': mean_accuracy, 'std_accuracy': accuracy.std(axis=1),
+            'mean_fit_time': result['fit_time'].mean(axis=1), 'mean_score_time': result['score_time'].mean(axis=1),
+            'best_index': best, 'best_params': chosen[best]}
@@ -0,0 +1,53 @@
+import pytest
+import pandas as pd
+import numpy as np
+from decisiontree.tree import Tree
+from decisiontree.ImpurityStrategy import GiniIndex
+
+COLOURS = ('red', 'green', 'blue', 'grey')
+
+
+def _make_frame(n=600, seed=0, noise=0.1, missing=None, decimals=2, cut=0.0, colours=3, numeric=0, integers=None,
+                ids=None, labels=('a', 'b', 'c')):
+    """Synthetic frame whose target 'y' is ``x > cut`` xor ``colour == 'red'``.
+
+    'x' is normal, rounded to ``decimals`` (None: not rounded) and NaN on every
+    ``missing``-th row (NaN counts as 0 in the target); 'colour' takes the first
+    ``colours`` of COLOURS. Noise features: ``numeric`` more normal columns x1,
+    x2, ..., 'z' with whole numbers below ``integers`` and 'id' with ``ids``
+    string labels. A ``noise`` share of rows is relabelled ``labels[2]``."""
+    rng = np.random.default_rng(seed)
+    def normal():
+        values = rng.normal(size=n)
+        return values if decimals is None else values.round(decimals)
+    df = pd.DataFrame({'x': normal()})
+    for i in range(1, numeric + 1):
+        df[f'x{i}'] = normal()
+    if integers is not None:
+        df['z'] = rng.integers(0, integers, n).astype(float)
+    if ids is not None:
+        df['id'] = rng.integers(0, ids, n).astype(str)
+    df['colour'] = rng.choice(COLOURS[:colours], n)
+    if missing is not None:
+        df.loc[::missing, 'x'] = np.nan
+    df['y'] = np.where((df['x'].fillna(0) > cut) ^ (df['colour'] == 'red'), labels[0], labels[1])
+    if noise:
+        df.loc[rng.random(n) < noise, 'y'] = labels[2]
+    return df
+
+
+def _fit(df, criterion=GiniIndex, sample_weight=None, **kwargs):
+    """Tree of ``criterion`` with ``kwargs`` fitted on ``df``'s 'y'"""
+    tree = Tree(criterion(), **kwargs)
+    tree.fit(df, 'y', sample_weight=sample_weight)
+    return tree
+
+
+@pytest.fixture
+def make_frame():
+    return _make_frame
+
+
+@pytest.fixture
+def fit():
+    return _fit
@@ -0,0 +1,33 @@
+import pytest
+import pandas as pd
+import numpy as np
+from benchmarks.synthetic import make_classification
+from benchmarks.suite import case_name, compare, measure_case
+
+def test_generator_shape_and_determinism():
+    df = make_classification(n_rows=500, n_numeric=3, n_categorical=2, cardinality=5, n_classes=4,
+                             missing=0.1, seed=3)
+    assert list(df.columns) == ['num_0', 'num_1', 'num_2', 'cat_0', 'cat_1', 'label']
+    assert df['label'].nunique() == 4
+    assert df['cat_0'].dropna().nunique() == 5
+    assert 0 < df['num_0'].isna().mean() < 0.2
+    pd.testing.assert_frame_equal(df, make_classification(n_rows=500, n_numeric=3, n_categorical=2,
+                                                          cardinality=5, n_classes=4, missing=0.1, seed=3))
+    with pytest.raises(ValueError):
+        make_classification(n_classes=1)
+
+def test_measure_and_compare():
+    case = {'n_rows': 300, 'n_numeric': 2, 'n_categorical': 2, 'binning': 'histogram'}
+    result = measure_case('gini', case, repeats=1)
+    assert result['fit_rows_per_second'] > 0 and result['peak_bytes'] > 0
+    assert result['scaling']['1']['speedup'] == 1.0
+
+    key = case_name('gini', case)
+    assert key == 'gini/rows=300/num=2/cat=2/card=8/classes=3/histogram'
+    baseline = {'cases': {key: result}}
+    slower = {'cases': {key: dict(result, fit_rows_per_second=result['fit_rows_per_second'] * 0.7)}}
+    rows = {row['metric']: row for row in compare(baseline, slower, tolerance=0.2)}
+    assert rows['fit_rows_per_second']['regression']
+    assert np.isclose(rows['fit_rows_per_second']['change'], -0.3)
+    assert not rows['predict_rows_per_second']['regression']
+    assert not any(row['regression'] for row in compare(baseline, slower, tolerance=0.5))
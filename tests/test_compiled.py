@@ -0,0 +1,77 @@
+import pytest
+import pandas as pd
+import numpy as np
+from decisiontree.tree import Tree
+from decisiontree.compiled import CompiledTree
+from decisiontree.ImpurityStrategy.Entropy import Entropy
+from decisiontree.ImpurityStrategy.GiniIndex import GiniIndex
+
+@pytest.fixture
+def mixed_dataset():
+    rng = np.random.default_rng(7)
+    df = pd.DataFrame({
+        'size': rng.normal(size=400).round(1),
+        'shape': rng.choice(['round', 'square', 'star'], 400),
+        'weight': rng.integers(0, 20, 400).astype(float)
+    })
+    df.loc[::17, 'size'] = np.nan
+    df['label'] = np.where((df['size'].fillna(1) > 0) & (df['shape'] != 'star') | (df['weight'] < 3), 'a', 'b')
+    return df
+
+def test_compile_produces_flat_arrays(mixed_dataset):
+    tree = Tree(GiniIndex())
+    tree.fit(mixed_dataset, 'label')
+    compiled = tree.compile()
+    assert isinstance(compiled, CompiledTree)
+    assert compiled is tree.compile()
+    leaves = compiled.feature < 0
+    assert compiled.n_nodes == len(compiled.threshold) == len(compiled.value)
+    assert np.all(compiled.left[leaves] == -1)
+
+def test_batch_predict_matches_row_predict(mixed_dataset):
+    tree = Tree(Entropy())
+    tree.fit(mixed_dataset.iloc[:300], 'label')
+    X = mixed_dataset.drop(columns='label')
+    X.loc[3, 'shape'] = 'hexagon'  # unseen value
+    X.loc[4, 'size'] = np.nan
+    expected = [tree.predict(row) for row in X.to_dict('records')]
+    assert list(tree.predict_batch(X)) == expected
+
+def test_batch_predict_across_blocks(mixed_dataset, monkeypatch):
+    tree = Tree(Entropy())
+    tree.fit(mixed_dataset, 'label')
+    X = mixed_dataset.drop(columns='label')
+    expected = tree.predict_batch(X)
+    monkeypatch.setattr(CompiledTree, 'block_size', 7)
+    assert list(tree.predict_batch(X)) == list(expected)
+
+def test_parents_and_depths():
+    df = pd.DataFrame({'x': [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+                       'c': ['p', 'q', 'p', 'q', 'r', 'r'],
+                       'y': ['a', 'b', 'a', 'a', 'b', 'b']})
+    tree = Tree(GiniIndex())
+    tree.fit(df, 'y')
+    compiled = tree.compile()
+    parents, depths = compiled.parents(), compiled.depths()
+    assert parents[0] == -1 and depths[0] == 0
+    stack = [(tree.root, 0)]
+    expected = []
+    while stack:
+        node, depth = stack.pop()
+        expected.append(depth)
+        if not node.is_leaf:
+            stack.extend((child, depth + 1) for child in reversed(list(node.children.values())))
+    np.testing.assert_array_equal(depths, expected)
+    assert all(depths[i] == depths[parents[i]] + 1 for i in range(1, compiled.n_nodes))
+
+def test_lookup_slices_hold_each_categorical_nodes_children():
+    df = pd.DataFrame({'a': ['x', 'x', 'y', 'y', 'z', 'z'], 'b': ['u', 'v', 'u', 'v', 'u', 'u'],
+                       'c': ['p', 'q', 'q', 'q', 'p', 'p']})
+    tree = Tree(GiniIndex())
+    tree.fit(df, 'c')
+    compiled = tree.compile()
+    end = compiled.lookup_end()
+    children = compiled.children()
+    for node in range(compiled.n_nodes):
+        table = compiled.lookup[compiled.lookup_start[node]:end[node]]
+        assert sorted(table[table >= 0].tolist()) == (children[node] if np.isnan(compiled.threshold[node]) else [])
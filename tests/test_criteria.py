@@ -0,0 +1,111 @@
+import pytest
+import pandas as pd
+import numpy as np
+from decisiontree import HoeffdingTree
+from decisiontree.tree import Tree
+from decisiontree.serialization import save_model, load_model
+from decisiontree.ImpurityStrategy import ImpurityStrategy, Entropy, GiniIndex, GainRatio, ChiSquare
+
+@pytest.fixture
+def mixed(make_frame):
+    return make_frame(800, 4, missing=13, cut=0.1, ids=40)
+
+def proportion_entropy(counts):
+    counts = np.asarray(counts, dtype=float)
+    p = counts[counts > 0] / counts.sum()
+    return -(p * np.log2(p)).sum()
+
+@pytest.mark.parametrize('counts', [[3, 5, 0], [0.5, 2.25, 1.0], [2_000_000, 7, 1_500_001], [0, 0, 0]])
+def test_entropy_lookup_matches_proportions(counts):
+    result = Entropy()._impurity_from_counts(np.array(counts))
+    assert np.isclose(result, proportion_entropy(counts) if sum(counts) else 0.0)
+
+def test_gain_ratio_divides_by_split_information():
+    table = np.array([[6, 2], [1, 7], [0, 0]])
+    parent = table.sum(axis=0)
+    sizes = table.sum(axis=1)
+    gain = proportion_entropy(parent) - sum(size / 16 * proportion_entropy(row) for size, row in zip(sizes, table))
+    assert np.isclose(GainRatio().split_gains(table), gain / proportion_entropy(sizes))
+    # A single non-empty branch has no split information
+    assert GainRatio().split_gains(np.array([[4, 4], [0, 0]])) == 0
+
+def test_chi_square_statistic():
+    criterion = ChiSquare()
+    assert np.isclose(criterion.split_gains(np.array([[10, 0], [0, 10]])), 20)
+    assert np.isclose(criterion.split_gains(np.array([[5, 5], [5, 5]])), 0)
+    table = np.array([[8, 2, 1], [3, 6, 4]])
+    expected = np.outer(table.sum(axis=1), table.sum(axis=0)) / table.sum()
+    assert np.isclose(criterion.split_gains(table), ((table - expected) ** 2 / expected).sum())
+
+@pytest.mark.parametrize('criterion', [Entropy, GiniIndex, GainRatio, ChiSquare])
+def test_batched_gains_match_single_tables(criterion):
+    tables = np.random.default_rng(0).integers(0, 20, (5, 4, 3, 2))
+    batched = criterion().split_gains(tables)
+    assert batched.shape == (5, 4)
+    single = [[criterion().split_gains(table) for table in row] for row in tables]
+    np.testing.assert_allclose(batched, single)
+    left, right = tables[..., 0, :], tables[..., 1, :] + tables[..., 2, :]
+    np.testing.assert_allclose(criterion()._binary_gains(left, right),
+                               criterion().split_gains(np.stack([left, right], axis=-2)))
+
+@pytest.mark.parametrize('criterion', [GainRatio, ChiSquare])
+@pytest.mark.parametrize('kwargs', [{}, {'binning': 'histogram', 'max_bins': 16}])
+def test_new_criteria_grow_the_same_tree_in_every_builder(mixed, criterion, kwargs):
+    recursive = Tree(criterion(), max_depth=4, **kwargs)
+    recursive.fit(mixed, 'y')
+    levelwise = Tree(criterion(), max_depth=4, builder='levelwise', **kwargs)
+    levelwise.fit(mixed, 'y')
+    assert str(levelwise.tree) == str(recursive.tree)
+    assert recursive.compile().n_nodes > 1
+
+@pytest.mark.parametrize('criterion', [GainRatio, ChiSquare])
+def test_new_criteria_train_out_of_core_and_round_trip(mixed, criterion, tmp_path):
+    mixed.to_csv(tmp_path / 'train.csv', index=False)
+    in_memory = Tree(criterion(), binning='histogram', max_depth=3)
+    in_memory.fit(pd.read_csv(tmp_path / 'train.csv'), 'y')
+    streamed = Tree(criterion(), max_depth=3)
+    streamed.fit_csv(tmp_path / 'train.csv', 'y', chunksize=150)
+    assert str(streamed.tree) == str(in_memory.tree)
+    save_model(streamed, tmp_path / 'model.npz')
+    assert type(load_model(tmp_path / 'model.npz').criterion) is criterion
+
+def test_gain_ratio_resists_many_valued_features():
+    # 'id' is noise with 40 values: information gain prefers it to the weak signal in 'colour'
+    rng = np.random.default_rng(4)
+    n = 800
+    df = pd.DataFrame({'id': rng.integers(0, 40, n).astype(str), 'colour': rng.choice(['red', 'green', 'blue'], n)})
+    df['y'] = np.where(df['colour'] == 'red', 'a', 'b')
+    noisy = rng.random(n) < 0.85
+    df.loc[noisy, 'y'] = rng.choice(['a', 'b'], noisy.sum())
+    entropy, ratio = Tree(Entropy(), max_depth=1), Tree(GainRatio(), max_depth=1)
+    entropy.fit(df, 'y')
+    ratio.fit(df, 'y')
+    assert list(entropy.tree) == ['id']
+    assert list(ratio.tree) == ['colour']
+
+def test_unbounded_gains_cannot_stream():
+    with pytest.raises(ValueError, match='does not support streaming'):
+        HoeffdingTree(ChiSquare())
+    HoeffdingTree(GainRatio())
+
+class Misclassification(ImpurityStrategy):
+    # Only the impurity of a class-count vector: the count kernels do the rest
+    def _impurity_from_counts(self, counts):
+        counts = np.asarray(counts, dtype=float)
+        totals = counts.sum(axis=-1)
+        return 1 - np.divide(counts.max(axis=-1), totals, out=np.ones_like(totals), where=totals > 0)
+
+class DataFrameMisclassification(Misclassification):
+    accepts_dataset = False
+
+@pytest.mark.parametrize('kwargs', [{}, {'binning': 'histogram', 'max_bins': 16}])
+def test_custom_impurity_gets_the_count_kernels(mixed, kwargs):
+    assert Misclassification.accepts_dataset and not DataFrameMisclassification.accepts_dataset
+    recursive = Tree(Misclassification(), max_depth=3, min_samples_leaf=5, **kwargs)
+    recursive.fit(mixed, 'y')
+    levelwise = Tree(Misclassification(), max_depth=3, min_samples_leaf=5, builder='levelwise', **kwargs)
+    levelwise.fit(mixed, 'y')
+    assert str(levelwise.tree) == str(recursive.tree)
+    assert list(recursive.tree) == ['x'] and not np.isnan(recursive.compile().threshold[0])
+    with pytest.raises(ValueError, match='does not support min_samples_leaf'):
+        Tree(DataFrameMisclassification(), min_samples_leaf=5).fit(mixed, 'y')
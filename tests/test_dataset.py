@@ -0,0 +1,78 @@
+import pytest
+import pandas as pd
+import numpy as np
+from decisiontree.dataset import Dataset
+from decisiontree.tree import Tree
+from decisiontree.ImpurityStrategy.Entropy import Entropy
+from decisiontree.ImpurityStrategy.GiniIndex import GiniIndex
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        'outlook': ['sunny', 'sunny', 'overcast', 'rainy', 'rainy', 'overcast'],
+        'windy': ['false', 'true', 'false', 'false', 'true', 'true'],
+        'play': ['no', 'no', 'yes', 'yes', 'no', 'yes']
+    })
+
+def test_dataset_encodes_compact_codes(df):
+    data = Dataset(df, 'play')
+    assert data.feature_names == ['outlook', 'windy']
+    assert data.column('outlook').dtype == np.uint8
+    assert list(data.vocabularies[0]) == ['overcast', 'rainy', 'sunny']
+    assert list(data.classes) == ['no', 'yes']
+    assert list(data.decode_target(data.y)) == list(df['play'])
+
+def test_dataset_wide_vocabulary_uses_uint16():
+    df = pd.DataFrame({'id': [f'v{i}' for i in range(300)], 'target': [0, 1] * 150})
+    assert Dataset(df, 'target').column('id').dtype == np.uint16
+
+def test_dataset_encode_unseen_gets_sentinel(df):
+    data = Dataset(df, 'play')
+    codes = data.encode(pd.DataFrame({'outlook': ['rainy', 'foggy'], 'windy': ['true', 'false']}))
+    assert list(codes[0]) == [1, 3]
+    assert list(codes[1]) == [1, 0]
+
+def test_dataset_encode_other_dataset(df):
+    data = Dataset(df, 'play')
+    other = Dataset(pd.DataFrame({'outlook': ['sunny', 'foggy'], 'windy': ['true', 'true']}))
+    codes = data.encode(other)
+    assert list(codes[0]) == [2, 3]
+    assert list(codes[1]) == [1, 1]
+
+def test_strategies_accept_dataset(df):
+    data = Dataset(df, 'play')
+    for criterion in (Entropy(), GiniIndex()):
+        assert criterion.get_best_feature(data, 'play') == criterion.get_best_feature(df, 'play')
+        assert np.isclose(criterion._get_impurity_measure(data, 'play'),
+                          criterion._get_impurity_measure(df, 'play'))
+
+def test_tree_refit_on_same_dataset(df):
+    data = Dataset(df, 'play')
+    entropy_tree = Tree(Entropy())
+    entropy_tree.fit(data)
+    gini_tree = Tree(GiniIndex())
+    gini_tree.fit(data)
+    reference = Tree(Entropy())
+    reference.fit(df, 'play')
+    assert entropy_tree.tree == reference.tree
+    assert gini_tree.tree is not None
+
+def test_predict_batch_matches_predict(df):
+    tree = Tree(Entropy())
+    tree.fit(df, 'play')
+    X = df.drop(columns='play')
+    expected = [tree.predict(row) for row in X.to_dict('records')]
+    assert list(tree.predict_batch(X)) == expected
+    assert list(tree.predict_batch(Dataset(X))) == expected
+
+def test_to_bins_quantile_uint8_codes():
+    values = np.arange(1000, dtype=float)
+    data = Dataset(pd.DataFrame({'x': values, 'target': values % 2}), 'target')
+    binned = data.to_bins(max_bins=10)
+    codes = binned.column('x')
+    assert codes.dtype == np.uint8
+    assert np.array_equal(np.bincount(codes), [100] * 10)
+    # A bin's vocabulary entry is its inclusive upper bound
+    assert np.all(values[codes <= 3] <= binned.vocabularies[0][3])
+    assert np.all(values[codes > 3] > binned.vocabularies[0][3])
+    assert data.to_bins(max_bins=10) is binned
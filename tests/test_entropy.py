@@ -47,3 +47,20 @@ def test_entropy_perfect_split(entropy_instance):
     best_feature, info_gain = entropy_instance.get_best_feature(df, 'target')
     assert best_feature == 'feature'
     assert np.isclose(info_gain, 1.0)  # Perfect split
+
+def test_entropy_impurity_from_count_matrix(entropy_instance):
+    table = np.array([[4, 0], [2, 2], [0, 0]])
+    result = entropy_instance._impurity_from_counts(table)
+    assert np.allclose(result, [0.0, 1.0, 0.0])
+    # Only non-empty branches contribute to the weighted impurity
+    assert np.isclose(entropy_instance._weighted_impurity(table), 0.5)
+
+def test_parallel_scoring_matches_serial():
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame({f'f{i}': rng.integers(0, 3, 200) for i in range(12)})
+    df['f12'] = df['f3']  # tie with f3, first one must win
+    df['y'] = np.where(df['f3'] > 0, 'a', 'b')
+    serial = Entropy().get_best_split(df, 'y')
+    for n_jobs in (2, 5, -1):
+        assert Entropy(n_jobs=n_jobs).get_best_split(df, 'y') == serial
+    assert serial[0] == 'f3'
@@ -0,0 +1,89 @@
+import pytest
+import pandas as pd
+import numpy as np
+from decisiontree import RandomForest
+from decisiontree.tree import Tree
+from decisiontree.ImpurityStrategy.Entropy import Entropy
+from decisiontree.ImpurityStrategy.GiniIndex import GiniIndex
+
+@pytest.fixture
+def frame(make_frame):
+    return make_frame(600, 11, noise=0.15, missing=23, colours=4, integers=30)
+
+def test_bootstrap_rows_grow_the_tree_of_the_resampled_frame():
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame({'a': rng.choice(list('pqrs'), 300), 'b': rng.choice(list('uvw'), 300)})
+    df['y'] = np.where((df['a'] == 'p') | (df['b'] == 'u'), 'yes', 'no')
+    df.loc[rng.random(300) < 0.2, 'y'] = 'maybe'
+    rows = rng.integers(0, len(df), len(df))
+    bootstrapped = Tree(GiniIndex())
+    bootstrapped._fit(df, 'y', rows)
+    copied = Tree(GiniIndex())
+    copied.fit(df.iloc[rows], 'y')
+    assert str(bootstrapped.tree) == str(copied.tree)
+
+def test_single_tree_without_bootstrap_is_a_tree(frame):
+    forest = RandomForest(Entropy(), n_estimators=1, bootstrap=False).fit(frame, 'y')
+    tree = Tree(Entropy())
+    tree.fit(frame, 'y')
+    assert str(forest.trees[0].tree) == str(tree.tree)
+    np.testing.assert_array_equal(forest.predict_batch(frame), tree.predict_batch(frame))
+    np.testing.assert_allclose(forest.predict_proba(frame), tree.predict_proba(frame))
+
+@pytest.mark.parametrize('binning', [None, 'histogram'])
+def test_parallel_forest_matches_serial(frame, binning):
+    serial = RandomForest(GiniIndex(), n_estimators=6, random_state=4, oob_score=True, binning=binning)
+    serial.fit(frame, 'y')
+    parallel = RandomForest(GiniIndex(), n_estimators=6, random_state=4, oob_score=True, binning=binning, n_jobs=2)
+    parallel.fit(frame, 'y')
+    for a, b in zip(serial.trees, parallel.trees):
+        assert str(a.tree) == str(b.tree)
+    np.testing.assert_allclose(parallel.oob_proba, serial.oob_proba)
+    assert parallel.oob_accuracy == serial.oob_accuracy
+
+def test_votes_and_probabilities(frame):
+    forest = RandomForest(GiniIndex(), n_estimators=7, random_state=0, min_samples_leaf=3).fit(frame, 'y')
+    X = frame.drop(columns='y').copy()
+    X.loc[0, 'colour'] = 'purple'  # unseen value
+    votes = forest.votes(X)
+    assert (votes.sum(axis=1) == 7).all()
+    expected = np.stack([tree.predict_batch(X) == label for label in forest.dataset.classes for tree in forest.trees])
+    np.testing.assert_array_equal(votes.T.ravel(), expected.reshape(len(forest.dataset.classes), 7, -1).sum(axis=1).ravel())
+    np.testing.assert_array_equal(forest.predict_batch(X), forest.dataset.classes[np.argmax(votes, axis=1)])
+    proba = forest.predict_proba(X)
+    np.testing.assert_allclose(proba.sum(axis=1), 1)
+    np.testing.assert_allclose(proba, np.mean([tree.predict_proba(X) for tree in forest.trees], axis=0))
+
+def test_oob_score(frame):
+    forest = RandomForest(GiniIndex(), n_estimators=15, random_state=1, oob_score=True).fit(frame, 'y')
+    scored = forest.oob_proba.sum(axis=1) > 0
+    assert scored.mean() > 0.99
+    np.testing.assert_allclose(forest.oob_proba[scored].sum(axis=1), 1)
+    assert 0.5 < forest.oob_accuracy < 1.0
+    # Out-of-bag accuracy estimates held-out accuracy, not the training fit
+    assert forest.oob_accuracy < np.mean(forest.predict_batch(frame) == frame['y'])
+
+def test_seeded_forests_repeat(frame):
+    a = RandomForest(GiniIndex(), n_estimators=3, random_state=9).fit(frame, 'y')
+    b = RandomForest(GiniIndex(), n_estimators=3, random_state=9).fit(frame, 'y')
+    assert [str(t.tree) for t in a.trees] == [str(t.tree) for t in b.trees]
+    assert str(a.trees[0].tree) != str(a.trees[1].tree)
+
+def test_serial_fits_leave_the_template_untouched(frame):
+    forest = RandomForest(GiniIndex(), n_estimators=3, random_state=5, max_features=1, splitter='random')
+    criterion = forest._template.criterion
+    first = [str(t.tree) for t in forest.fit(frame, 'y').trees]
+    assert forest._template.criterion is criterion and forest._template.dataset is None
+    assert all(tree.criterion is criterion for tree in forest.trees)
+    # A refit draws from the same seeds, as the worker processes do
+    assert [str(t.tree) for t in forest.fit(frame, 'y').trees] == first
+    parallel = RandomForest(GiniIndex(), n_estimators=3, random_state=5, max_features=1, splitter='random', n_jobs=2)
+    assert [str(t.tree) for t in parallel.fit(frame, 'y').trees] == first
+
+def test_invalid_forests_raise(frame):
+    with pytest.raises(ValueError):
+        RandomForest(GiniIndex(), n_estimators=0)
+    with pytest.raises(ValueError):
+        RandomForest(GiniIndex(), bootstrap=False, oob_score=True)
+    with pytest.raises(ValueError):
+        RandomForest(GiniIndex()).predict_batch(frame)
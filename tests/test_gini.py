@@ -25,9 +25,9 @@ def test_gini_splitting_criterion(gini_instance):
         'feature': [1, 1, 0, 0], 
         'target': [1, 1, 0, 0]
     })
-    weighted_gini = gini_instance._get_splitting_criterion(df, 'feature', 'target')
-    # Perfect split should give 0 weighted gini
-    assert np.isclose(weighted_gini, 0.0)
+    gini_gain = gini_instance._get_splitting_criterion(df, 'feature', 'target')
+    # Perfect split removes all of the parent's 0.5 gini
+    assert np.isclose(gini_gain, 0.5)
 
 def test_gini_get_best_feature(gini_instance):
     df = pd.DataFrame({
@@ -46,4 +46,20 @@ def test_gini_perfect_split(gini_instance):
     })
     best_feature, gini_score = gini_instance.get_best_feature(df, 'target')
     assert best_feature == 'feature'
-    assert np.isclose(gini_score, 0.0)  # Perfect split gives 0 weighted gini
+    assert np.isclose(gini_score, 0.5)  # Perfect split gains the whole parent gini
+
+def test_gini_impurity_from_count_matrix(gini_instance):
+    table = np.array([[4, 0], [2, 2], [0, 0]])
+    result = gini_instance._impurity_from_counts(table)
+    assert np.allclose(result[:2], [0.0, 0.5])
+    assert np.isclose(gini_instance._weighted_impurity(table), 0.25)
+
+def test_gini_numeric_threshold_sweep(gini_instance):
+    df = pd.DataFrame({
+        'x': [0.5, 3.0, 1.0, 2.5, 2.0, 1.5],
+        'target': ['a', 'b', 'a', 'b', 'b', 'a']
+    })
+    best_feature, gini_score, threshold = gini_instance.get_best_split(df, 'target')
+    assert best_feature == 'x'
+    assert np.isclose(gini_score, 0.5)
+    assert np.isclose(threshold, 1.75)
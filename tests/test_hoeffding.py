@@ -0,0 +1,107 @@
+import functools
+import pytest
+import numpy as np
+from decisiontree import HoeffdingTree
+from decisiontree.tree import Tree
+from decisiontree.serialization import save_model, load_model
+from decisiontree.ImpurityStrategy import Entropy, GiniIndex, ExtraTrees
+
+@pytest.fixture
+def stream(make_frame):
+    # Noise-free two-class rows with one numeric noise feature, x1
+    return functools.partial(make_frame, noise=0, decimals=None, cut=0.3, numeric=1, labels=('p', 'q'))
+
+@pytest.mark.parametrize('criterion', [Entropy, GiniIndex])
+def test_batches_learn_the_concept(stream, criterion):
+    tree = HoeffdingTree(criterion())
+    for seed in range(10):
+        tree.partial_fit(stream(5000, seed), 'y')
+    test = stream(2000, seed=99)
+    assert np.mean(tree.predict_batch(test) == test['y']) > 0.97
+    assert tree.predict(test.iloc[0].to_dict()) == tree.predict_batch(test.iloc[:1])[0]
+    assert np.allclose(tree.predict_proba(test).sum(axis=1), 1)
+
+def test_split_waits_for_the_bound(stream):
+    # Pure noise never separates one feature from the others by epsilon
+    tree = HoeffdingTree(GiniIndex(), tie_threshold=0)
+    df = stream(4000)
+    df['y'] = np.random.default_rng(1).choice(['p', 'q'], len(df))
+    tree.partial_fit(df, 'y')
+    assert tree.compile().n_nodes == 1
+
+def test_batch_boundaries_do_not_matter_on_block_multiples(stream):
+    # Categorical features only, since numeric bins come from the first batch
+    df = stream(6000)
+    df['x'] = np.where(df['x'] > 0.3, 'high', 'low')
+    df = df.drop(columns='x1')
+    whole = HoeffdingTree(Entropy(), grace_period=100)
+    whole.fit(df, 'y')
+    batched = HoeffdingTree(Entropy(), grace_period=100)
+    for start in range(0, len(df), 1500):
+        batched.partial_fit(df.iloc[start:start + 1500], target='y')
+    assert str(batched.tree) == str(whole.tree)
+
+def test_counts_cover_every_row(stream):
+    tree = HoeffdingTree(GiniIndex())
+    for seed in range(3):
+        tree.partial_fit(stream(3000, seed), 'y')
+    compiled = tree.compile()
+    assert compiled.n_samples[0] == 9000
+    # A node holds at least its children's rows
+    parents = compiled.parents()
+    for node in range(1, compiled.n_nodes):
+        assert compiled.n_samples[parents[node]] >= compiled.n_samples[node]
+
+def test_later_batches_extend_vocabularies_and_classes(stream):
+    tree = HoeffdingTree(Entropy(), grace_period=50)
+    tree.partial_fit(stream(2000), 'y')
+    later = stream(3000, seed=1)
+    later.loc[later['colour'] == 'blue', 'colour'] = 'violet'
+    later.loc[later['x'] < -1.5, 'y'] = 'r'
+    tree.partial_fit(later)
+    assert 'violet' in list(tree.dataset.vocabularies[tree.dataset.feature_position('colour')])
+    assert 'r' in list(tree.dataset.classes)
+    assert tree.compile().counts.shape[1] == 3
+    assert 'r' in set(tree.predict_batch(stream(500, seed=2).assign(x=-3.0)))
+
+def test_saved_model_loads_as_a_tree(stream, tmp_path):
+    tree = HoeffdingTree(GiniIndex(), max_depth=3)
+    tree.fit(stream(8000), 'y', sample_weight=np.ones(8000))
+    save_model(tree, tmp_path / 'stream.npz')
+    loaded = load_model(tmp_path / 'stream.npz')
+    assert type(loaded) is Tree
+    test = stream(1000, seed=5)
+    assert list(loaded.predict_batch(test)) == list(tree.predict_batch(test))
+    assert np.array_equal(loaded.predict_proba(test), tree.predict_proba(test))
+    assert loaded.compile().depths().max() <= 3
+
+def test_max_leaf_nodes_bounds_growth(stream):
+    tree = HoeffdingTree(Entropy(), max_leaf_nodes=3)
+    tree.fit(stream(20000), 'y')
+    assert np.count_nonzero(tree.compile().feature < 0) <= 3
+
+@pytest.mark.parametrize('max_leaf_nodes, n_leaves', [(2, 2), (3, 2)])
+def test_leaves_stop_counting_once_the_budget_is_spent(stream, monkeypatch, max_leaf_nodes, n_leaves):
+    # Two leaves spend a budget of 2; with 3 both children's three-way colour splits overshoot it
+    tree = HoeffdingTree(Entropy(), max_leaf_nodes=max_leaf_nodes)
+    tree.fit(stream(20000), 'y')
+    assert np.count_nonzero(tree.compile().feature < 0) == n_leaves
+    assert tree._stats == {} and tree._seen == {}
+    # Later batches still update the leaves' class counts, but no leaf is scored again
+    monkeypatch.setattr(tree, '_attempt', lambda leaves: pytest.fail("leaf scored after the budget was spent"))
+    tree.partial_fit(stream(5000, seed=1))
+    assert tree.compile().n_samples[0] == 25000
+
+def test_invalid_settings_are_rejected(stream):
+    with pytest.raises(ValueError, match='does not support streaming'):
+        HoeffdingTree(ExtraTrees(GiniIndex()))
+    with pytest.raises(ValueError, match='grace_period'):
+        HoeffdingTree(GiniIndex(), grace_period=0)
+    with pytest.raises(ValueError, match='delta'):
+        HoeffdingTree(GiniIndex(), delta=1)
+    tree = HoeffdingTree(GiniIndex())
+    with pytest.raises(ValueError, match='first batch needs a target'):
+        tree.partial_fit(stream(10))
+    tree.partial_fit(stream(10), 'y')
+    with pytest.raises(ValueError, match="not 'x'"):
+        tree.partial_fit(stream(10), 'x')
@@ -154,3 +154,22 @@ class TestDecisionTreeIntegration:
         accuracy = correct / total
         # Should have reasonable accuracy on training data
         assert accuracy >= 0.7  # At least 70% accuracy
+    
+    def test_numeric_features_use_binary_thresholds(self):
+        """Numeric columns split on a single threshold instead of one branch per value."""
+        df = pd.DataFrame({
+            'petal_length': [1.4, 1.3, 1.5, 4.7, 4.5, 4.9, 6.0, 5.1, 5.9, 5.6],
+            'color': ['red', 'red', 'blue', 'blue', 'red', 'blue', 'red', 'blue', 'red', 'blue'],
+            'species': ['setosa'] * 3 + ['versicolor'] * 3 + ['virginica'] * 4
+        })
+        tree = Tree(Entropy())
+        tree.fit(df, 'species')
+        
+        root = tree.tree['petal_length']
+        assert list(root) == ['<= 5', '> 5']
+        assert root['> 5'] == 'virginica'
+        # Values between the training values are routed by threshold
+        assert tree.predict({'petal_length': 2.0, 'color': 'green'}) == 'setosa'
+        assert tree.predict({'petal_length': 4.8, 'color': 'red'}) == 'versicolor'
+        assert tree.predict({'petal_length': 7.5, 'color': 'red'}) == 'virginica'
+        assert list(tree.predict_batch(df.drop(columns='species'))) == list(df['species'])
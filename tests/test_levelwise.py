@@ -0,0 +1,38 @@
+import pytest
+import pandas as pd
+import numpy as np
+from decisiontree.tree import Tree
+from decisiontree.ImpurityStrategy.Entropy import Entropy
+from decisiontree.ImpurityStrategy.GiniIndex import GiniIndex
+
+def make_frame(n=1500, seed=5):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'x': rng.normal(size=n).round(2),
+        'z': rng.integers(0, 40, n),
+        'colour': rng.choice(['red', 'green', 'blue', 'grey'], n)
+    })
+    df.loc[rng.random(n) < 0.05, 'x'] = np.nan
+    df['y'] = np.where((df['x'] > 0) ^ (df['colour'] == 'red'), 'a', 'b')
+    df.loc[rng.random(n) < 0.2, 'y'] = 'c'
+    return df
+
+@pytest.mark.parametrize('criterion', [Entropy, GiniIndex])
+@pytest.mark.parametrize('binning', [None, 'histogram'])
+def test_levelwise_matches_recursive(criterion, binning):
+    df = make_frame()
+    recursive = Tree(criterion(), binning=binning)
+    recursive.fit(df, 'y')
+    levelwise = Tree(criterion(), binning=binning, builder='levelwise')
+    levelwise.fit(df, 'y')
+    assert str(levelwise.tree) == str(recursive.tree)
+    np.testing.assert_array_equal(levelwise.predict_batch(df), recursive.predict_batch(df))
+    np.testing.assert_allclose(levelwise.predict_proba(df), recursive.predict_proba(df))
+
+def test_levelwise_pure_target_and_unknown_builder():
+    df = pd.DataFrame({'x': [1.0, 2.0, 3.0], 'y': ['a', 'a', 'a']})
+    tree = Tree(GiniIndex(), builder='levelwise')
+    tree.fit(df, 'y')
+    assert tree.tree == 'a'
+    with pytest.raises(ValueError):
+        Tree(GiniIndex(), builder='depthwise')
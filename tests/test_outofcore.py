@@ -0,0 +1,52 @@
+import pytest
+import pandas as pd
+import numpy as np
+from decisiontree.tree import Tree
+from decisiontree.outofcore import CsvChunks
+from decisiontree.ImpurityStrategy.Entropy import Entropy
+from decisiontree.ImpurityStrategy.GiniIndex import GiniIndex
+
+@pytest.fixture
+def training_csv(tmp_path):
+    rng = np.random.default_rng(9)
+    n = 3000
+    df = pd.DataFrame({
+        'x': rng.normal(size=n).round(3),
+        'count': rng.integers(0, 600, n),
+        'colour': rng.choice(['red', 'green', 'blue'], n)
+    })
+    df.loc[::11, 'x'] = np.nan
+    df['label'] = np.where((df['x'].fillna(0) > 0.2) ^ (df['colour'] == 'red') | (df['count'] < 50), 'in', 'out')
+    df.loc[rng.random(n) < 0.05, 'label'] = 'maybe'
+    path = tmp_path / 'train.csv'
+    df.to_csv(path, index=False)
+    return path
+
+@pytest.mark.parametrize('criterion', [Entropy, GiniIndex])
+def test_matches_in_memory_histogram_fit(training_csv, criterion):
+    df = pd.read_csv(training_csv)
+    in_memory = Tree(criterion(), binning='histogram')
+    in_memory.fit(df, 'label')
+    streamed = Tree(criterion())
+    streamed.fit_csv(training_csv, 'label', chunksize=400)
+    assert str(streamed.tree) == str(in_memory.tree)
+    assert streamed.compile().n_nodes == in_memory.compile().n_nodes
+    X = df.drop(columns='label')
+    assert list(streamed.predict_batch(X)) == list(in_memory.predict_batch(X))
+    np.testing.assert_allclose(streamed.predict_proba(X), in_memory.predict_proba(X))
+
+def test_cache_dir_reuses_encoded_chunks(training_csv, tmp_path):
+    tree = Tree(Entropy())
+    tree.fit_csv(training_csv, 'label', chunksize=1000, cache_dir=tmp_path / 'cache')
+    assert len(list((tmp_path / 'cache').glob('chunk*_y.npy'))) == 3
+    reference = Tree(Entropy())
+    reference.fit_csv(training_csv, 'label', chunksize=1000)
+    assert str(tree.tree) == str(reference.tree)
+
+def test_columns_changing_type_between_chunks(tmp_path):
+    path = tmp_path / 'mixed.csv'
+    pd.DataFrame({'code': [1, 2, 3, 'a'], 'label': ['p', 'q', 'p', 'q']}).to_csv(path, index=False)
+    with pytest.raises(ValueError):
+        CsvChunks(path, 'label', chunksize=2).scan()
+    dataset = CsvChunks(path, 'label', chunksize=2, dtype={'code': str}).scan()
+    assert list(dataset.vocabularies[0]) == ['1', '2', '3', 'a']
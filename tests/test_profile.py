@@ -0,0 +1,68 @@
+import json
+import tracemalloc
+import pytest
+from decisiontree.tree import Tree
+from decisiontree.ImpurityStrategy.Entropy import Entropy
+from decisiontree.ImpurityStrategy.GiniIndex import GiniIndex
+from decisiontree.ImpurityStrategy.GainRatio import GainRatio
+from decisiontree.ImpurityStrategy.ChiSquare import ChiSquare
+
+@pytest.fixture
+def df(make_frame):
+    return make_frame(400, 3, decimals=1)
+
+@pytest.mark.parametrize('builder', ['recursive', 'levelwise'])
+def test_profile_report(df, builder, tmp_path):
+    tree = Tree(Entropy(), profile=True, builder=builder)
+    tree.fit(df, 'y')
+    tree.predict_batch(df)
+    assert not tracemalloc.is_tracing()
+    report = tree.profiler.report()
+    assert {'encode', 'predict_encode', 'predict'} <= set(report['phases'])
+    assert all(stats['peak_bytes'] > 0 for stats in report['phases'].values())
+    assert sum(report['nodes_per_depth']) == tree.compile().n_nodes
+    assert report['nodes_per_depth'][0] == 1
+    assert report['impurity_evaluations'] >= report['impurity_calls'] > 0
+    if builder == 'recursive':
+        assert set(report['features']) == {'x', 'colour'}
+        assert report['phases']['score']['calls'] == report['phases']['partition']['calls']
+    # The criterion is left uninstrumented
+    assert '_impurity_from_counts' not in vars(tree.criterion)
+
+    tree.profiler.save(tmp_path / 'profile.json')
+    assert json.loads((tmp_path / 'profile.json').read_text())['nodes_per_depth'] == report['nodes_per_depth']
+
+@pytest.mark.parametrize('builder', ['recursive', 'levelwise'])
+def test_every_criterion_counts_the_same_evaluations(df, builder):
+    # A stump scores the root's candidate splits and takes its nodes' impurities, whatever the criterion
+    counters = set()
+    for criterion in (Entropy, GiniIndex, GainRatio, ChiSquare):
+        tree = Tree(criterion(), profile='time', builder=builder, max_depth=1)
+        tree.fit(df, 'y')
+        report = tree.profiler.report()
+        counters.add((report['impurity_calls'], report['impurity_evaluations']))
+    assert len(counters) == 1
+    tree = Tree(Entropy(), profile='time', builder=builder)
+    tree.fit(df, 'y')
+    assert tree.profiler.impurity_evaluations > tree.profiler.impurity_calls > tree.compile().n_nodes
+
+@pytest.mark.parametrize('kwargs', [{'builder': 'levelwise'}, {'max_features': 1, 'random_state': 0},
+                                    {'splitter': 'random', 'random_state': 0}])
+def test_features_are_timed_in_every_search(df, kwargs):
+    tree = Tree(GiniIndex(), profile='time', **kwargs)
+    tree.fit(df, 'y')
+    report = tree.profiler.report()
+    assert set(report['features']) == {'x', 'colour'}
+    # ExtraTrees scores a single cut per call
+    assert report['impurity_evaluations'] >= report['impurity_calls'] > tree.compile().n_nodes
+    assert '_map_features' not in vars(tree.criterion) and '_map_features' not in vars(GiniIndex())
+
+def test_time_only_profile_matches_silent_tree(df):
+    profiled = Tree(GiniIndex(), profile='time', binning='histogram')
+    profiled.fit(df, 'y')
+    silent = Tree(GiniIndex(), binning='histogram')
+    silent.fit(df, 'y')
+    assert str(profiled.tree) == str(silent.tree)
+    assert all(stats['peak_bytes'] == 0 for stats in profiled.profiler.report()['phases'].values())
+    with pytest.raises(ValueError):
+        Tree(GiniIndex(), profile='memory')
@@ -0,0 +1,157 @@
+import pytest
+import numpy as np
+from decisiontree.tree import Tree
+from decisiontree.trace import ListSink, LeafMade
+from decisiontree.ImpurityStrategy.Entropy import Entropy
+from decisiontree.ImpurityStrategy.GiniIndex import GiniIndex
+
+@pytest.fixture
+def df(make_frame):
+    return make_frame(1200, 3, numeric=1, noise=0.25)
+
+def leaf_sizes(tree):
+    compiled = tree.compile()
+    return compiled.counts[compiled.feature < 0].sum(axis=1)
+
+def test_max_depth_bounds_depth(df, fit):
+    assert fit(df).compile().depths().max() > 3
+    assert fit(df, max_depth=3).compile().depths().max() == 3
+    assert fit(df, max_depth=0).compile().n_nodes == 1
+
+def test_min_samples_split_leaves_small_nodes_unsplit(df, fit):
+    compiled = fit(df, min_samples_split=100).compile()
+    sizes = compiled.counts.sum(axis=1)
+    assert (sizes[compiled.feature >= 0] >= 100).all()
+    assert compiled.n_nodes < fit(df).compile().n_nodes
+
+@pytest.mark.parametrize('criterion', [Entropy, GiniIndex])
+@pytest.mark.parametrize('binning', [None, 'histogram'])
+def test_min_samples_leaf_bounds_leaf_size(df, fit, criterion, binning):
+    tree = fit(df, criterion=criterion, binning=binning, min_samples_leaf=25)
+    assert leaf_sizes(tree).min() >= 25
+
+def test_min_impurity_decrease_prunes_weak_splits(df, fit):
+    sink = ListSink()
+    small = fit(df, min_impurity_decrease=0.005, trace=sink).compile()
+    assert 1 < small.n_nodes < fit(df).compile().n_nodes
+    assert any(event.reason == "min impurity decrease" for event in sink.of_type(LeafMade))
+    assert fit(df, min_impurity_decrease=1.0).compile().n_nodes == 1
+
+def test_max_leaf_nodes_grows_best_first(df, fit):
+    df = df.drop(columns='colour')
+    for n_leaves in (2, 5, 16):
+        compiled = fit(df, max_leaf_nodes=n_leaves).compile()
+        assert np.count_nonzero(compiled.feature < 0) == n_leaves
+    # The first split is the root's own best split
+    two = fit(df, max_leaf_nodes=2).compile()
+    full = fit(df).compile()
+    assert two.feature[0] == full.feature[0] and two.threshold[0] == full.threshold[0]
+
+def test_max_leaf_nodes_skips_overshooting_multiway_splits(df, fit):
+    compiled = fit(df, max_leaf_nodes=4).compile()
+    assert 1 < np.count_nonzero(compiled.feature < 0) <= 4
+
+@pytest.mark.parametrize('limits', [{'max_depth': 2}, {'min_samples_split': 80}, {'min_samples_leaf': 30},
+                                    {'min_impurity_decrease': 0.002}])
+@pytest.mark.parametrize('binning', [None, 'histogram'])
+def test_builders_agree_under_limits(df, fit, limits, binning):
+    recursive = fit(df, binning=binning, **limits)
+    levelwise = fit(df, binning=binning, builder='levelwise', **limits)
+    parallel = fit(df, binning=binning, build_jobs=2, min_task_samples=200, **limits)
+    assert str(levelwise.tree) == str(recursive.tree)
+    assert str(parallel.tree) == str(recursive.tree)
+
+def test_out_of_core_respects_limits(df, fit, tmp_path):
+    path = tmp_path / "train.csv"
+    df.to_csv(path, index=False)
+    limits = {'max_depth': 3, 'min_samples_leaf': 20}
+    in_memory = fit(df, binning='histogram', **limits)
+    streamed = Tree(GiniIndex(), **limits)
+    streamed.fit_csv(path, 'y', chunksize=300)
+    np.testing.assert_array_equal(streamed.predict_batch(df), in_memory.predict_batch(df))
+    with pytest.raises(ValueError, match="max_leaf_nodes"):
+        Tree(GiniIndex(), max_leaf_nodes=4).fit_csv(path, 'y', chunksize=300)
+
+@pytest.mark.parametrize('kwargs', [{'max_depth': -1}, {'min_samples_split': 1}, {'min_samples_leaf': 0},
+                                    {'min_impurity_decrease': -0.1}, {'max_leaf_nodes': 1},
+                                    {'builder': 'levelwise', 'max_leaf_nodes': 4}])
+def test_invalid_limits_raise(kwargs):
+    with pytest.raises(ValueError):
+        Tree(GiniIndex(), **kwargs)
+
+def naive_path(compiled):
+    """Weakest links recomputed from scratch on every intermediate tree"""
+    alphas, alpha = [], 0.0
+    while compiled.n_nodes > 1:
+        risk = compiled.n_samples / compiled.n_samples[0] * compiled.impurity
+        parent, internal = compiled.parents(), np.flatnonzero(compiled.feature >= 0)
+        links = []
+        for node in internal:
+            below = [node]
+            for child in range(node + 1, compiled.n_nodes):
+                if parent[child] in below:
+                    below.append(child)
+            leaves = [b for b in below if compiled.feature[b] < 0]
+            links.append(max(risk[node] - risk[leaves].sum(), 0) / (len(leaves) - 1))
+        alpha = max(alpha, min(links))
+        alphas.append(alpha)
+        compiled = compiled.collapse([internal[int(np.argmin(links))]])
+    return alphas
+
+def test_cost_complexity_path_matches_naive_weakest_links(make_frame, fit):
+    from decisiontree.pruning import weakest_links
+    df = make_frame(300, 3, numeric=1, noise=0.25)
+    compiled = fit(df, criterion=Entropy).compile()
+    alphas = [alpha for alpha, _, _, _ in weakest_links(compiled)]
+    np.testing.assert_allclose(alphas, naive_path(compiled))
+
+def test_prune_follows_the_path(df, fit):
+    tree = fit(df)
+    path = tree.cost_complexity_path()
+    assert path['ccp_alphas'][0] == 0 and (np.diff(path['ccp_alphas']) > 0).all()
+    assert (np.diff(path['impurities']) >= 0).all() and path['n_leaves'][-1] == 1
+    for k in (0, 3, len(path['ccp_alphas']) // 2, -1):
+        pruned = fit(df).prune(path['ccp_alphas'][k]).compile()
+        leaves = pruned.feature < 0
+        assert np.count_nonzero(leaves) == path['n_leaves'][k]
+        cost = (pruned.n_samples / pruned.n_samples[0] * pruned.impurity)[leaves].sum()
+        assert cost == pytest.approx(path['impurities'][k])
+        assert (pruned.parents()[1:] < np.arange(1, pruned.n_nodes)).all()
+
+def test_pruned_tree_routes_like_the_collapsed_original(df, fit):
+    tree = fit(df)
+    full = tree.compile()
+    alpha = tree.cost_complexity_path()['ccp_alphas'][5]
+    pruned = tree.prune(alpha).compile()
+    assert pruned.n_nodes < full.n_nodes
+    # Every row stops at a pruned node whose counts are those of an original node on its path
+    columns = tree.dataset.encode(df)
+    stops = pruned.counts[pruned.apply(columns)]
+    paths = full.apply(columns)
+    parent = full.parents()
+    for row in range(0, len(df), 97):
+        node, found = paths[row], False
+        while node >= 0 and not found:
+            found = np.array_equal(full.counts[node], stops[row])
+            node = parent[node]
+        assert found
+    # The nested views are rebuilt from the pruned arrays
+    assert str(tree.tree).count("'") < str(fit(df).tree).count("'")
+    rows = df.drop(columns='y').head(200)
+    assert list(tree.predict_batch(rows)) == [tree.predict(row) for row in rows.to_dict('records')]
+
+def test_prune_loaded_model_without_data(df, fit, tmp_path):
+    from decisiontree import save_model, load_model
+    full = tmp_path / "model.npz"
+    save_model(fit(df), full)
+    model = load_model(full)
+    path = model.cost_complexity_path()
+    model.prune(path['ccp_alphas'][-2])
+    assert np.count_nonzero(model.compile().feature < 0) == path['n_leaves'][-2]
+    save_model(model, tmp_path / "pruned.npz")
+    assert (tmp_path / "pruned.npz").stat().st_size < full.stat().st_size
+    np.testing.assert_array_equal(load_model(tmp_path / "pruned.npz").predict_batch(df), model.predict_batch(df))
+
+def test_prune_rejects_bad_input(df, fit):
+    with pytest.raises(ValueError):
+        fit(df).prune(-1.0)
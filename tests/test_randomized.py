@@ -0,0 +1,68 @@
+import pytest
+from decisiontree import RandomForest
+from decisiontree.tree import Tree
+from decisiontree.trace import ListSink, FeatureScored
+from decisiontree.ImpurityStrategy import Entropy, GiniIndex, RandomSubspace, ExtraTrees
+
+@pytest.fixture
+def wide(make_frame):
+    return make_frame(500, 8, missing=31, numeric=11)
+
+@pytest.mark.parametrize('splitter', ['best', 'random'])
+@pytest.mark.parametrize('binning', [None, 'histogram'])
+def test_seeded_trees_repeat_and_match_parallel_builds(fit, wide, splitter, binning):
+    kwargs = {'max_features': 'sqrt', 'splitter': splitter, 'binning': binning, 'random_state': 3}
+    first = fit(wide, **kwargs)
+    assert str(fit(wide, **kwargs).tree) == str(first.tree)
+    assert str(fit(wide, build_jobs=2, min_task_samples=100, **kwargs).tree) == str(first.tree)
+    assert str(fit(wide, **dict(kwargs, random_state=4)).tree) != str(first.tree)
+
+def test_max_features_scores_a_subset_per_node(fit, wide):
+    sink = ListSink()
+    fit(wide, max_features=3, random_state=0, trace=sink)
+    scored = {}
+    for event in sink.of_type(FeatureScored):
+        scored.setdefault(event.node, set()).add(event.feature)
+    assert max(len(features) for features in scored.values()) <= 3
+    assert len(set().union(*scored.values())) > 3
+
+def test_all_features_without_randomness_match_exhaustive(fit, wide):
+    for criterion in (Entropy, GiniIndex):
+        assert str(fit(wide, criterion, max_features=1.0).tree) == str(fit(wide, criterion).tree)
+
+def test_extra_trees_cut_once_between_node_extremes(fit, wide):
+    sink = ListSink()
+    tree = fit(wide, splitter='random', random_state=1, trace=sink)
+    thresholds = [event for event in sink.of_type(FeatureScored) if event.threshold is not None]
+    # One candidate per numeric feature and node
+    per_node = {}
+    for event in thresholds:
+        per_node.setdefault((event.node, event.feature), []).append(event.threshold)
+    assert all(len(cuts) == 1 for cuts in per_node.values())
+    assert all(event.counts.sum(axis=1).min() > 0 for event in thresholds)
+    X = wide.drop(columns='y')
+    assert list(tree.predict_batch(X[:50])) == [tree.predict(row) for row in X[:50].to_dict('records')]
+    # Random cuts are not the exhaustive search's best cuts
+    assert str(tree.tree) != str(fit(wide).tree)
+
+def test_randomized_strategies_respect_min_samples_leaf(fit, wide):
+    for splitter in ('best', 'random'):
+        compiled = fit(wide, splitter=splitter, max_features=4, min_samples_leaf=15, random_state=2).compile()
+        assert compiled.counts[compiled.feature < 0].sum(axis=1).min() >= 15
+
+def test_strategies_work_on_their_own(wide):
+    strategy = ExtraTrees(Entropy(), max_features=5, random_state=0)
+    feature, gain, threshold = strategy.get_best_split(wide, 'y')
+    assert feature in wide.columns and gain > 0
+    assert RandomSubspace(GiniIndex(), max_features=2, random_state=0).get_best_feature(wide, 'y')[0] is not None
+
+def test_random_forest_with_feature_subsets(wide):
+    forest = RandomForest(GiniIndex(), n_estimators=5, max_features='sqrt', random_state=0).fit(wide, 'y')
+    parallel = RandomForest(GiniIndex(), n_estimators=5, max_features='sqrt', random_state=0, n_jobs=2).fit(wide, 'y')
+    assert [str(t.tree) for t in forest.trees] == [str(t.tree) for t in parallel.trees]
+
+@pytest.mark.parametrize('kwargs', [{'max_features': 0}, {'max_features': 1.5}, {'max_features': 'half'},
+                                    {'splitter': 'worst'}, {'max_features': 2, 'builder': 'levelwise'}])
+def test_invalid_randomized_trees_raise(kwargs):
+    with pytest.raises(ValueError):
+        Tree(GiniIndex(), **kwargs)
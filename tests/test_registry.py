@@ -0,0 +1,96 @@
+import sys
+import threading
+import pytest
+import pandas as pd
+import numpy as np
+from decisiontree.tree import Tree
+from decisiontree.registry import ModelRegistry, model_nbytes
+from decisiontree.serialization import save_model, load_model
+from decisiontree.ImpurityStrategy.Entropy import Entropy
+
+@pytest.fixture
+def model_dir(tmp_path):
+    rng = np.random.default_rng(11)
+    for i in range(3):
+        df = pd.DataFrame({
+            'x': rng.normal(size=200),
+            'colour': rng.choice(['red', 'green', 'blue'], 200)
+        })
+        df['label'] = np.where(df['x'] > i - 1, 'high', 'low')
+        tree = Tree(Entropy())
+        tree.fit(df, 'label')
+        save_model(tree, tmp_path / f"customer{i}.npz")
+    return tmp_path
+
+@pytest.fixture
+def rows():
+    return pd.DataFrame({'x': [-1.5, -0.5, 0.5, 1.5], 'colour': ['red', 'blue', 'pink', 'green']})
+
+def test_mmap_load_matches_regular_load(model_dir, rows):
+    mapped = load_model(model_dir / 'customer1.npz', mmap_mode='r')
+    assert isinstance(mapped.compile().threshold.base, np.memmap)
+    regular = load_model(model_dir / 'customer1.npz')
+    assert list(mapped.predict_batch(rows)) == list(regular.predict_batch(rows))
+
+def test_registry_predicts_by_name(model_dir, rows):
+    registry = ModelRegistry()
+    assert registry.register_directory(model_dir) == ['customer0', 'customer1', 'customer2']
+    assert list(registry.predict('customer0', rows)) == ['low', 'high', 'high', 'high']
+    assert list(registry.predict('customer2', rows)) == ['low', 'low', 'low', 'high']
+    assert registry.predict('customer1', {'x': 0.5, 'colour': 'red'}) == 'high'
+    assert registry.stats()['misses'] == 3 and registry.hits == 0
+    registry.predict('customer0', rows)
+    assert registry.hits == 1
+    with pytest.raises(KeyError):
+        registry.get('nobody')
+
+def test_registry_evicts_least_recently_used(model_dir):
+    size = model_nbytes(load_model(model_dir / 'customer0.npz'))
+    registry = ModelRegistry(memory_budget=int(size * 2.5))
+    registry.register_directory(model_dir)
+    registry.get('customer0')
+    registry.get('customer1')
+    registry.get('customer0')
+    registry.get('customer2')
+    assert registry.loaded == ['customer0', 'customer2']
+    assert registry.evictions == 1 and registry.nbytes <= registry.memory_budget
+    registry.get('customer1')
+    assert registry.stats() == {'hits': 1, 'misses': 4, 'evictions': 2, 'loaded': 2, 'registered': 3,
+                                'nbytes': registry.nbytes, 'memory_budget': registry.memory_budget}
+
+def test_single_rows_and_strings_stay_within_the_budget(model_dir):
+    registry = ModelRegistry()
+    registry.register_directory(model_dir)
+    assert registry.predict('customer0', {'x': 0.5, 'colour': 'red'}) == 'high'
+    tree = registry.get('customer0')
+    # Routed through the compiled arrays, without a Node tree the budget cannot see
+    assert tree._root is None
+    # Categorical labels are Python strings behind an object array: their size counts, not just the pointers
+    vocabulary = tree.dataset.vocabularies[tree.dataset.feature_position('colour')]
+    pointers = sum(np.asarray(array).nbytes for array in tree.dataset.vocabularies)
+    assert model_nbytes(tree) >= sum(sys.getsizeof(label) for label in vocabulary) + pointers
+
+def test_a_cold_load_does_not_block_cached_models(model_dir, monkeypatch):
+    from decisiontree import registry as module
+    registry = ModelRegistry()
+    registry.register_directory(model_dir)
+    registry.get('customer0')
+    loading, release = threading.Event(), threading.Event()
+
+    def slow_load(path, mmap_mode=None):
+        loading.set()
+        release.wait(5)
+        return load_model(path, mmap_mode)
+
+    monkeypatch.setattr(module, 'load_model', slow_load)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get('customer1'))) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    assert loading.wait(5)
+    assert registry.get('customer0') is registry.get('customer0')
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results[0] is results[1]
+    assert registry.misses == 2 and registry.loaded == ['customer0', 'customer1']
@@ -0,0 +1,85 @@
+import pytest
+import pandas as pd
+import numpy as np
+from click.testing import CliRunner
+from decisiontree.tree import Tree
+from decisiontree.serialization import save_model, load_model, FORMAT_VERSION
+from decisiontree.ImpurityStrategy.Entropy import Entropy
+from decisiontree.ImpurityStrategy.GiniIndex import GiniIndex
+from decisiontree.cli import cli
+
+@pytest.fixture
+def mixed_dataset():
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame({
+        'size': rng.normal(size=300).round(1),
+        'shape': rng.choice(['round', 'square', None], 300),
+        'count': rng.integers(0, 4, 300),
+        'flag': rng.choice([True, False], 300)
+    })
+    df['label'] = np.where((df['size'] > 0) | (df['shape'] == 'round'), 1, 2)
+    return df
+
+def test_round_trip_predicts_identically(mixed_dataset, tmp_path):
+    tree = Tree(Entropy())
+    tree.fit(mixed_dataset, 'label')
+    save_model(tree, tmp_path / 'model.npz')
+    loaded = load_model(tmp_path / 'model.npz')
+    X = mixed_dataset.drop(columns='label')
+    assert list(loaded.predict_batch(X)) == list(tree.predict_batch(X))
+    assert loaded.tree == tree.tree
+    assert isinstance(loaded.criterion, Entropy)
+    assert loaded.predict(X.iloc[0].to_dict()) == tree.predict(X.iloc[0].to_dict())
+
+@pytest.mark.parametrize('random_state', [7, np.random.SeedSequence(7).spawn(2)[1]])
+@pytest.mark.parametrize('params', [{'max_features': 2}, {'max_features': 0.5, 'splitter': 'random'},
+                                    {'splitter': 'random'}])
+def test_round_trip_keeps_randomized_criteria(mixed_dataset, tmp_path, params, random_state):
+    tree = Tree(GiniIndex(), max_depth=2, min_samples_leaf=5, max_leaf_nodes=3)
+    tree.criterion = Tree(GiniIndex(), **params).criterion.seeded(random_state)
+    tree.fit(mixed_dataset, 'label')
+    save_model(tree, tmp_path / 'model.npz')
+    loaded = load_model(tmp_path / 'model.npz')
+    assert type(loaded.criterion) is type(tree.criterion)
+    assert isinstance(loaded.criterion.criterion, GiniIndex)
+    assert loaded.criterion.max_features == tree.criterion.max_features
+    assert (loaded.max_depth, loaded.min_samples_leaf, loaded.max_leaf_nodes) == (2, 5, 3)
+    # Refitting the loaded tree draws the same features and thresholds, and stops in the same places
+    loaded.fit(mixed_dataset, 'label')
+    assert loaded.tree == tree.tree
+
+def test_round_trip_keeps_label_types(mixed_dataset, tmp_path):
+    tree = Tree(GiniIndex())
+    tree.fit(mixed_dataset, 'label')
+    save_model(tree, tmp_path / 'model.npz')
+    loaded = load_model(tmp_path / 'model.npz')
+    classes = loaded.dataset.classes
+    assert [type(c) for c in classes] == [int, int]
+    shapes = loaded.dataset.vocabularies[loaded.dataset.feature_position('shape')]
+    assert list(shapes[:2]) == ['round', 'square'] and pd.isna(shapes[2])
+    flags = loaded.dataset.vocabularies[loaded.dataset.feature_position('flag')]
+    assert [type(f) for f in flags] == [bool, bool]
+    assert loaded.dataset.numeric == tree.dataset.numeric
+
+def test_rejects_newer_version(mixed_dataset, tmp_path, monkeypatch):
+    tree = Tree(Entropy())
+    tree.fit(mixed_dataset, 'label')
+    monkeypatch.setattr('decisiontree.serialization.FORMAT_VERSION', FORMAT_VERSION + 1)
+    save_model(tree, tmp_path / 'model.npz')
+    monkeypatch.setattr('decisiontree.serialization.FORMAT_VERSION', FORMAT_VERSION)
+    with pytest.raises(ValueError):
+        load_model(tmp_path / 'model.npz')
+
+def test_cli_train_and_predict(mixed_dataset, tmp_path):
+    mixed_dataset.to_csv(tmp_path / 'train.csv', index=False)
+    mixed_dataset.drop(columns='label').to_csv(tmp_path / 'test.csv', index=False)
+    runner = CliRunner()
+    result = runner.invoke(cli, ['train', '-f', str(tmp_path / 'train.csv'), '-t', 'label',
+                                 '-o', str(tmp_path / 'model.npz'), '--export-json', str(tmp_path / 'model.json')])
+    assert result.exit_code == 0, result.output
+    assert (tmp_path / 'model.json').exists()
+    result = runner.invoke(cli, ['predict', '-m', str(tmp_path / 'model.npz'), '-f', str(tmp_path / 'test.csv'),
+                                 '-o', str(tmp_path / 'predictions.csv')])
+    assert result.exit_code == 0, result.output
+    predictions = pd.read_csv(tmp_path / 'predictions.csv')['prediction']
+    assert (predictions == mixed_dataset['label']).mean() > 0.95
@@ -0,0 +1,46 @@
+import io
+import pytest
+import pandas as pd
+import numpy as np
+from decisiontree.tree import Tree
+from decisiontree.streaming import predict_csv
+from decisiontree.ImpurityStrategy.GiniIndex import GiniIndex
+
+@pytest.fixture
+def fitted():
+    rng = np.random.default_rng(5)
+    df = pd.DataFrame({
+        'id': np.arange(500),
+        'x': rng.normal(size=500),
+        'code': rng.choice(['1', '2', 'a'], 500)
+    })
+    df['label'] = np.where((df['x'] > 0) | (df['code'] == '1'), 'yes', 'no')
+    tree = Tree(GiniIndex())
+    tree.fit(df.drop(columns='id'), 'label')
+    return tree, df.drop(columns='label')
+
+def test_chunked_predictions_match_batch(fitted, tmp_path):
+    tree, X = fitted
+    X.to_csv(tmp_path / 'input.csv', index=False)
+    calls = []
+    summary = predict_csv(tree, tmp_path / 'input.csv', tmp_path / 'out.csv', chunksize=64,
+                          keep=['id'], progress=lambda rows, seconds: calls.append(rows))
+    out = pd.read_csv(tmp_path / 'out.csv', dtype={'code': str})
+    assert list(out.columns) == ['id', 'prediction']
+    assert list(out['id']) == list(X['id'])
+    assert list(out['prediction']) == list(tree.predict_batch(X))
+    assert summary['rows'] == 500 and summary['chunks'] == 8
+    assert calls[-1] == 500 and len(calls) == 8
+
+def test_digit_only_chunks_keep_string_labels(fitted):
+    tree, X = fitted
+    rows = X[X['code'] == '1'].head(5)
+    stream = io.StringIO()
+    predict_csv(tree, io.StringIO(rows.to_csv(index=False)), stream)
+    assert list(pd.read_csv(io.StringIO(stream.getvalue()))['prediction']) == ['yes'] * 5
+
+def test_missing_feature_column(fitted, tmp_path):
+    tree, X = fitted
+    X.drop(columns='x').to_csv(tmp_path / 'input.csv', index=False)
+    with pytest.raises(KeyError):
+        predict_csv(tree, tmp_path / 'input.csv', tmp_path / 'out.csv')
@@ -0,0 +1,61 @@
+import io
+import json
+import pytest
+import numpy as np
+from decisiontree.tree import Tree
+from decisiontree.trace import (ListSink, JsonlSink, TextSink, FitStarted, NodeStarted, FeatureScored,
+                                SplitChosen, LeafMade, LevelGrown)
+from decisiontree.ImpurityStrategy.Entropy import Entropy
+from decisiontree.ImpurityStrategy.GiniIndex import GiniIndex
+
+@pytest.fixture
+def df(make_frame):
+    return make_frame(300, 2, decimals=1)
+
+@pytest.mark.parametrize('binning', [None, 'histogram'])
+def test_list_sink_records_the_search(df, binning):
+    sink = ListSink()
+    traced = Tree(Entropy(), binning=binning, trace=sink)
+    traced.fit(df, 'y')
+    silent = Tree(Entropy(), binning=binning)
+    silent.fit(df, 'y')
+    assert str(traced.tree) == str(silent.tree)
+
+    assert isinstance(sink.events[0], FitStarted)
+    nodes = sink.of_type(NodeStarted)
+    assert len(nodes) == traced.compile().n_nodes
+    assert len(sink.of_type(LeafMade)) + len(sink.of_type(SplitChosen)) == len(nodes)
+    root = traced.root
+    np.testing.assert_array_equal(nodes[0].counts, root.counts)
+    scored = {event.feature: event for event in sink.of_type(FeatureScored) if event.node == 0}
+    chosen = sink.of_type(SplitChosen)[0]
+    assert chosen.feature == df.columns[root.feature]
+    assert chosen.score == max(event.score for event in scored.values())
+    assert scored[chosen.feature].counts.sum() == len(df)
+
+def test_jsonl_and_text_sinks(df):
+    buffer = io.StringIO()
+    Tree(GiniIndex(), trace=JsonlSink(buffer)).fit(df, 'y')
+    records = [json.loads(line) for line in buffer.getvalue().splitlines()]
+    assert records[0]['event'] == 'FitStarted' and records[0]['classes'] == ['a', 'b', 'c']
+    assert {'NodeStarted', 'FeatureScored', 'SplitChosen', 'LeafMade'} <= {r['event'] for r in records}
+
+    text = io.StringIO()
+    Tree(GiniIndex(), trace=TextSink(text)).fit(df, 'y')
+    assert "Classes: ['a', 'b', 'c']" in text.getvalue()
+    assert "Node at depth 0:" in text.getvalue()
+    assert "Best feature:" in text.getvalue() and "-> Leaf:" in text.getvalue()
+
+def test_level_events(df):
+    sink = ListSink()
+    Tree(GiniIndex(), builder='levelwise', trace=sink).fit(df, 'y')
+    levels = sink.of_type(LevelGrown)
+    assert [event.depth for event in levels] == list(range(len(levels)))
+    assert levels[0].n_nodes == 1
+
+def test_text_sink_does_not_count_as_profiled_work(df):
+    silent = Tree(GiniIndex(), profile='time')
+    silent.fit(df, 'y')
+    traced = Tree(GiniIndex(), profile='time', trace=TextSink(io.StringIO()))
+    traced.fit(df, 'y')
+    assert traced.profiler.impurity_calls == silent.profiler.impurity_calls
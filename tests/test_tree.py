@@ -1,4 +1,5 @@
 import pytest
+import threading
 import pandas as pd
 import numpy as np
 from decisiontree.ImpurityStrategy.Strategy import ImpurityStrategy
@@ -88,3 +89,109 @@ def test_prediction():
     test_sample = {'outlook': 'sunny'}
     prediction = tree.predict(test_sample)
     assert prediction in ['yes', 'no']
+
+def test_fit_does_not_copy_or_modify_dataset():
+    from decisiontree.dataset import Dataset
+    df = pd.DataFrame({
+        'outlook': ['sunny', 'rainy', 'overcast', 'sunny', 'rainy', 'overcast'],
+        'windy': ['yes', 'no', 'no', 'no', 'yes', 'yes'],
+        'play': ['no', 'yes', 'yes', 'yes', 'no', 'yes']
+    })
+    data = Dataset(df, 'play')
+    before = [codes.copy() for codes in data.columns]
+    tree = Tree(Entropy())
+    tree.fit(data)
+    assert all(np.array_equal(a, b) for a, b in zip(before, data.columns))
+    # Every training row is routed to a leaf built from exactly its partition
+    assert list(tree.predict_batch(df)) == list(df['play'])
+
+def test_histogram_binning_matches_exact_with_few_values():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'x': rng.integers(0, 40, 300).astype(float),
+        'color': rng.choice(['red', 'green', 'blue'], 300)
+    })
+    df['label'] = np.where((df['x'] > 12) & (df['color'] != 'red'), 'on', 'off')
+    for criterion in (Entropy, GiniIndex):
+        exact = Tree(criterion())
+        exact.fit(df, 'label')
+        binned = Tree(criterion(), binning="histogram", max_bins=255)
+        binned.fit(df, 'label')
+        assert binned.tree == exact.tree
+        coarse = Tree(criterion(), binning="histogram", max_bins=4)
+        coarse.fit(df, 'label')
+        assert set(coarse.predict_batch(df)) <= {'on', 'off'}
+
+def test_unknown_binning_rejected():
+    with pytest.raises(ValueError):
+        Tree(Entropy(), binning="exact")
+
+def test_unseen_value_falls_back_to_node_majority():
+    # Two single-sample 'no' leaves would out-vote one 'yes' leaf holding 4 samples
+    df = pd.DataFrame({
+        'outlook': ['sunny', 'rainy', 'overcast', 'overcast', 'overcast', 'overcast'],
+        'play': ['no', 'no', 'yes', 'yes', 'yes', 'yes']
+    })
+    tree = Tree(Entropy())
+    tree.fit(df, 'play')
+    assert tree.predict({'outlook': 'foggy'}) == 'yes'
+    assert list(tree.predict_batch(pd.DataFrame({'outlook': ['foggy']}))) == ['yes']
+
+def test_predict_proba_and_feature_importances():
+    df = pd.DataFrame({
+        'outlook': ['sunny', 'sunny', 'overcast', 'rainy', 'rainy', 'sunny'],
+        'noise': ['a', 'b', 'a', 'b', 'a', 'a'],
+        'play': ['no', 'no', 'yes', 'yes', 'no', 'yes']
+    })
+    tree = Tree(GiniIndex())
+    tree.fit(df, 'play')
+    proba = tree.predict_proba(df)
+    assert proba.shape == (6, 2)
+    assert np.allclose(proba.sum(axis=1), 1.0)
+    assert np.array_equal(tree.dataset.classes[proba.argmax(axis=1)], tree.predict_batch(df))
+    importances = tree.feature_importances()
+    assert set(importances) == {'outlook', 'noise'}
+    assert np.isclose(sum(importances.values()), 1.0)
+    assert all(value >= 0 for value in importances.values())
+
+def test_n_jobs_builds_same_tree():
+    rng = np.random.default_rng(4)
+    df = pd.DataFrame({f'f{i}': rng.integers(0, 4, 300) for i in range(8)})
+    df['x'] = rng.normal(size=300)
+    df['y'] = np.where((df['f1'] + df['f5'] > 3) | (df['x'] > 1), 'a', 'b')
+    serial = Tree(GiniIndex())
+    serial.fit(df, 'y')
+    parallel = Tree(GiniIndex(), n_jobs=3)
+    parallel.fit(df, 'y')
+    assert parallel.criterion.n_jobs == 3
+    assert str(parallel.tree) == str(serial.tree)
+    # The scoring threads only live for the fit
+    assert parallel.criterion._pool is None
+    assert not [thread for thread in threading.enumerate() if thread.name.startswith('ThreadPoolExecutor')]
+
+@pytest.mark.parametrize('binning', [None, 'histogram'])
+def test_parallel_build_matches_serial(binning):
+    rng = np.random.default_rng(8)
+    df = pd.DataFrame({
+        'x': rng.normal(size=2000).round(2),
+        'z': rng.integers(0, 30, 2000),
+        'colour': rng.choice(['red', 'green', 'blue', 'grey'], 2000)
+    })
+    df['y'] = np.where((df['x'] > 0) ^ (df['colour'] == 'red'), 'a', 'b')
+    df.loc[rng.random(2000) < 0.2, 'y'] = 'c'
+    serial = Tree(Entropy(), binning=binning)
+    serial.fit(df, 'y')
+    parallel = Tree(Entropy(), binning=binning, build_jobs=2, min_task_samples=100)
+    parallel.fit(df, 'y')
+    assert str(parallel.tree) == str(serial.tree)
+    np.testing.assert_array_equal(parallel.compile().counts, serial.compile().counts)
+
+def test_feature_importances_need_node_impurities():
+    df = pd.DataFrame({
+        'outlook': ['sunny', 'sunny', 'overcast', 'rainy'],
+        'play': ['no', 'no', 'yes', 'yes']
+    })
+    tree = Tree(DummyImpurityStrategy())
+    tree.fit(df, 'play')
+    with pytest.raises(ValueError, match='without count kernels'):
+        tree.feature_importances()
@@ -0,0 +1,88 @@
+import pytest
+import numpy as np
+from decisiontree import cross_validate, grid_search
+from decisiontree.dataset import Dataset
+from decisiontree.tree import Tree
+from decisiontree.tuning import kfold, truncate
+from decisiontree.ImpurityStrategy import Entropy, GiniIndex, GainRatio
+
+@pytest.fixture
+def frame(make_frame):
+    return make_frame(900, 8, noise=0.2, missing=17, colours=4, integers=20)
+
+def same_arrays(a, b):
+    return all(np.array_equal(getattr(a, name), getattr(b, name), equal_nan=True)
+               for name in ('feature', 'threshold', 'left', 'right', 'lookup', 'counts'))
+
+@pytest.mark.parametrize('criterion', [GiniIndex, GainRatio])
+@pytest.mark.parametrize('rules', [
+    {'max_depth': 0}, {'max_depth': 2}, {'min_samples_split': 60}, {'min_impurity_decrease': 0.005},
+    {'max_leaf_nodes': 2}, {'max_leaf_nodes': 7}, {'max_depth': 3, 'max_leaf_nodes': 5, 'min_samples_split': 30},
+    {'min_impurity_decrease': 0.002, 'max_leaf_nodes': 9},
+])
+def test_truncated_tree_is_the_tree_grown_with_its_rules(frame, criterion, rules):
+    loose = Tree(criterion(), min_samples_leaf=4)
+    loose.fit(frame, 'y')
+    direct = Tree(criterion(), min_samples_leaf=4, **rules)
+    direct.fit(frame, 'y')
+    assert same_arrays(truncate(loose.compile(), loose.criterion, **rules), direct.compile())
+
+def test_folds_partition_rows_by_class():
+    y = np.repeat([0, 1, 2], [50, 30, 20])
+    folds = kfold(y, 5, random_state=1)
+    assert np.array_equal(np.sort(np.concatenate([test for _, test in folds])), np.arange(100))
+    for train, test in folds:
+        assert len(np.intersect1d(train, test)) == 0 and len(train) + len(test) == 100
+        assert np.array_equal(np.bincount(y[test]), [10, 6, 4])
+    with pytest.raises(ValueError, match='n_splits'):
+        kfold(y, 1)
+
+@pytest.mark.parametrize('params', [{}, {'binning': 'histogram', 'max_bins': 8}, {'builder': 'levelwise'}])
+def test_scores_match_separate_fits(frame, params):
+    result = grid_search(Entropy(), frame, 'y', {'max_depth': [1, 3, None], 'min_samples_split': [2, 50]},
+                         cv=3, random_state=0, **params)
+    dataset = Dataset(frame, 'y')
+    # Bins come from every row, as the encoding does
+    grown = dataset.to_bins(params['max_bins']) if 'max_bins' in params else dataset
+    for config, accuracy in zip(result['params'], result['accuracy']):
+        for fold, (train, test) in enumerate(kfold(dataset.y, 3, random_state=0)):
+            tree = Tree(Entropy(), **params, **config)
+            tree.fit(grown.take(train))
+            predicted = tree.predict_batch(dataset.take(test))
+            assert accuracy[fold] == np.mean(predicted == dataset.classes[dataset.y[test]])
+    # Six combinations, one tree per fold
+    assert result['trees_grown'] == 3
+
+def test_only_stopping_rules_share_trees(frame):
+    result = grid_search(GiniIndex(), frame, 'y', {'criterion': [GiniIndex(), Entropy()],
+                                                   'min_samples_leaf': [1, 10], 'max_leaf_nodes': [4, 8, None]}, cv=4)
+    assert result['accuracy'].shape == (12, 4)
+    assert result['trees_grown'] == 4 * 4
+    assert result['best_params'] == result['params'][result['best_index']]
+    assert result['mean_accuracy'][result['best_index']] == result['mean_accuracy'].max()
+    assert (result['fit_time'] > 0).all() and (result['score_time'] > 0).all()
+
+def test_parallel_search_matches_serial(frame):
+    grid = {'max_depth': [2, None], 'min_samples_leaf': [1, 5]}
+    serial = grid_search(GiniIndex(), frame, 'y', grid, cv=3, random_state=2, binning='histogram')
+    parallel = grid_search(GiniIndex(), frame, 'y', grid, cv=3, random_state=2, binning='histogram', n_jobs=2)
+    np.testing.assert_array_equal(parallel['accuracy'], serial['accuracy'])
+
+def test_cross_validate_on_a_dataset_with_given_folds(frame):
+    dataset = Dataset(frame, 'y')
+    folds = [(np.arange(0, 600), np.arange(600, 900)), (np.arange(300, 900), np.arange(0, 300))]
+    result = cross_validate(Entropy(), dataset, cv=folds, max_depth=3)
+    assert set(result) == {'accuracy', 'fit_time', 'score_time'}
+    tree = Tree(Entropy(), max_depth=3)
+    tree.fit(dataset.take(np.arange(0, 600)))
+    expected = np.mean(tree.predict_batch(dataset.take(np.arange(600, 900))) == frame['y'].to_numpy()[600:])
+    assert result['accuracy'][0] == expected
+    assert 0.6 < result['accuracy'].mean() <= 1
+
+def test_invalid_searches_are_rejected(frame):
+    with pytest.raises(ValueError, match='max_depth'):
+        grid_search(GiniIndex(), frame, 'y', {'max_depth': [2, -1]})
+    with pytest.raises(ValueError, match='at least one value'):
+        grid_search(GiniIndex(), frame, 'y', {'max_depth': []})
+    with pytest.raises(ValueError, match="not 'x'"):
+        cross_validate(GiniIndex(), Dataset(frame, 'y'), 'x')
@@ -0,0 +1,77 @@
+import pytest
+import pandas as pd
+import numpy as np
+from decisiontree.dataset import Dataset
+from decisiontree.ImpurityStrategy import Entropy, GiniIndex
+
+@pytest.fixture
+def repeated(make_frame):
+    # Few distinct rows, each repeated many times, as in log-like data
+    return make_frame(600, 5, noise=0.15, missing=7, decimals=0)
+
+def test_compress_collapses_identical_rows(repeated):
+    dataset = Dataset(repeated, 'y')
+    compressed = dataset.compress()
+    assert compressed.n_samples == len(repeated.drop_duplicates())
+    assert compressed.total_weight == len(repeated)
+    assert compressed.weights.dtype == np.int64
+    assert compressed.vocabularies is dataset.vocabularies
+
+@pytest.mark.parametrize('criterion', [Entropy, GiniIndex])
+@pytest.mark.parametrize('kwargs', [{}, {'binning': 'histogram', 'max_bins': 4}, {'builder': 'levelwise'},
+                                    {'max_depth': 2, 'min_samples_leaf': 20, 'min_impurity_decrease': 0.01},
+                                    {'max_leaf_nodes': 5}])
+def test_compressed_fit_grows_the_same_tree(fit, repeated, criterion, kwargs):
+    full = fit(repeated, criterion, **kwargs)
+    compressed = fit(repeated, criterion, compress=True, **kwargs)
+    assert compressed.dataset.n_samples < full.dataset.n_samples
+    assert str(compressed.tree) == str(full.tree)
+
+def test_integer_weights_count_as_copies(fit, repeated):
+    weights = np.random.default_rng(1).integers(0, 4, len(repeated))
+    copied = repeated.loc[repeated.index.repeat(weights)].reset_index(drop=True)
+    for kwargs in ({}, {'builder': 'levelwise'}, {'binning': 'histogram', 'max_bins': 4}):
+        weighted = fit(repeated, sample_weight=weights, **kwargs)
+        assert str(weighted.tree) == str(fit(copied, **kwargs).tree)
+
+@pytest.mark.parametrize('builder', ['recursive', 'levelwise'])
+def test_fractional_weights_scale_freely(fit, repeated, builder):
+    weights = np.random.default_rng(2).integers(1, 4, len(repeated))
+    assert (str(fit(repeated, sample_weight=weights / 4, builder=builder).tree)
+            == str(fit(repeated, sample_weight=weights, builder=builder).tree))
+
+@pytest.mark.parametrize('weights, message', [
+    (np.ones(3), 'Expected 600 sample weights'),
+    (np.full(600, -1.0), 'non-negative'),
+    (np.full(600, np.nan), 'finite'),
+    (np.array(['a'] * 600), 'numeric'),
+    (np.zeros(600), 'all zero'),
+])
+def test_invalid_weights_are_rejected(fit, repeated, weights, message):
+    with pytest.raises(ValueError, match=message):
+        fit(repeated, sample_weight=weights)
+
+@pytest.mark.parametrize('kwargs', [{}, {'binning': 'histogram', 'max_bins': 4}, {'builder': 'levelwise'},
+                                    {'max_leaf_nodes': 5}, {'compress': True}])
+def test_zero_weight_rows_are_left_out(fit, repeated, kwargs):
+    weights = np.random.default_rng(3).choice([0, 0.5, 2.0], len(repeated))
+    kept = weights > 0
+    weighted = fit(repeated, sample_weight=weights, **kwargs)
+    assert str(weighted.tree) == str(fit(repeated[kept], sample_weight=weights[kept], **kwargs).tree)
+
+def test_zero_weight_rows_offer_no_split(fit):
+    df = pd.DataFrame({'f': ['a', 'a', 'b', 'c'], 'y': ['p', 'q', 'p', 'q']})
+    tree = fit(df, sample_weight=np.array([1, 1, 0, 0]))
+    assert tree.compile().n_nodes == 1
+    np.testing.assert_array_equal(tree.predict_proba(df), np.full((4, 2), 0.5))
+
+def test_zero_weight_rows_place_no_thresholds_or_classes(fit):
+    # 3 and 'z' only occur at weight 0: the cut falls between 2 and 4 and 'z' is no class
+    df = pd.DataFrame({'x': [1.0, 2.0, 3.0, 4.0, 5.0], 'y': ['a', 'a', 'z', 'b', 'b']})
+    weights = np.array([1, 1, 0, 1, 1])
+    weighted = fit(df, sample_weight=weights)
+    absent = fit(df[weights > 0], sample_weight=weights[weights > 0])
+    assert str(weighted.tree) == str(absent.tree)
+    assert weighted.compile().threshold[0] == 3
+    assert list(weighted.dataset.classes) == ['a', 'b']
+    np.testing.assert_array_equal(weighted.predict_proba(df), absent.predict_proba(df))